@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Compare concurrent ask calls through a blocking and an async MCP tool.
+
+Starts a local OpenAI-compatible stub server that answers every chat
+completion after a fixed delay, then sends the same batch of concurrent
+`ask` calls through the OpenAI server's async tool and through the same
+function registered as a plain sync tool, which FastMCP runs on the event
+loop. The sync tool handles one call at a time; the async tool overlaps them.
+
+Usage: python scripts/bench_async_ask.py [concurrent_calls] [latency_seconds]
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_server(latency: float) -> ThreadingHTTPServer:
+    """Start an OpenAI-compatible chat completion server on a free local port."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+            body = json.dumps(
+                {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "Stub reply"},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": 10,
+                        "completion_tokens": 2,
+                        "total_tokens": 12,
+                    },
+                }
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def timed_calls(mcp, calls: int) -> float:
+    """Run concurrent ask calls on an MCP server, returning the wall time in seconds."""
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            mcp.call_tool("ask", {"prompt": f"Question {i}", "agent_name": "false"})
+            for i in range(calls)
+        )
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    server = stub_server(latency)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["OPENAI_API_KEY"] = "stub"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Memory, ledger and cache storage is relative to the working directory
+        os.chdir(workdir)
+        from mcp.server.fastmcp import FastMCP
+
+        from mcp_handley_lab.common.config import settings
+        from mcp_handley_lab.llm.openai import tool
+
+        settings.openai_api_key = "stub"
+        blocking = FastMCP("Blocking OpenAI Tool")
+        blocking.tool(name="ask")(tool.ask)
+
+        blocking_time = asyncio.run(timed_calls(blocking, calls))
+        async_time = asyncio.run(timed_calls(tool.mcp, calls))
+
+    server.shutdown()
+    print(f"{calls} concurrent calls, {latency:.2f}s provider latency")
+    print(f"{'tool':<10}{'wall time (s)':>15}")
+    print(f"{'blocking':<10}{blocking_time:>15.2f}")
+    print(f"{'async':<10}{async_time:>15.2f}")
+    print(f"speedup: {blocking_time / async_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
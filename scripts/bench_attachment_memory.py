@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Compare peak memory of concurrent requests with large binary attachments.
+
+Each of several threads reads its own binary attachment the way
+read_file_smart did before chunked encoding (read_bytes, b64encode, decode
+and an f-string header) and the way it does now, with the blob cache
+disabled so every read is measured. A last run sends the same attachment on
+every thread through an enabled cache, which loads it once. Peak Python heap
+is measured with tracemalloc; memory-mapped file pages are page cache and
+are not counted.
+
+Usage: python scripts/bench_attachment_memory.py [concurrent_requests] [file_megabytes]
+"""
+
+import base64
+import os
+import sys
+import tempfile
+import tracemalloc
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from mcp_handley_lab.llm.blob_cache import BlobCache
+from mcp_handley_lab.llm.common import determine_mime_type, read_file_smart
+
+
+def read_whole(file_path: Path) -> str:
+    """Read an attachment as read_file_smart did before chunked encoding."""
+    file_content = file_path.read_bytes()
+    encoded_content = base64.b64encode(file_content).decode()
+    mime_type = determine_mime_type(file_path)
+    header = f"[Binary file: {file_path.name}, {mime_type}, {len(file_content)} bytes]"
+    return f"{header}\n{encoded_content}"
+
+
+def read_chunked(file_path: Path) -> str:
+    """Read an attachment through read_file_smart."""
+    content, _ = read_file_smart(file_path)
+    return content
+
+
+def peak(read: Callable[[Path], str], paths: list[Path], cache: BlobCache) -> int:
+    """Return the peak bytes allocated while reading every path concurrently."""
+    with patch("mcp_handley_lab.llm.common.blob_cache", cache):
+        tracemalloc.start()
+        with ThreadPoolExecutor(max_workers=len(paths)) as pool:
+            contents = list(pool.map(read, paths))
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    del contents
+    return peak_bytes
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    megabytes = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(requests):
+            path = Path(directory) / f"attachment{i}.pdf"
+            path.write_bytes(os.urandom(int(megabytes * 1024 * 1024)))
+            paths.append(path)
+
+        runs = [
+            ("whole file", peak(read_whole, paths, BlobCache(max_bytes=0))),
+            ("chunked", peak(read_chunked, paths, BlobCache(max_bytes=0))),
+            (
+                "chunked, same file, cached",
+                peak(read_chunked, [paths[0]] * requests, BlobCache(2**31)),
+            ),
+        ]
+
+    total = requests * megabytes
+    print(f"{requests} concurrent requests with {megabytes:g} MB attachments")
+    print(f"{'read':<28}{'peak':>10}{'x attachments':>16}")
+    for name, peak_bytes in runs:
+        peak_mb = peak_bytes / 1024 / 1024
+        print(f"{name:<28}{peak_mb:>7.0f} MB{peak_mb / total:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compare resolving the same files for repeated asks with and without the blob cache.
+
+Writes a set of text, PDF-like binary and image files, then resolves them the
+way the provider adapters do before each ask (inline file content and base64
+image blocks), once through a disabled cache and once through an enabled one.
+
+Usage: python scripts/bench_blob_cache.py [asks] [file_megabytes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from mcp_handley_lab.llm.blob_cache import BlobCache
+from mcp_handley_lab.llm.common import (
+    resolve_files_for_llm,
+    resolve_images_for_multimodal_prompt,
+)
+
+
+def write_files(directory: Path, megabytes: float) -> tuple[list[str], list[str]]:
+    """Write two text files, a binary file and two images of the given size."""
+    size = int(megabytes * 1024 * 1024)
+    line = "The quick brown fox jumps over the lazy dog. " * 2 + "\n"
+    files = []
+    for name in ("notes.md", "results.csv"):
+        path = directory / name
+        path.write_text(line * (size // len(line)))
+        files.append(str(path))
+    paper = directory / "paper.pdf"
+    paper.write_bytes(os.urandom(size))
+    files.append(str(paper))
+
+    images = []
+    for name in ("figure.png", "photo.jpg"):
+        path = directory / name
+        path.write_bytes(os.urandom(size))
+        images.append(str(path))
+    return files, images
+
+
+def ask_inputs(files: list[str], images: list[str]):
+    """Resolve one ask's files and images as the provider adapters do."""
+    resolve_files_for_llm(files, max_file_size=20 * 1024 * 1024)
+    resolve_images_for_multimodal_prompt("", images)
+
+
+def run(cache: BlobCache, asks: int, files: list[str], images: list[str]) -> float:
+    """Return the seconds taken to resolve inputs for every ask through cache."""
+    with patch("mcp_handley_lab.llm.common.blob_cache", cache):
+        start = time.perf_counter()
+        for _ in range(asks):
+            ask_inputs(files, images)
+        return time.perf_counter() - start
+
+
+def main():
+    asks = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    megabytes = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+
+    with tempfile.TemporaryDirectory() as directory:
+        files, images = write_files(Path(directory), megabytes)
+        uncached = run(BlobCache(max_bytes=0), asks, files, images)
+        cache = BlobCache(max_bytes=1024 * 1024 * 1024)
+        cached = run(cache, asks, files, images)
+
+    count = len(files) + len(images)
+    print(f"{asks} asks about {count} files of {megabytes:g} MB each")
+    print(f"{'blob cache':<12}{'total':>10}{'per ask':>12}")
+    for name, seconds in [("disabled", uncached), ("enabled", cached)]:
+        print(f"{name:<12}{seconds:>9.2f}s{seconds / asks * 1000:>10.1f}ms")
+    stats = cache.stats()
+    print(f"hits: {stats['hits']}, misses: {stats['misses']}")
+    print(f"speedup: {uncached / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Compare the memory cost of agent messages as Pydantic models and column-wise.
+
+Usage: python scripts/bench_message_memory.py [message_count]
+"""
+
+import sys
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from mcp_handley_lab.llm.memory import Message, MessageStore
+
+
+def measure(build: Callable[[], object]) -> int:
+    """Return the bytes still allocated by the object build() returns."""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    # Contents and timestamps are created up front and shared by both
+    # representations, so only the per-message overhead is measured.
+    start = datetime(2025, 1, 1)
+    rows = [
+        (
+            "user" if i % 2 == 0 else "assistant",
+            f"Message {i}: " + "lorem ipsum dolor sit amet " * 20,
+            start + timedelta(seconds=i),
+            120 + i % 50,
+            0.0004 * (i % 7),
+        )
+        for i in range(count)
+    ]
+    content_bytes = sum(sys.getsizeof(row[1]) for row in rows)
+
+    def as_models() -> list[Message]:
+        return [
+            Message(role=r, content=c, timestamp=t, tokens=k, cost=x)
+            for r, c, t, k, x in rows
+        ]
+
+    def as_store() -> MessageStore:
+        store = MessageStore()
+        for row in rows:
+            store.append_row(*row)
+        return store
+
+    models = measure(as_models)
+    store = measure(as_store)
+
+    print(f"{count:,} messages, {content_bytes / 1e6:.1f} MB of content text")
+    print(f"{'representation':<22}{'overhead':>12}{'per message':>14}")
+    for name, size in [("list[Message]", models), ("MessageStore", store)]:
+        print(f"{name:<22}{size / 1e6:>10.2f} MB{size / count:>12.0f} B")
+    print(f"reduction: {models / store:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Compare loading model configuration from YAML with the compiled model registry.
+
+Each provider's startup used to parse its models.yaml once for MODEL_CONFIGS,
+once for the default model and once more for pricing. This times that path
+against the registry with a cold and a warm on-disk cache, per provider.
+
+Usage: python scripts/bench_model_registry.py [repeats]
+"""
+
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+
+from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm import model_loader
+
+PROVIDERS = ["gemini", "openai", "claude", "grok"]
+
+
+def best_of(repeats: int, run: Callable[[], object]) -> float:
+    """Return the fastest of repeats runs, in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def yaml_loads(provider: str):
+    model_loader.build_model_configs_dict(provider)
+    model_loader.load_model_config(provider)
+    model_loader.load_model_config(provider)
+
+
+def registry_load(provider: str):
+    model_loader._registry.clear()
+    model_loader.get_provider_models(provider)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        settings.model_registry_cache_dir = cache_dir
+        results = []
+        for provider in PROVIDERS:
+            uncached = best_of(repeats, lambda p=provider: yaml_loads(p))
+            settings.model_registry_cache_dir = ""
+            cold = best_of(repeats, lambda p=provider: registry_load(p))
+            settings.model_registry_cache_dir = cache_dir
+            registry_load(provider)
+            warm = best_of(repeats, lambda p=provider: registry_load(p))
+            results.append((provider, uncached, cold, warm))
+
+    print(f"best of {repeats} runs, milliseconds per provider")
+    print(f"{'provider':<10}{'3x YAML':>10}{'compile':>10}{'disk cache':>12}")
+    for provider, uncached, cold, warm in results:
+        print(f"{provider:<10}{uncached:>10.2f}{cold:>10.2f}{warm:>12.2f}")
+    total_uncached = sum(r[1] for r in results)
+    total_warm = sum(r[3] for r in results)
+    print(f"speedup with a warm cache: {total_uncached / total_warm:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
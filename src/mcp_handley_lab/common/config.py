@@ -39,6 +39,96 @@ class Settings(BaseSettings):
         description="Path to Google Calendar OAuth2 token cache file.",
     )
 
+    # LLM agent memory
+    memory_backend: str = Field(
+        default="json",
+        description="Storage backend for LLM agent memory: 'json' files or 'sqlite'.",
+    )
+    memory_compaction_tokens: int = Field(
+        default=0,
+        description="Estimated history size in tokens above which old agent messages are summarised. 0 disables compaction.",
+    )
+    memory_compaction_keep_messages: int = Field(
+        default=20,
+        description="Number of most recent agent messages kept verbatim when compacting.",
+    )
+    memory_max_age_days: int = Field(
+        default=0,
+        description="Evict agents unused for this many days during maintenance. 0 keeps them.",
+    )
+    memory_max_agents: int = Field(
+        default=0,
+        description="Keep at most this many agents, evicting the least recently used. 0 is unlimited.",
+    )
+    memory_max_bytes: int = Field(
+        default=0,
+        description="Keep agent storage under this many bytes, evicting the least recently used. 0 is unlimited.",
+    )
+    memory_compress_after_days: int = Field(
+        default=0,
+        description="Gzip agents unused for this many days during maintenance. 0 never compresses.",
+    )
+
+    # LLM model registry
+    model_registry_cache_dir: str = Field(
+        default="~/.cache/mcp-handley-lab",
+        description="Directory for the compiled model registry cache. Empty disables the on-disk cache.",
+    )
+
+    # LLM rate limits
+    llm_rate_limits_file: str = Field(
+        default="",
+        description="YAML file mapping providers to requests_per_minute, tokens_per_minute and daily_cost_limit. Empty disables rate limiting.",
+    )
+    llm_rate_limit_max_wait: float = Field(
+        default=60.0,
+        description="Longest time in seconds a request waits for rate-limit capacity before failing.",
+    )
+
+    # LLM response cache
+    llm_response_cache: bool = Field(
+        default=False,
+        description="Cache responses to temperature-0 requests and reuse them for identical requests.",
+    )
+    llm_response_cache_ttl: int = Field(
+        default=7 * 24 * 3600,
+        description="Seconds a cached response stays valid. 0 never expires.",
+    )
+    llm_response_cache_max_bytes: int = Field(
+        default=100_000_000,
+        description="Keep cached responses under this many bytes, evicting the least recently used. 0 is unlimited.",
+    )
+    llm_response_cache_memory_entries: int = Field(
+        default=256,
+        description="Number of recently used cached responses also kept in memory.",
+    )
+
+    # File contents cache
+    llm_blob_cache_max_bytes: int = Field(
+        default=0,
+        description="Keep the contents of files read for LLM requests in memory up to this many bytes, evicting the least recently used. 0, the default, disables the cache; raise it (e.g. to 67108864 for 64MB) when repeated asks about the same files are worth the resident memory.",
+    )
+
+    # Anthropic prompt caching
+    claude_prompt_caching: bool = Field(
+        default=True,
+        description="Mark the system prompt, conversation history and files of Claude requests for prompt caching.",
+    )
+
+    # Gemini context caching
+    gemini_context_caching: bool = Field(
+        default=True,
+        description="Reuse large or repeated Gemini file sets and system instructions through explicit context caches.",
+    )
+    gemini_context_cache_ttl: int = Field(
+        default=3600,
+        description="Seconds a Gemini context cache is kept after it is created.",
+    )
+    gemini_context_cache_tokens: int = Field(
+        default=32768,
+        description="Estimated size in tokens above which a Gemini file set is cached on first use rather than when repeated.",
+    )
+
     @property
     def google_credentials_path(self) -> Path:
         """Get resolved path for Google credentials."""
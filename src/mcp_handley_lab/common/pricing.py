@@ -1,117 +1,407 @@
 """Cost tracking and pricing utilities for LLM usage."""
 
-from pathlib import Path
+from collections.abc import Mapping, Sequence
+from types import MappingProxyType
 from typing import Any
 
-import yaml
+import numpy as np
+from numpy.typing import ArrayLike
+from pydantic import BaseModel, ConfigDict, Field
 
+from mcp_handley_lab.llm.model_loader import get_provider_models
 
-class PricingCalculator:
-    """Calculates costs for various LLM models using YAML-based pricing configurations."""
 
-    @classmethod
-    def _load_pricing_config(cls, provider: str) -> dict[str, Any]:
-        """Load pricing configuration from unified model YAML file."""
-        current_dir = Path(__file__).parent
-        models_file = current_dir.parent / "llm" / provider / "models.yaml"
+def _threshold(value: float | str) -> float:
+    """Read a tier threshold, accepting the legacy '.inf' string."""
+    return float("inf") if value == ".inf" else float(value)
+
+
+def _tier_prices(
+    tiers: tuple[tuple[float, float], ...], tokens: np.ndarray
+) -> np.ndarray:
+    """Get the per-1M price of the first tier whose threshold covers each count.
+
+    Counts above every threshold are priced at zero.
+    """
+    thresholds = np.array([threshold for threshold, _ in tiers], dtype=np.float64)
+    prices = np.array([price for _, price in tiers] + [0.0], dtype=np.float64)
+    return prices[np.searchsorted(thresholds, tokens, side="left")]
+
+
+class ModelPrice(BaseModel):
+    """Immutable pricing for one model, compiled once from its models.yaml entry.
 
-        with open(models_file, encoding="utf-8") as f:
-            return yaml.safe_load(f)
+    Token prices are in dollars per million tokens; tiers are (threshold, price)
+    pairs in ascending threshold order.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    scheme: str = Field(
+        ...,
+        description="How the model is billed: 'token', 'tiered', 'modality', 'complex', 'per_image' or 'per_second'.",
+    )
+    input_per_1m: float = Field(default=0.0, description="Input token price.")
+    output_per_1m: float = Field(default=0.0, description="Output token price.")
+    cached_input_per_1m: float | None = Field(
+        default=None, description="Cached input token price, if cached input is billed."
+    )
+    cache_write_per_1m: float | None = Field(
+        default=None,
+        description="Price of input tokens written to the prompt cache, if billed.",
+    )
+    input_tiers: tuple[tuple[float, float], ...] = Field(
+        default=(), description="Input prices by prompt size."
+    )
+    output_tiers: tuple[tuple[float, float], ...] = Field(
+        default=(), description="Output prices by response size."
+    )
+    cached_input_tiers: tuple[tuple[float, float], ...] = Field(
+        default=(), description="Cached input prices by prompt size."
+    )
+    input_by_modality: tuple[tuple[str, float], ...] = Field(
+        default=(), description="Input token prices by input modality."
+    )
+    cached_input_by_modality: tuple[tuple[str, float], ...] = Field(
+        default=(), description="Cached input token prices by input modality."
+    )
+    image_output_pricing: tuple[tuple[str, float], ...] = Field(
+        default=(), description="Price per generated image by output quality."
+    )
+    price_per_image: float = Field(default=0.0, description="Price per image.")
+    price_per_second: float = Field(
+        default=0.0, description="Price per second of generated video."
+    )
 
     @classmethod
-    def calculate_cost(
-        cls,
-        model: str,
+    def from_config(cls, model_config: dict[str, Any]) -> "ModelPrice":
+        """Compile a model's pricing from its models.yaml entry."""
+        pricing_type = model_config.get("pricing_type")
+
+        if pricing_type == "per_image":
+            return cls(
+                scheme="per_image",
+                price_per_image=model_config.get("price_per_image", 0.0),
+            )
+        if pricing_type == "per_second":
+            return cls(
+                scheme="per_second",
+                price_per_second=model_config.get("price_per_second", 0.0),
+            )
+        if "input_tiers" in model_config:
+            return cls(
+                scheme="tiered",
+                input_tiers=tuple(
+                    (_threshold(tier["threshold"]), tier["price"])
+                    for tier in model_config["input_tiers"]
+                ),
+                output_tiers=tuple(
+                    (_threshold(tier["threshold"]), tier["price"])
+                    for tier in model_config.get("output_tiers", [])
+                ),
+                cached_input_tiers=tuple(
+                    (_threshold(tier["threshold"]), tier["price"])
+                    for tier in model_config.get("cached_input_tiers", [])
+                ),
+            )
+        if "input_by_modality" in model_config:
+            return cls(
+                scheme="modality",
+                input_by_modality=tuple(model_config["input_by_modality"].items()),
+                cached_input_by_modality=tuple(
+                    model_config.get("cached_input_by_modality", {}).items()
+                ),
+                output_per_1m=model_config.get("output_per_1m", 0.0),
+            )
+        if pricing_type == "complex":
+            return cls(
+                scheme="complex",
+                input_by_modality=(
+                    ("text", model_config["text_input_per_1m"]),
+                    ("image", model_config["image_input_per_1m"]),
+                ),
+                cached_input_by_modality=(
+                    ("text", model_config["cached_text_input_per_1m"]),
+                    ("image", model_config["cached_image_input_per_1m"]),
+                ),
+                image_output_pricing=tuple(
+                    model_config["image_output_pricing"].items()
+                ),
+            )
+        return cls(
+            scheme="token",
+            input_per_1m=model_config.get("input_per_1m", 0.0),
+            output_per_1m=model_config.get("output_per_1m", 0.0),
+            cached_input_per_1m=model_config.get("cached_input_per_1m"),
+            cache_write_per_1m=model_config.get("cache_write_per_1m"),
+        )
+
+    def cost(
+        self,
         input_tokens: int = 0,
         output_tokens: int = 0,
-        provider: str = "gemini",
         input_modality: str = "text",
         output_quality: str = "medium",
         cached_input_tokens: int = 0,
         images_generated: int = 0,
         seconds_generated: int = 0,
+        cache_write_input_tokens: int = 0,
     ) -> float:
-        """Calculate cost using YAML-based pricing configurations."""
-        config = cls._load_pricing_config(provider)
+        """Calculate the cost of a single request.
 
-        models = config.get("models", {})
-        if model not in models:
-            raise ValueError(
-                f"Model '{model}' not found in pricing config for provider '{provider}'"
-            )
-
-        model_config = models[model]
+        Cached and cache-write input tokens are billed on top of input_tokens,
+        as Anthropic reports them. Tiered prices are chosen by the whole prompt,
+        cached tokens included.
+        """
         total_cost = 0.0
 
-        pricing_type = model_config.get("pricing_type")
+        if self.scheme == "per_image":
+            return images_generated * self.price_per_image
 
-        if pricing_type == "per_image":
-            price_per_image = model_config.get("price_per_image", 0.0)
-            return images_generated * price_per_image
+        elif self.scheme == "per_second":
+            return seconds_generated * self.price_per_second
 
-        elif pricing_type == "per_second":
-            price_per_second = model_config.get("price_per_second", 0.0)
-            return seconds_generated * price_per_second
+        elif self.scheme == "tiered":
+            prompt_tokens = input_tokens + cached_input_tokens
+            for threshold, price in self.input_tiers:
+                if prompt_tokens <= threshold:
+                    total_cost += (input_tokens / 1_000_000) * price
+                    break
 
-        elif "input_tiers" in model_config:
-            for tier in model_config["input_tiers"]:
-                threshold = (
-                    float("inf") if tier["threshold"] == ".inf" else tier["threshold"]
-                )
-                if input_tokens <= threshold:
-                    total_cost += (input_tokens / 1_000_000) * tier["price"]
+            for threshold, price in self.cached_input_tiers:
+                if prompt_tokens <= threshold:
+                    total_cost += (cached_input_tokens / 1_000_000) * price
                     break
 
-            for tier in model_config.get("output_tiers", []):
-                threshold = (
-                    float("inf") if tier["threshold"] == ".inf" else tier["threshold"]
-                )
+            for threshold, price in self.output_tiers:
                 if output_tokens <= threshold:
-                    total_cost += (output_tokens / 1_000_000) * tier["price"]
+                    total_cost += (output_tokens / 1_000_000) * price
                     break
 
-        elif "input_by_modality" in model_config:
-            modality_price = model_config["input_by_modality"].get(input_modality, 0.30)
+        elif self.scheme == "modality":
+            modality_price = dict(self.input_by_modality).get(input_modality, 0.30)
+            cached_price = dict(self.cached_input_by_modality).get(input_modality, 0.0)
             total_cost += (input_tokens / 1_000_000) * modality_price
-            total_cost += (output_tokens / 1_000_000) * model_config.get(
-                "output_per_1m", 0.0
-            )
+            total_cost += (cached_input_tokens / 1_000_000) * cached_price
+            total_cost += (output_tokens / 1_000_000) * self.output_per_1m
 
-        elif pricing_type == "complex":
-            if model == "gpt-image-1":
-                if input_modality == "text":
-                    total_cost += (input_tokens / 1_000_000) * model_config[
-                        "text_input_per_1m"
-                    ]
-                    total_cost += (cached_input_tokens / 1_000_000) * model_config[
-                        "cached_text_input_per_1m"
-                    ]
-                elif input_modality == "image":
-                    total_cost += (input_tokens / 1_000_000) * model_config[
-                        "image_input_per_1m"
-                    ]
-                    total_cost += (cached_input_tokens / 1_000_000) * model_config[
-                        "cached_image_input_per_1m"
-                    ]
-
-                if images_generated > 0:
-                    image_pricing = model_config["image_output_pricing"]
-                    per_image_cost = image_pricing.get(output_quality, 0.04)
-                    total_cost += images_generated * per_image_cost
+        elif self.scheme == "complex":
+            input_prices = dict(self.input_by_modality)
+            if input_modality in input_prices:
+                cached_price = dict(self.cached_input_by_modality)[input_modality]
+                total_cost += (input_tokens / 1_000_000) * input_prices[input_modality]
+                total_cost += (cached_input_tokens / 1_000_000) * cached_price
+
+            if images_generated > 0:
+                per_image_cost = dict(self.image_output_pricing).get(
+                    output_quality, 0.04
+                )
+                total_cost += images_generated * per_image_cost
 
         else:
-            input_price = model_config.get("input_per_1m", 0.0)
-            output_price = model_config.get("output_per_1m", 0.0)
+            total_cost += (input_tokens / 1_000_000) * self.input_per_1m
+            total_cost += (output_tokens / 1_000_000) * self.output_per_1m
 
-            total_cost += (input_tokens / 1_000_000) * input_price
-            total_cost += (output_tokens / 1_000_000) * output_price
+            if cached_input_tokens > 0 and self.cached_input_per_1m is not None:
+                total_cost += (
+                    cached_input_tokens / 1_000_000
+                ) * self.cached_input_per_1m
 
-            if cached_input_tokens > 0 and "cached_input_per_1m" in model_config:
-                cached_price = model_config["cached_input_per_1m"]
-                total_cost += (cached_input_tokens / 1_000_000) * cached_price
+            if cache_write_input_tokens > 0 and self.cache_write_per_1m is not None:
+                total_cost += (
+                    cache_write_input_tokens / 1_000_000
+                ) * self.cache_write_per_1m
 
         return total_cost
 
+    def costs(
+        self,
+        input_tokens: np.ndarray,
+        output_tokens: np.ndarray,
+        input_modality: str = "text",
+        output_quality: str = "medium",
+        cached_input_tokens: np.ndarray | None = None,
+        images_generated: np.ndarray | None = None,
+        seconds_generated: np.ndarray | None = None,
+        cache_write_input_tokens: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Calculate the cost of many requests to this model as one array operation.
+
+        Matches ``cost`` record by record; omitted columns count as zero.
+        """
+        zeros = np.zeros_like(input_tokens, dtype=np.float64)
+        cached = zeros if cached_input_tokens is None else cached_input_tokens
+        images = zeros if images_generated is None else images_generated
+        seconds = zeros if seconds_generated is None else seconds_generated
+        writes = zeros if cache_write_input_tokens is None else cache_write_input_tokens
+
+        if self.scheme == "per_image":
+            return images * self.price_per_image
+        if self.scheme == "per_second":
+            return seconds * self.price_per_second
+        if self.scheme == "tiered":
+            prompt_tokens = input_tokens + cached
+            return (
+                (input_tokens / 1_000_000)
+                * _tier_prices(self.input_tiers, prompt_tokens)
+                + (cached / 1_000_000)
+                * _tier_prices(self.cached_input_tiers, prompt_tokens)
+                + (output_tokens / 1_000_000)
+                * _tier_prices(self.output_tiers, output_tokens)
+            )
+        if self.scheme == "modality":
+            modality_price = dict(self.input_by_modality).get(input_modality, 0.30)
+            cached_price = dict(self.cached_input_by_modality).get(input_modality, 0.0)
+            return (
+                (input_tokens / 1_000_000) * modality_price
+                + (cached / 1_000_000) * cached_price
+                + (output_tokens / 1_000_000) * self.output_per_1m
+            )
+        if self.scheme == "complex":
+            input_price = dict(self.input_by_modality).get(input_modality, 0.0)
+            cached_price = dict(self.cached_input_by_modality).get(input_modality, 0.0)
+            per_image_cost = dict(self.image_output_pricing).get(output_quality, 0.04)
+            return (
+                (input_tokens / 1_000_000) * input_price
+                + (cached / 1_000_000) * cached_price
+                + images * per_image_cost
+            )
+        return (
+            (input_tokens / 1_000_000) * self.input_per_1m
+            + (output_tokens / 1_000_000) * self.output_per_1m
+            + (cached / 1_000_000) * (self.cached_input_per_1m or 0.0)
+            + (writes / 1_000_000) * (self.cache_write_per_1m or 0.0)
+        )
+
+
+class PricingCalculator:
+    """Calculates costs for various LLM models using YAML-based pricing configurations.
+
+    Each provider's models.yaml is compiled into a read-only table of
+    ``ModelPrice`` entries on first use, from the shared model registry, and
+    recompiled only when the registry sees the file's contents change.
+    """
+
+    _tables: dict[str, tuple[str, Mapping[str, ModelPrice]]] = {}
+
+    @classmethod
+    def get_pricing_table(cls, provider: str) -> Mapping[str, ModelPrice]:
+        """Get the compiled pricing for a provider's models, keyed by model name."""
+        registry = get_provider_models(provider)
+        cached = cls._tables.get(provider)
+        if cached is not None and cached[0] == registry.file_hash:
+            return cached[1]
+
+        table = MappingProxyType(
+            {
+                model: ModelPrice.from_config(model_config)
+                for model, model_config in registry.config["models"].items()
+            }
+        )
+        cls._tables[provider] = (registry.file_hash, table)
+        return table
+
+    @classmethod
+    def get_model_price(cls, model: str, provider: str = "gemini") -> ModelPrice:
+        """Get a model's compiled pricing. Raises ValueError if it is not configured."""
+        table = cls.get_pricing_table(provider)
+        if model not in table:
+            raise ValueError(
+                f"Model '{model}' not found in pricing config for provider '{provider}'"
+            )
+        return table[model]
+
+    @classmethod
+    def get_batch_multiplier(cls, provider: str) -> float:
+        """Get the fraction of the standard price charged for batch API requests.
+
+        Providers without a ``batch_discount`` in models.yaml are charged in full.
+        """
+        return 1.0 - get_provider_models(provider).config.get("batch_discount", 0.0)
+
+    @classmethod
+    def calculate_cost(
+        cls,
+        model: str,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        provider: str = "gemini",
+        input_modality: str = "text",
+        output_quality: str = "medium",
+        cached_input_tokens: int = 0,
+        images_generated: int = 0,
+        seconds_generated: int = 0,
+        batch: bool = False,
+        cache_write_input_tokens: int = 0,
+    ) -> float:
+        """Calculate cost using YAML-based pricing configurations.
+
+        With batch, the provider's batch API discount is applied.
+        """
+        cost = cls.get_model_price(model, provider).cost(
+            input_tokens,
+            output_tokens,
+            input_modality,
+            output_quality,
+            cached_input_tokens,
+            images_generated,
+            seconds_generated,
+            cache_write_input_tokens,
+        )
+        return cost * cls.get_batch_multiplier(provider) if batch else cost
+
+    @classmethod
+    def calculate_costs(
+        cls,
+        models: str | Sequence[str],
+        input_tokens: ArrayLike,
+        output_tokens: ArrayLike = 0,
+        provider: str = "gemini",
+        input_modality: str = "text",
+        output_quality: str = "medium",
+        cached_input_tokens: ArrayLike = 0,
+        images_generated: ArrayLike = 0,
+        seconds_generated: ArrayLike = 0,
+        batch: bool = False,
+        cache_write_input_tokens: ArrayLike = 0,
+    ) -> np.ndarray:
+        """Calculate the costs of many usage records of one provider at once.
+
+        ``models`` is either one model name for every record or a model name per
+        record; the other arguments are per-record counts or scalars applied to
+        every record. Records are priced in one vectorised pass per distinct
+        model, with the batch API discount applied if batch. Returns a float64
+        array of costs in record order.
+        """
+        input_tokens = np.asarray(input_tokens, dtype=np.float64)
+        shape = input_tokens.shape
+
+        def column(values: ArrayLike) -> np.ndarray:
+            return np.broadcast_to(np.asarray(values, dtype=np.float64), shape)
+
+        columns = {
+            "output_tokens": column(output_tokens),
+            "cached_input_tokens": column(cached_input_tokens),
+            "images_generated": column(images_generated),
+            "seconds_generated": column(seconds_generated),
+            "cache_write_input_tokens": column(cache_write_input_tokens),
+        }
+        names, inverse = np.unique(
+            np.broadcast_to(np.asarray(models, dtype=str), shape), return_inverse=True
+        )
+        inverse = inverse.reshape(shape)
+
+        costs = np.zeros(shape, dtype=np.float64)
+        for i, model in enumerate(names):
+            rows = inverse == i
+            costs[rows] = cls.get_model_price(str(model), provider).costs(
+                input_tokens[rows],
+                input_modality=input_modality,
+                output_quality=output_quality,
+                **{name: values[rows] for name, values in columns.items()},
+            )
+        return costs * cls.get_batch_multiplier(provider) if batch else costs
+
     @classmethod
     def format_cost(cls, cost: float) -> str:
         """Format cost for display."""
@@ -142,6 +432,19 @@ def calculate_cost(
     )
 
 
+def calculate_costs(
+    models: str | Sequence[str],
+    input_tokens: ArrayLike,
+    output_tokens: ArrayLike = 0,
+    provider: str = "gemini",
+    **kwargs,
+) -> np.ndarray:
+    """Global function that delegates to PricingCalculator.calculate_costs."""
+    return PricingCalculator.calculate_costs(
+        models, input_tokens, output_tokens, provider, **kwargs
+    )
+
+
 def format_usage(input_tokens: int, output_tokens: int, cost: float) -> str:
     """Global function that delegates to PricingCalculator.format_usage."""
     return PricingCalculator.format_usage(input_tokens, output_tokens, cost)
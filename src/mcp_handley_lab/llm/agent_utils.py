@@ -12,6 +12,20 @@ def create_agent(agent_name: str, system_prompt: str = "") -> str:
     return f"✅ Agent '{agent_name}' created successfully{system_prompt_info}!"
 
 
+def fork_agent(agent_name: str, new_agent_name: str, length: int = -1) -> str:
+    """Branch a new agent off the first length messages of an existing one.
+
+    A negative length forks from the whole current history.
+    """
+    agent = memory_manager.fork_agent(
+        agent_name, new_agent_name, length if length >= 0 else None
+    )
+    return (
+        f"✅ Agent '{new_agent_name}' forked from '{agent_name}' "
+        f"after {agent.history_length} messages!"
+    )
+
+
 def list_agents() -> str:
     """List all agents with their statistics."""
     agents = memory_manager.list_agents()
@@ -29,6 +43,8 @@ def list_agents() -> str:
         result += f"- Cost: ${stats['total_cost']:.4f}\n"
         if stats["system_prompt"]:
             result += f"- System Prompt: {stats['system_prompt']}\n"
+        if agent.parent:
+            result += f"- Forked From: {agent.parent}\n"
         result += "\n"
 
     return result
@@ -84,3 +100,19 @@ def delete_agent(agent_name: str) -> str:
 def get_response(agent_name: str, index: int = -1) -> str:
     """Get a message from an agent's conversation history by index."""
     return memory_manager.get_response(agent_name, index)
+
+
+def search_messages(query: str, agent_name: str = "", limit: int = 10) -> str:
+    """Search all agents' conversations for messages containing the query words."""
+    hits = memory_manager.search(query, agent_name or None, limit)
+
+    if not hits:
+        return f"No messages found matching '{query}'."
+
+    result = f"🔍 **Search Results: {query}**\n\n"
+    for hit in hits:
+        result += f"**{hit.agent_name}** [{hit.index}] {hit.role.title()} "
+        result += f"(score {hit.score:.2f})\n"
+        result += f"{hit.snippet}\n\n"
+
+    return result
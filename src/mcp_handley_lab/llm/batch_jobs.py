@@ -0,0 +1,299 @@
+"""Provider batch API jobs: discounted bulk requests submitted now, collected later."""
+
+import inspect
+import json
+import uuid
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from pydantic import Field
+
+from mcp_handley_lab.llm.common import load_prompt_text
+from mcp_handley_lab.llm.memory import atomic_write, memory_manager
+from mcp_handley_lab.llm.shared import (
+    BATCH_ITEM_PARAMETERS,
+    BATCH_PARAMETERS,
+    extract_response_metadata,
+    record_usage,
+    result_from_metadata,
+)
+from mcp_handley_lab.shared.models import (
+    BatchItemResult,
+    BatchJob,
+    BatchResult,
+    LLMResult,
+)
+
+# Statuses after which a job is no longer polled
+FINISHED_STATUSES = ("completed", "failed", "cancelled", "expired")
+
+# ask parameters that don't apply to memoryless, non-interactive batch requests
+_JOB_EXCLUDED_PARAMETERS = BATCH_ITEM_PARAMETERS | {"history_budget", "cache_response"}
+
+
+class BatchProvider(NamedTuple):
+    """A provider's batch API, behind the calls the job subsystem makes.
+
+    request_line builds one JSONL line from (custom_id, prompt, model,
+    system_instruction, params) with the provider's adapter request building.
+    submit uploads a JSONL file of such lines for (path, model, job_id) and
+    returns the provider's job id. poll gets a job's status as one of
+    "in_progress" or FINISHED_STATUSES. results maps the custom id of each
+    finished request to its adapter response data, or to an error message.
+    """
+
+    request_line: Callable[[str, str, str, str | None, dict[str, Any]], dict]
+    submit: Callable[[Path, str, str], str]
+    poll: Callable[[str], str]
+    results: Callable[[str], dict[str, dict[str, Any] | str]]
+
+
+class BatchJobStore:
+    """Batch jobs kept as JSON state files under ``batch_jobs`` in storage_dir.
+
+    Each job's JSONL request file is kept beside its state, as submitted.
+    """
+
+    def __init__(self, storage_dir: str = ".mcp_handley_lab"):
+        self.jobs_dir = Path(storage_dir) / "batch_jobs"
+
+    def requests_file(self, job_id: str) -> Path:
+        """Get the path of a job's JSONL request file."""
+        return self.jobs_dir / f"{job_id}.jsonl"
+
+    def save(self, job: BatchJob):
+        """Write a job's state, replacing any earlier state."""
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write(
+            self.jobs_dir / f"{job.job_id}.json", job.model_dump_json(indent=2).encode()
+        )
+
+    def get(self, job_id: str) -> BatchJob:
+        """Get a job's state. Raises ValueError if there is no such job."""
+        state_file = self.jobs_dir / f"{job_id}.json"
+        if not state_file.exists():
+            raise ValueError(f"Batch job '{job_id}' not found")
+        return BatchJob.model_validate_json(state_file.read_text())
+
+    def list_jobs(self, provider: str = "") -> list[BatchJob]:
+        """Get every job, or those of one provider, oldest first."""
+        jobs = [
+            BatchJob.model_validate_json(state_file.read_text())
+            for state_file in self.jobs_dir.glob("*.json")
+        ]
+        return sorted(
+            (job for job in jobs if not provider or job.provider == provider),
+            key=lambda job: job.created_at,
+        )
+
+
+def submit_batch_job(
+    prompts: list[str],
+    prompt_files: list[str],
+    output_dir: str,
+    model: str,
+    provider: str,
+    batch_provider: BatchProvider,
+    store: BatchJobStore | None = None,
+    **kwargs,
+) -> BatchJob:
+    """Write a JSONL request file for many prompts and submit it as a batch job.
+
+    Items are the prompts followed by the prompt files, each sent without
+    agent memory with the shared parameters in kwargs. prompt_vars apply to
+    every item; a system prompt or system prompt file applies to every item.
+    """
+    store = store or batch_job_store
+    prompt_vars = kwargs.pop("prompt_vars", None)
+    system_prompt = kwargs.pop("system_prompt", None)
+    system_prompt_file = kwargs.pop("system_prompt_file", None)
+    system_prompt_vars = kwargs.pop("system_prompt_vars", None)
+
+    items = [(prompt, None) for prompt in prompts] + [
+        (None, prompt_file) for prompt_file in prompt_files
+    ]
+    if not items:
+        raise ValueError("Provide at least one prompt or prompt file")
+
+    system_instruction = None
+    if system_prompt or system_prompt_file:
+        system_instruction = load_prompt_text(
+            system_prompt, system_prompt_file, system_prompt_vars
+        )
+
+    job_id = f"{provider}-{uuid.uuid4().hex[:12]}"
+    lines = [
+        batch_provider.request_line(
+            f"{index:04d}",
+            load_prompt_text(prompt, prompt_file, prompt_vars),
+            model,
+            system_instruction,
+            kwargs,
+        )
+        for index, (prompt, prompt_file) in enumerate(items)
+    ]
+    requests_file = store.requests_file(job_id)
+    requests_file.parent.mkdir(parents=True, exist_ok=True)
+    requests_file.write_text("".join(json.dumps(line) + "\n" for line in lines))
+
+    job = BatchJob(
+        job_id=job_id,
+        provider=provider,
+        model=model,
+        provider_job_id=batch_provider.submit(requests_file, model, job_id),
+        output_dir=output_dir,
+        prompt_files=[prompt_file or "" for _, prompt_file in items],
+        created_at=datetime.now().isoformat(),
+    )
+    store.save(job)
+    return job
+
+
+def collect_batch_results(
+    job: BatchJob, batch_provider: BatchProvider
+) -> list[LLMResult | str]:
+    """Fetch a finished job's responses as LLMResults priced at batch rates.
+
+    Returns an LLMResult, or the error message, for each item in order. Each
+    response's usage is recorded in the usage ledger.
+    """
+    responses = batch_provider.results(job.provider_job_id)
+    results = []
+    for index in range(len(job.prompt_files)):
+        response = responses.get(f"{index:04d}", "No response returned by the provider")
+        if isinstance(response, str):
+            results.append(response)
+            continue
+        metadata = extract_response_metadata(
+            response, job.model, job.provider, batch=True
+        )
+        record_usage(metadata, job.model, job.provider, "", 0.0)
+        results.append(result_from_metadata(metadata, job.model))
+    return results
+
+
+def refresh_batch_job(
+    job_id: str, batch_provider: BatchProvider, store: BatchJobStore | None = None
+) -> BatchJob:
+    """Poll an unfinished job, collecting its results once it has completed.
+
+    On completion each response is written to the job's output_dir as
+    NNNN.txt, numbered by the item's position, and the job keeps the per-item
+    usage with aggregate cost and the time from submission to completion.
+    """
+    store = store or batch_job_store
+    job = store.get(job_id)
+    if job.status in FINISHED_STATUSES:
+        return job
+
+    status = batch_provider.poll(job.provider_job_id)
+    if status not in FINISHED_STATUSES:
+        return job
+
+    finished_at = datetime.now()
+    update = {"status": status, "finished_at": finished_at.isoformat()}
+    if status == "completed":
+        output_path = Path(job.output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        items = []
+        for index, (prompt_file, result) in enumerate(
+            zip(
+                job.prompt_files,
+                collect_batch_results(job, batch_provider),
+                strict=True,
+            )
+        ):
+            if isinstance(result, str):
+                items.append(
+                    BatchItemResult(index=index, prompt_file=prompt_file, error=result)
+                )
+                continue
+            output_file = output_path / f"{index:04d}.txt"
+            output_file.write_text(result.content)
+            items.append(
+                BatchItemResult(
+                    index=index,
+                    prompt_file=prompt_file,
+                    output_file=str(output_file),
+                    usage=result.usage,
+                    finish_reason=result.finish_reason,
+                )
+            )
+
+        usages = [item.usage for item in items if item.usage is not None]
+        wall_time = finished_at - datetime.fromisoformat(job.created_at)
+        update["result"] = BatchResult(
+            items=items,
+            succeeded=len(usages),
+            failed=len(items) - len(usages),
+            total_input_tokens=sum(usage.input_tokens for usage in usages),
+            total_output_tokens=sum(usage.output_tokens for usage in usages),
+            total_cost=sum(usage.cost for usage in usages),
+            wall_time_ms=int(wall_time.total_seconds() * 1000),
+        )
+
+    job = job.model_copy(update=update)
+    store.save(job)
+    return job
+
+
+def batch_job_tools(
+    ask: Callable[..., LLMResult],
+    provider: str,
+    batch_provider: BatchProvider,
+    resolve_model: Callable[[str], str] | None = None,
+) -> tuple[Callable[..., BatchJob], Callable[..., BatchJob]]:
+    """Build the MCP tools submitting and checking a provider's batch jobs.
+
+    The submit tool takes prompts, prompt files and an output directory in
+    place of ask's per-request parameters, sharing ask's other parameters
+    across every item. The status tool polls a job by its job_id.
+    """
+    signature = inspect.signature(ask)
+    signature = signature.replace(
+        parameters=[
+            parameter
+            for parameter in BATCH_PARAMETERS
+            if parameter.name != "concurrency"
+        ]
+        + [
+            parameter
+            for name, parameter in signature.parameters.items()
+            if name not in _JOB_EXCLUDED_PARAMETERS
+        ],
+        return_annotation=BatchJob,
+    )
+
+    def submit_batch(*args, **kwargs) -> BatchJob:
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        params = dict(arguments.arguments)
+        if resolve_model is not None:
+            params["model"] = resolve_model(params["model"])
+        return submit_batch_job(
+            provider=provider, batch_provider=batch_provider, **params
+        )
+
+    submit_batch.__signature__ = signature
+    submit_batch.__doc__ = f"Submit many prompts as a {provider} batch API job."
+
+    def batch_status(
+        job_id: str = Field(
+            ..., description="The job_id returned when the batch was submitted."
+        ),
+    ) -> BatchJob:
+        job = batch_job_store.get(job_id)
+        if job.provider != provider:
+            raise ValueError(f"Batch job '{job_id}' belongs to {job.provider}")
+        return refresh_batch_job(job_id, batch_provider)
+
+    batch_status.__doc__ = (
+        f"Check a {provider} batch job, collecting its results once complete."
+    )
+    return submit_batch, batch_status
+
+
+# Global batch job store, beside agent memory
+batch_job_store = BatchJobStore(str(memory_manager.storage_dir))
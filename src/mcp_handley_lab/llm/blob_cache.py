@@ -0,0 +1,97 @@
+"""Process-wide cache of file contents read for LLM requests."""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+
+from mcp_handley_lab.common.config import settings
+
+
+class BlobCache:
+    """Decoded text, base64 and raw payloads of files, keyed by (path, mtime, size).
+
+    A file edited since it was read gets a new key and is read again. The
+    least recently used entries are evicted once the cached payloads exceed
+    ``max_bytes`` (counted in characters or bytes); a max_bytes of 0 disables caching.
+    Concurrent requests for a file being loaded wait for that load rather than
+    reading the file again.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, str | bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._loading: dict[tuple, threading.Lock] = {}
+
+    def get(
+        self, path: Path, form: str, load: Callable[[Path], str | bytes]
+    ) -> str | bytes:
+        """Get a file's contents in a form such as "text" or "base64".
+
+        load reads the file into that form on a miss.
+        """
+        stat = path.stat()
+        key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size, form)
+        value = self._lookup(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        try:
+            with loading:
+                # Another request may have loaded the file while this one waited
+                value = self._lookup(key)
+                if value is not None:
+                    return value
+                with self._lock:
+                    self.misses += 1
+                value = load(path)
+                if len(value) <= self.max_bytes:
+                    self._store(key, value)
+                return value
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+
+    def _lookup(self, key: tuple) -> str | bytes | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def _store(self, key: tuple, value: str | bytes):
+        with self._lock:
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict[str, int]:
+        """Get the hit and miss counts and the cache's current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+    def clear(self):
+        """Remove every cached payload and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# Global blob cache shared by every provider in the process
+blob_cache = BlobCache(max_bytes=settings.llm_blob_cache_max_bytes)
@@ -1,25 +1,41 @@
 """Claude LLM tool for AI interactions via MCP."""
 
+import json
 import threading
+from pathlib import Path
 from typing import Any
 
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 from mcp.server.fastmcp import FastMCP
 from pydantic import Field
 
 from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm.batch_jobs import BatchProvider, batch_job_tools
 from mcp_handley_lab.llm.common import (
     build_server_info,
+    estimate_tokens,
     load_provider_models,
     resolve_files_for_llm,
     resolve_images_for_multimodal_prompt,
 )
+from mcp_handley_lab.llm.image_processing import ImageTarget, image_target
 from mcp_handley_lab.llm.memory import memory_manager
 from mcp_handley_lab.llm.model_loader import (
+    get_provider_models,
     get_structured_model_listing,
 )
-from mcp_handley_lab.llm.shared import process_llm_request
-from mcp_handley_lab.shared.models import LLMResult, ModelListing, ServerInfo
+from mcp_handley_lab.llm.shared import (
+    async_ask_batch_tool,
+    async_ask_tool,
+    process_llm_request,
+)
+from mcp_handley_lab.llm.usage import build_usage_report
+from mcp_handley_lab.shared.models import (
+    LLMResult,
+    ModelListing,
+    ServerInfo,
+    UsageReport,
+)
 
 mcp = FastMCP("Claude Tool")
 
@@ -40,9 +56,28 @@ def _get_client() -> Anthropic:
     return _client
 
 
+_async_client: AsyncAnthropic | None = None
+
+
+def _get_async_client() -> AsyncAnthropic:
+    """Get or create the global AsyncAnthropic client with thread safety."""
+    global _async_client
+    with _client_lock:
+        if _async_client is None:
+            try:
+                _async_client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+            except Exception as e:
+                raise RuntimeError(f"Failed to initialize Claude client: {e}") from e
+    return _async_client
+
+
 # Load model configurations using shared loader
 MODEL_CONFIGS, DEFAULT_MODEL, _get_model_config = load_provider_models("claude")
 
+# Shortest prefix the prompt cache stores, unless a model sets cache_min_tokens;
+# also used for model ids that models.yaml doesn't list
+DEFAULT_CACHE_MIN_TOKENS = 1024
+
 
 def _resolve_model_alias(model: str) -> str:
     """Resolve model aliases to full model names."""
@@ -110,13 +145,13 @@ def _resolve_files(files: list[str]) -> LLMResult:
 
 
 def _resolve_images_to_content_blocks(
-    images: list[str] | None = None,
+    images: list[str] | None = None, target: ImageTarget | None = None
 ) -> list[dict[str, Any]]:
-    """Resolve image inputs to Claude content blocks."""
+    """Resolve image inputs to Claude content blocks, downsized for target if given."""
     if images is None:
         images = []
     # Use standardized image processing
-    _, image_blocks = resolve_images_for_multimodal_prompt("", images)
+    _, image_blocks = resolve_images_for_multimodal_prompt("", images, target)
 
     # Convert to Claude's specific format
     claude_image_blocks = []
@@ -135,14 +170,50 @@ def _resolve_images_to_content_blocks(
     return claude_image_blocks
 
 
-def _claude_generation_adapter(
+def _cached_text(text: str) -> list[dict[str, Any]]:
+    """Wrap text in a content block list ending at a prompt cache breakpoint."""
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
+def _add_cache_breakpoints(
+    messages: list[dict[str, Any]],
+    system_instruction: str | None,
+    prompt: str,
+    file_content: str,
+    min_tokens: int,
+):
+    """Mark the stable prefix of a conversation for Anthropic prompt caching.
+
+    The last history message gets a breakpoint so the next turn reads the
+    whole history from the cache. Files in the new message are moved ahead
+    of the prompt and given their own breakpoint, so another question about
+    the same files reuses them. Prefixes shorter than min_tokens can't be
+    cached and are left unmarked.
+    """
+    prefix_tokens = estimate_tokens(system_instruction or "")
+    if len(messages) > 1:
+        prefix_tokens += sum(
+            estimate_tokens(message["content"]) for message in messages[:-1]
+        )
+        if prefix_tokens >= min_tokens:
+            messages[-2]["content"] = _cached_text(messages[-2]["content"])
+
+    if file_content:
+        prefix_tokens += estimate_tokens(file_content)
+        if prefix_tokens >= min_tokens:
+            messages[-1]["content"] = _cached_text(file_content) + [
+                {"type": "text", "text": prompt}
+            ]
+
+
+def _claude_request_params(
     prompt: str,
     model: str,
     history: list[dict[str, str]],
     system_instruction: str,
-    **kwargs,
+    kwargs: dict[str, Any],
 ) -> dict[str, Any]:
-    """Claude-specific text generation function for the shared processor."""
+    """Build Messages API parameters for a text generation request."""
     # Extract Claude-specific parameters
     temperature = kwargs.get("temperature", 1.0)
     files = kwargs.get("files")
@@ -155,6 +226,9 @@ def _claude_generation_adapter(
     output_tokens = (
         min(max_output_tokens, max_output) if max_output_tokens > 0 else max_output
     )
+    # MODEL_CONFIGS keeps only token limits, so read the minimum from the YAML
+    model_info = get_provider_models("claude").config["models"].get(resolved_model, {})
+    cache_min_tokens = model_info.get("cache_min_tokens", DEFAULT_CACHE_MIN_TOKENS)
 
     # Resolve file contents
     file_content = _resolve_files(files)
@@ -169,9 +243,12 @@ def _claude_generation_adapter(
 
     # Add current user message
     claude_history.append({"role": "user", "content": user_content})
+    if settings.claude_prompt_caching:
+        _add_cache_breakpoints(
+            claude_history, system_instruction, prompt, file_content, cache_min_tokens
+        )
 
-    # Resolve model alias and prepare request parameters
-    resolved_model = _resolve_model_alias(model)
+    # Prepare request parameters
     request_params = {
         "model": resolved_model,
         "messages": claude_history,
@@ -180,17 +257,19 @@ def _claude_generation_adapter(
         "timeout": 599,
     }
 
-    # Add system instruction if provided
+    # Add system instruction if provided, as a cached block when marked
     if system_instruction:
         request_params["system"] = system_instruction
+        if (
+            settings.claude_prompt_caching
+            and estimate_tokens(system_instruction) >= cache_min_tokens
+        ):
+            request_params["system"] = _cached_text(system_instruction)
+    return request_params
 
-    # Make API call
-    try:
-        response = _get_client().messages.create(**request_params)
-    except Exception as e:
-        # Convert all API errors to ValueError for consistent error handling
-        raise ValueError(f"Claude API error: {str(e)}") from e
 
+def _message_data(response) -> dict[str, Any]:
+    """Extract the response text and metadata from a Claude message."""
     if not response.content or not response.content[0].text:
         raise RuntimeError("No response text generated")
 
@@ -210,6 +289,114 @@ def _claude_generation_adapter(
     }
 
 
+def _claude_generation_adapter(
+    prompt: str,
+    model: str,
+    history: list[dict[str, str]],
+    system_instruction: str,
+    **kwargs,
+) -> dict[str, Any]:
+    """Claude-specific text generation function for the shared processor."""
+    request_params = _claude_request_params(
+        prompt, model, history, system_instruction, kwargs
+    )
+    on_text = kwargs.get("on_text")
+
+    # Make API call, streaming the text to on_text if given
+    try:
+        if on_text:
+            with _get_client().messages.stream(**request_params) as stream:
+                for text in stream.text_stream:
+                    on_text(text)
+                response = stream.get_final_message()
+        else:
+            response = _get_client().messages.create(**request_params)
+    except Exception as e:
+        # Convert all API errors to ValueError for consistent error handling
+        raise ValueError(f"Claude API error: {str(e)}") from e
+
+    return _message_data(response)
+
+
+async def _claude_generation_adapter_async(
+    prompt: str,
+    model: str,
+    history: list[dict[str, str]],
+    system_instruction: str,
+    **kwargs,
+) -> dict[str, Any]:
+    """Async counterpart of _claude_generation_adapter using AsyncAnthropic."""
+    request_params = _claude_request_params(
+        prompt, model, history, system_instruction, kwargs
+    )
+    on_text = kwargs.get("on_text")
+
+    try:
+        if on_text:
+            async with _get_async_client().messages.stream(**request_params) as stream:
+                async for text in stream.text_stream:
+                    await on_text(text)
+                response = await stream.get_final_message()
+        else:
+            response = await _get_async_client().messages.create(**request_params)
+    except Exception as e:
+        raise ValueError(f"Claude API error: {str(e)}") from e
+
+    return _message_data(response)
+
+
+def _claude_batch_line(
+    custom_id: str,
+    prompt: str,
+    model: str,
+    system_instruction: str | None,
+    kwargs: dict[str, Any],
+) -> dict[str, Any]:
+    """Build a Message Batches request line for one message."""
+    params = _claude_request_params(prompt, model, [], system_instruction, kwargs)
+    # The timeout is a client option, not a message parameter
+    del params["timeout"]
+    return {"custom_id": custom_id, "params": params}
+
+
+def _claude_batch_submit(requests_file: Path, model: str, job_id: str) -> str:
+    """Submit the requests in a JSONL file as a Message Batch.
+
+    The Message Batches API takes its requests in the create call rather than
+    as an uploaded file.
+    """
+    requests = [json.loads(line) for line in requests_file.read_text().splitlines()]
+    return _get_client().messages.batches.create(requests=requests).id
+
+
+def _claude_batch_poll(batch_id: str) -> str:
+    """Get a Message Batch's status. An ended batch reports failures per request."""
+    status = _get_client().messages.batches.retrieve(batch_id).processing_status
+    return "completed" if status == "ended" else "in_progress"
+
+
+def _claude_batch_results(batch_id: str) -> dict[str, dict[str, Any] | str]:
+    """Read an ended Message Batch's results by custom id."""
+    results = {}
+    for entry in _get_client().messages.batches.results(batch_id):
+        result = entry.result
+        if result.type == "succeeded":
+            results[entry.custom_id] = _message_data(result.message)
+        elif result.type == "errored":
+            results[entry.custom_id] = result.error.error.message
+        else:
+            results[entry.custom_id] = f"Request {result.type}"
+    return results
+
+
+BATCH_PROVIDER = BatchProvider(
+    request_line=_claude_batch_line,
+    submit=_claude_batch_submit,
+    poll=_claude_batch_poll,
+    results=_claude_batch_results,
+)
+
+
 def _claude_image_analysis_adapter(
     prompt: str,
     model: str,
@@ -236,7 +423,8 @@ def _claude_image_analysis_adapter(
     )
 
     # Resolve images to content blocks
-    image_blocks = _resolve_images_to_content_blocks(images)
+    target = image_target("claude") if kwargs.get("downsize", True) else None
+    image_blocks = _resolve_images_to_content_blocks(images, target)
 
     # Build content with text and images
     content_blocks = [{"type": "text", "text": prompt}] + image_blocks
@@ -283,9 +471,12 @@ def _claude_image_analysis_adapter(
     }
 
 
-@mcp.tool(
-    description="Delegates a user query to external Anthropic Claude AI service. Can take a prompt directly or load it from a template file with variables. Returns Claude's verbatim response. Use `agent_name` for separate conversation thread. For code reviews, use code2prompt first."
-)
+ASK_DESCRIPTION = "Delegates a user query to external Anthropic Claude AI service. Can take a prompt directly or load it from a template file with variables. Returns Claude's verbatim response. Use `agent_name` for separate conversation thread. For code reviews, use code2prompt first."
+ASK_BATCH_DESCRIPTION = "Delegates many independent queries to external Anthropic Claude AI service concurrently, for screening or bulk processing. Each prompt or prompt file is sent as its own request without conversation memory, sharing the other parameters, and its response is written to its own file in `output_dir`. Returns per-item usage with aggregate cost and wall time."
+SUBMIT_BATCH_DESCRIPTION = "Submits many independent queries to the Anthropic Message Batches API at discounted batch pricing, for bulk work that can wait up to 24 hours. Each prompt or prompt file becomes one request without conversation memory, sharing the other parameters. Returns a job to check later with `batch_status`."
+BATCH_STATUS_DESCRIPTION = "Checks a Anthropic Message Batches API job started by `submit_batch`. Once the job has completed, writes each response to its own file in the job's `output_dir` and returns per-item usage at batch pricing with aggregate cost."
+
+
 def ask(
     prompt: str = Field(
         default=None,
@@ -335,6 +526,18 @@ def ask(
         default_factory=dict,
         description="A dictionary of variables for template substitution in the system prompt using ${var} syntax.",
     ),
+    history_budget: int = Field(
+        default=0,
+        description="Token budget for conversation history. 0 fits the model's input limit, a positive value caps history at that many tokens, -1 sends the full history.",
+    ),
+    cache_response: bool = Field(
+        default=False,
+        description="If True, reuse the response to an identical earlier request at no cost, and cache this one. Temperature-0 requests are also cached when the response cache is enabled.",
+    ),
+    stream: bool = Field(
+        default=False,
+        description="If True, stream the response, appending it to output_file as it arrives and reporting it as progress notifications.",
+    ),
 ) -> LLMResult:
     """Ask Claude a question with optional persistent memory."""
     # Resolve model alias to full model name for consistent pricing
@@ -355,9 +558,38 @@ def ask(
         system_prompt=system_prompt,
         system_prompt_file=system_prompt_file,
         system_prompt_vars=system_prompt_vars,
+        history_budget=history_budget,
+        cache_response=cache_response,
+        stream=stream,
     )
 
 
+mcp.tool(name="ask", description=ASK_DESCRIPTION)(
+    async_ask_tool(
+        ask,
+        "claude",
+        _claude_generation_adapter_async,
+        mcp,
+        resolve_model=_resolve_model_alias,
+    )
+)
+mcp.tool(name="ask_batch", description=ASK_BATCH_DESCRIPTION)(
+    async_ask_batch_tool(
+        ask,
+        "claude",
+        _claude_generation_adapter_async,
+        mcp,
+        resolve_model=_resolve_model_alias,
+    )
+)
+
+submit_batch, batch_status = batch_job_tools(
+    ask, "claude", BATCH_PROVIDER, resolve_model=_resolve_model_alias
+)
+mcp.tool(name="submit_batch", description=SUBMIT_BATCH_DESCRIPTION)(submit_batch)
+mcp.tool(name="batch_status", description=BATCH_STATUS_DESCRIPTION)(batch_status)
+
+
 @mcp.tool(
     description="Delegates image analysis to external Claude vision AI service on behalf of the user. Returns Claude's verbatim visual analysis to assist the user."
 )
@@ -394,6 +626,10 @@ def analyze_image(
         default=None,
         description="System instructions to send to external Claude AI service. Remembered for this conversation thread.",
     ),
+    downsize: bool = Field(
+        default=True,
+        description="If True, scale large images down to the resolution the model uses and re-encode them as WebP before upload. Set False to send the original files.",
+    ),
 ) -> LLMResult:
     """Analyze images with Claude vision model."""
     return process_llm_request(
@@ -408,6 +644,7 @@ def analyze_image(
         focus=focus,
         max_output_tokens=max_output_tokens,
         system_prompt=system_prompt,
+        downsize=downsize,
     )
 
 
@@ -420,6 +657,33 @@ def list_models() -> ModelListing:
     return get_structured_model_listing("claude")
 
 
+@mcp.tool(
+    description="Reports LLM spend and token usage recorded by all provider tools, as precomputed hourly or daily totals per provider and model. Covers the current month unless a range is given. Use this to answer questions such as how much has been spent this month."
+)
+def usage_report(
+    period: str = Field(
+        default="day", description="Bucket size of the totals: 'hour' or 'day'."
+    ),
+    since: str = Field(
+        default="",
+        description="ISO date or datetime to report from. Defaults to the start of the current month.",
+    ),
+    until: str = Field(
+        default="",
+        description="ISO date or datetime to report up to, exclusive. Defaults to no limit.",
+    ),
+    provider: str = Field(
+        default="",
+        description="Only report this provider (e.g., 'openai'). Empty for all providers.",
+    ),
+    model: str = Field(
+        default="", description="Only report this model. Empty for all models."
+    ),
+) -> UsageReport:
+    """Report recorded LLM usage and spend from the usage ledger."""
+    return build_usage_report(period, since, until, provider, model)
+
+
 @mcp.tool(
     description="Checks the status of the Claude Tool server and API connectivity. Returns connection status and list of available tools. Use this to verify the tool is operational before making other requests."
 )
@@ -434,6 +698,7 @@ def server_info() -> ServerInfo:
         memory_manager=memory_manager,
         vision_support=True,
         image_generation=False,
+        batch_jobs=True,
     )
 
 
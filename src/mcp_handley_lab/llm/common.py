@@ -1,11 +1,15 @@
 """Shared utilities for LLM tools."""
 
 import base64
+import binascii
 import mimetypes
+import mmap
 import os
 from pathlib import Path
 from string import Template
 
+from mcp_handley_lab.llm.blob_cache import blob_cache
+from mcp_handley_lab.llm.image_processing import ImageTarget, prepare_image
 from mcp_handley_lab.llm.memory import memory_manager
 from mcp_handley_lab.shared.models import ServerInfo
 
@@ -61,6 +65,44 @@ TEXT_BASED_APPLICATION_TYPES = {
 }
 
 
+# Fast local token estimate used to budget conversation history. Roughly four
+# characters per token holds for English text across the supported providers.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text without calling a tokenizer."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def fit_history_to_budget(
+    history: list[dict[str, str]], budget: int
+) -> tuple[list[dict[str, str]], int]:
+    """Select the most recent messages whose estimated size fits in a token budget.
+
+    The window always starts on a user message so that turns stay paired.
+
+    Returns:
+        tuple: (messages to send, number of older messages dropped)
+    """
+    used = 0
+    start = len(history)
+    for i in range(len(history) - 1, -1, -1):
+        message_tokens = (
+            estimate_tokens(history[i]["content"]) + MESSAGE_OVERHEAD_TOKENS
+        )
+        if used + message_tokens > budget:
+            break
+        used += message_tokens
+        start = i
+
+    while start < len(history) and history[start]["role"] != "user":
+        start += 1
+
+    return history[start:], start
+
+
 def load_prompt_text(
     prompt: str,
     prompt_file: str,
@@ -199,6 +241,62 @@ def resolve_file_content(
     return None, None
 
 
+def encode_file_base64(
+    file_path: Path, chunk_size: int = 768 * 1024, prefix: str = ""
+) -> str:
+    """Base64-encode a file, after an optional prefix, without reading it whole.
+
+    The file is memory-mapped and encoded a chunk at a time into a buffer
+    holding the prefix and the encoded file, which is decoded once into the
+    returned str. Peak memory is two encoded copies plus a chunk.
+    chunk_size must be a multiple of 3.
+    """
+    head = prefix.encode()
+    size = file_path.stat().st_size
+    if size == 0:
+        return prefix
+    encoded = bytearray(len(head) + 4 * ((size + 2) // 3))
+    encoded[: len(head)] = head
+    with (
+        open(file_path, "rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+        memoryview(data) as view,
+    ):
+        for start in range(0, size, chunk_size):
+            chunk = binascii.b2a_base64(view[start : start + chunk_size], newline=False)
+            offset = len(head) + start // 3 * 4
+            encoded[offset : offset + len(chunk)] = chunk
+    return encoded.decode()
+
+
+def encode_file_base64_bytes(file_path: Path) -> bytes:
+    """Base64-encode a memory-mapped file straight into bytes, with no str copy."""
+    if file_path.stat().st_size == 0:
+        return b""
+    with (
+        open(file_path, "rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+    ):
+        return binascii.b2a_base64(data, newline=False)
+
+
+def read_text_cached(file_path: Path) -> str:
+    """Read a UTF-8 text file through the process-wide blob cache."""
+    return blob_cache.get(
+        file_path, "text", lambda path: path.read_text(encoding="utf-8")
+    )
+
+
+def read_base64_cached(file_path: Path) -> str:
+    """Read a file as base64 text through the process-wide blob cache."""
+    return blob_cache.get(file_path, "base64", encode_file_base64)
+
+
+def read_bytes_cached(file_path: Path) -> bytes:
+    """Read a file's raw bytes through the process-wide blob cache."""
+    return blob_cache.get(file_path, "bytes", Path.read_bytes)
+
+
 def read_file_smart(
     file_path: Path, max_size: int = 20 * 1024 * 1024
 ) -> tuple[str, bool]:
@@ -209,17 +307,18 @@ def read_file_smart(
         raise ValueError(f"File too large: {file_size} bytes > {max_size}")
 
     if is_text_file(file_path):
-        content = file_path.read_text(encoding="utf-8")
+        content = read_text_cached(file_path)
         return f"[File: {file_path.name}]\n{content}", True
 
-    # Binary file - base64 encode
-    file_content = file_path.read_bytes()
-    encoded_content = base64.b64encode(file_content).decode()
+    # Binary file - base64 encode behind the header, in one string
     mime_type = determine_mime_type(file_path)
-    return (
-        f"[Binary file: {file_path.name}, {mime_type}, {file_size} bytes]\n{encoded_content}",
-        False,
+    header = f"[Binary file: {file_path.name}, {mime_type}, {file_size} bytes]\n"
+    content = blob_cache.get(
+        file_path,
+        "binary_file",
+        lambda path: encode_file_base64(path, prefix=header),
     )
+    return content, False
 
 
 def resolve_image_data(image_item: str | dict[str, str]) -> bytes:
@@ -239,6 +338,23 @@ def resolve_image_data(image_item: str | dict[str, str]) -> bytes:
     raise ValueError(f"Invalid image format: {image_item}")
 
 
+def image_mime_type(image_item: str | dict[str, str]) -> str:
+    """Determine an image input's MIME type, defaulting to JPEG for safety."""
+    if isinstance(image_item, str) and image_item.startswith("data:image"):
+        return image_item.split(";")[0].split(":")[1]
+    mime_type = determine_mime_type(Path(image_item))
+    return mime_type if mime_type.startswith("image/") else "image/jpeg"
+
+
+def resolve_image_base64(image_item: str | dict[str, str]) -> str:
+    """Resolve image input to base64 text, reading files through the blob cache."""
+    if isinstance(image_item, dict) and "path" in image_item:
+        image_item = image_item["path"]
+    if isinstance(image_item, str) and not image_item.startswith("data:image"):
+        return read_base64_cached(Path(image_item))
+    return base64.b64encode(resolve_image_data(image_item)).decode("utf-8")
+
+
 def handle_output(
     response_text: str,
     output_file: str,
@@ -285,16 +401,15 @@ def handle_agent_memory(
 
     # Store in agent memory (only if memory not disabled)
     if agent_name is not False:
-        agent = memory_manager.get_agent(agent_name)
-        if not agent:
-            agent = memory_manager.create_agent(agent_name)
-
-        memory_manager.add_message(
-            agent_name, "user", user_prompt, input_tokens, cost / 2
-        )
-        memory_manager.add_message(
-            agent_name, "assistant", response_text, output_tokens, cost / 2
-        )
+        with memory_manager.batch(agent_name):
+            if not memory_manager.get_agent(agent_name):
+                memory_manager.create_agent(agent_name)
+            memory_manager.add_message(
+                agent_name, "user", user_prompt, input_tokens, cost / 2
+            )
+            memory_manager.add_message(
+                agent_name, "assistant", response_text, output_tokens, cost / 2
+            )
         return agent_name
 
     return None
@@ -321,7 +436,7 @@ def resolve_multimodal_content(
 
         mime_type = determine_mime_type(file_path)
         if is_text_file(file_path):
-            text_content = file_path.read_text(encoding="utf-8")
+            text_content = read_text_cached(file_path)
             content_blocks.append(
                 {
                     "type": "text_file",
@@ -331,33 +446,24 @@ def resolve_multimodal_content(
             )
         else:
             # For binary files, pass as base64 data
-            binary_data = file_path.read_bytes()
             content_blocks.append(
                 {
                     "type": "binary_file",
                     "filename": file_path.name,
                     "mime_type": mime_type,
-                    "data": base64.b64encode(binary_data),
+                    "data": blob_cache.get(
+                        file_path, "base64_bytes", encode_file_base64_bytes
+                    ),
                 }
             )
 
     # Process images
     for image_item in images:
-        image_bytes = resolve_image_data(image_item)
-
-        # Determine mime type for the image
-        if isinstance(image_item, str) and image_item.startswith("data:image"):
-            mime_type = image_item.split(";")[0].split(":")[1]
-        else:
-            mime_type = determine_mime_type(Path(image_item))
-            if not mime_type.startswith("image/"):
-                mime_type = "image/jpeg"  # Default for safety
-
         content_blocks.append(
             {
                 "type": "image",
-                "mime_type": mime_type,
-                "data": base64.b64encode(image_bytes).decode("utf-8"),
+                "mime_type": image_mime_type(image_item),
+                "data": resolve_image_base64(image_item),
             }
         )
 
@@ -365,11 +471,14 @@ def resolve_multimodal_content(
 
 
 def resolve_images_for_multimodal_prompt(
-    prompt: str, images: list[str]
+    prompt: str, images: list[str], image_target: ImageTarget | None = None
 ) -> tuple[str, list[dict]]:
     """
     Standardized image processing for multimodal prompts.
 
+    With an image_target, images are downsized and re-encoded for the provider
+    before they are base64 encoded.
+
     Returns:
         tuple: (prompt_text, list of image content blocks)
         Each image block has: {"type": "image", "mime_type": str, "data": str}
@@ -379,23 +488,16 @@ def resolve_images_for_multimodal_prompt(
 
     image_blocks = []
     for image_path in images:
-        image_bytes = resolve_image_data(image_path)
-
-        # Determine mime type
-        if isinstance(image_path, str) and image_path.startswith("data:image"):
-            mime_type = image_path.split(";")[0].split(":")[1]
+        mime_type = image_mime_type(image_path)
+        if image_target is None:
+            data = resolve_image_base64(image_path)
         else:
-            mime_type = determine_mime_type(Path(image_path))
-            if not mime_type.startswith("image/"):
-                mime_type = "image/jpeg"
+            image_bytes, mime_type = prepare_image(
+                resolve_image_data(image_path), mime_type, image_target
+            )
+            data = base64.b64encode(image_bytes).decode("utf-8")
 
-        image_blocks.append(
-            {
-                "type": "image",
-                "mime_type": mime_type,
-                "data": base64.b64encode(image_bytes).decode("utf-8"),
-            }
-        )
+        image_blocks.append({"type": "image", "mime_type": mime_type, "data": data})
 
     return prompt, image_blocks
 
@@ -425,9 +527,7 @@ def resolve_files_for_llm(
             if "too large" in str(e):
                 # File too large - read truncated version
                 if is_text_file(file_path):
-                    content = file_path.read_text(encoding="utf-8")[
-                        :100000
-                    ]  # 100KB limit
+                    content = read_text_cached(file_path)[:100000]  # 100KB limit
                     inline_content.append(
                         f"[File: {file_path.name} (truncated)]\n{content}..."
                     )
@@ -447,6 +547,7 @@ def build_server_info(
     memory_manager,
     vision_support: bool = False,
     image_generation: bool = False,
+    batch_jobs: bool = False,
 ) -> ServerInfo:
     """Build standardized ServerInfo object for LLM providers."""
 
@@ -456,7 +557,9 @@ def build_server_info(
     # Build capabilities list
     capabilities = [
         f"ask - Chat with {provider_name} models (persistent memory enabled by default)",
+        f"ask_batch - Send many prompts to {provider_name} concurrently, one output file each",
         "list_models - List available models with detailed information",
+        "usage_report - Spend and token usage by provider and model",
         "server_info - Get server status",
     ]
 
@@ -476,12 +579,25 @@ def build_server_info(
                 1, f"generate_image - Generate images with {provider_name}"
             )
 
+    if batch_jobs:
+        capabilities.extend(
+            [
+                f"submit_batch - Submit prompts as a {provider_name} batch job",
+                "batch_status - Check a batch job and collect its results",
+            ]
+        )
+
     # Build dependencies dict
     dependencies = {
         "api_key": "configured",
         "available_models": f"{len(available_models)} models",
         "active_agents": str(agent_count),
         "memory_storage": str(memory_manager.storage_dir),
+        "file_cache": (
+            "{hits} hits, {misses} misses, {entries} files, {bytes} bytes".format(
+                **blob_cache.stats()
+            )
+        ),
     }
 
     if vision_support:
@@ -505,17 +621,12 @@ def load_provider_models(provider: str) -> tuple[dict, str, callable]:
     Returns:
         tuple: (MODEL_CONFIGS dict, DEFAULT_MODEL str, _get_model_config function)
     """
-    from mcp_handley_lab.llm.model_loader import (
-        build_model_configs_dict,
-        load_model_config,
-    )
-
-    # Load model configurations from YAML
-    model_configs = build_model_configs_dict(provider)
+    from mcp_handley_lab.llm.model_loader import get_provider_models
 
-    # Load default model from YAML
-    config = load_model_config(provider)
-    default_model = config["default_model"]
+    # Load model configurations and default model from the compiled registry
+    registry = get_provider_models(provider)
+    model_configs = registry.model_configs
+    default_model = registry.config["default_model"]
 
     # Return a closure for getting model config with fallback
     def get_model_config(model: str) -> dict:
@@ -0,0 +1,94 @@
+"""Registry of Gemini server-side resources reused across requests."""
+
+import json
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from mcp_handley_lab.llm.memory import atomic_write, file_lock
+
+
+class RemoteRegistry:
+    """Names of remote resources keyed by content hash, kept until they expire.
+
+    Entries live in a JSON file under storage_dir, so resources created by one
+    server process are reused by the next. An entry is treated as expired
+    ``margin`` seconds early, so a request never references a resource that
+    lapses while the request is in flight.
+
+    Processes sharing storage_dir see each other's entries: the file is re-read
+    whenever another process has replaced it, and changes are made under an
+    ``fcntl`` lock on ``<filename>.lock`` to the entries as currently stored.
+    """
+
+    def __init__(self, storage_dir: str, filename: str, margin: float = 60.0):
+        self.path = Path(storage_dir) / filename
+        self.lock_file = self.path.with_name(f"{filename}.lock")
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self._version: tuple[int, int, int] | None = None
+
+    def _load(self) -> dict[str, dict]:
+        """Get the stored entries, re-reading the file if it has been replaced."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._entries, self._version = {}, None
+            return self._entries
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if version != self._version:
+            self._entries = json.loads(self.path.read_text())
+            self._version = version
+        return self._entries
+
+    @contextmanager
+    def _update(self) -> Iterator[dict[str, dict]]:
+        """Change the stored entries, excluding other threads and processes."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, file_lock(self.lock_file):
+            # Always re-read under the lock, as file timestamps can be coarse
+            self._version = None
+            entries = self._load()
+            yield entries
+            atomic_write(self.path, json.dumps(entries, indent=2).encode())
+
+    def get(self, key: str) -> dict | None:
+        """Get the entry of the live resource stored under key, if any.
+
+        Entries hold the resource's name, its expires timestamp and any
+        details it was stored with.
+        """
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None or entry["expires"] - self.margin <= time.time():
+            return None
+        return entry
+
+    def put(self, key: str, name: str, expires: float, **details):
+        """Store a resource's name and details under key until expires."""
+        with self._update() as entries:
+            entries[key] = {"name": name, "expires": expires, **details}
+
+    def entries(self) -> dict[str, dict]:
+        """Get every stored entry by key, live or expired."""
+        with self._lock:
+            return dict(self._load())
+
+    def discard(self, *keys: str):
+        """Forget the resources stored under keys."""
+        with self._update() as entries:
+            for key in keys:
+                entries.pop(key, None)
+
+    def prune(self) -> int:
+        """Forget expired resources. Returns the number forgotten."""
+        now = time.time()
+        expired = [
+            key for key, entry in self.entries().items() if entry["expires"] <= now
+        ]
+        if expired:
+            self.discard(*expired)
+        return len(expired)
@@ -1,6 +1,6 @@
 """Gemini LLM tool for AI interactions via MCP."""
 
-import base64
+import hashlib
 import io
 import json
 import os
@@ -9,37 +9,63 @@ import time
 from pathlib import Path
 from typing import Any, Literal
 
+import anyio
 import numpy as np
 from google import genai as google_genai
+from google.genai.errors import ClientError
 from google.genai.types import (
     Blob,
+    Content,
+    CreateBatchJobConfig,
+    CreateCachedContentConfig,
     EmbedContentConfig,
     FileData,
     GenerateContentConfig,
+    GenerateContentResponse,
     GenerateImagesConfig,
     GoogleSearch,
     GoogleSearchRetrieval,
     Part,
     Tool,
+    UploadFileConfig,
 )
 from mcp.server.fastmcp import FastMCP
 from PIL import Image
 from pydantic import Field
 
 from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm.batch_jobs import BatchProvider, batch_job_tools
 from mcp_handley_lab.llm.common import (
+    CHARS_PER_TOKEN,
     build_server_info,
+    estimate_tokens,
     get_gemini_safe_mime_type,
     get_session_id,
+    image_mime_type,
     is_text_file,
     load_provider_models,
+    read_bytes_cached,
+    read_text_cached,
     resolve_image_data,
 )
+from mcp_handley_lab.llm.gemini.registry import RemoteRegistry
+from mcp_handley_lab.llm.image_processing import (
+    ImageTarget,
+    image_target,
+    prepare_image,
+)
 from mcp_handley_lab.llm.memory import memory_manager
 from mcp_handley_lab.llm.model_loader import (
+    get_provider_models,
     get_structured_model_listing,
 )
-from mcp_handley_lab.llm.shared import process_image_generation, process_llm_request
+from mcp_handley_lab.llm.shared import (
+    async_ask_batch_tool,
+    async_ask_tool,
+    process_image_generation,
+    process_llm_request,
+)
+from mcp_handley_lab.llm.usage import build_usage_report
 from mcp_handley_lab.shared.models import (
     DocumentIndex,
     EmbeddingResult,
@@ -47,9 +73,11 @@ from mcp_handley_lab.shared.models import (
     IndexResult,
     LLMResult,
     ModelListing,
+    OperationResult,
     SearchResult,
     ServerInfo,
     SimilarityResult,
+    UsageReport,
 )
 
 mcp = FastMCP("Gemini Tool")
@@ -92,6 +120,21 @@ _SESSION_ID = f"_session_{os.getpid()}_{int(time.time())}"
 # Load model configurations using shared loader
 MODEL_CONFIGS, DEFAULT_MODEL, _get_model_config = load_provider_models("gemini")
 
+# Shortest context a cache stores, unless a model sets cache_min_tokens
+DEFAULT_CACHE_MIN_TOKENS = 1024
+
+# Context caches by content key, beside agent memory
+context_cache_registry = RemoteRegistry(
+    str(memory_manager.storage_dir), "gemini_context_caches.json"
+)
+# Files API uploads by content, so large files are uploaded once while live
+uploaded_file_registry = RemoteRegistry(
+    str(memory_manager.storage_dir), "gemini_uploads.json"
+)
+# Keys of contexts sent once uncached, and of contexts the API refused to cache
+_seen_contexts: set[str] = set()
+_uncacheable_contexts: set[str] = set()
+
 
 def _calculate_cosine_similarity(vec1: list[float], vec2: list[float]) -> float:
     """Calculate cosine similarity between two embedding vectors."""
@@ -112,6 +155,47 @@ def _get_model_config(model: str) -> dict[str, int]:
     return MODEL_CONFIGS.get(model, MODEL_CONFIGS[DEFAULT_MODEL])
 
 
+def _file_path(file_item: str | dict) -> Path:
+    """Get the path of a file input given as a string or {"path": "..."} dict."""
+    if isinstance(file_item, str):
+        return Path(file_item)
+    if isinstance(file_item, dict) and "path" in file_item:
+        return Path(file_item["path"])
+    raise ValueError(f"Invalid file item format: {file_item}")
+
+
+def _file_sha256(file_path: Path) -> str:
+    """Hash a file's contents without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _upload_file(file_path: Path) -> str:
+    """Upload a file to the Files API and return its URI.
+
+    Uploads are registered by content hash, size and MIME type, so a file with
+    the same content is uploaded again only once the earlier upload expires.
+    """
+    mime_type = get_gemini_safe_mime_type(file_path)
+    key = f"{_file_sha256(file_path)}:{file_path.stat().st_size}:{mime_type}"
+    entry = uploaded_file_registry.get(key)
+    if entry is not None:
+        return entry["uri"]
+
+    uploaded_file = _get_client().files.upload(file=str(file_path), mime_type=mime_type)
+    uploaded_file_registry.put(
+        key,
+        uploaded_file.name,
+        uploaded_file.expiration_time.timestamp(),
+        uri=uploaded_file.uri,
+        uploaded=time.time(),
+    )
+    return uploaded_file.uri
+
+
 def _resolve_files(
     files: list[str],
 ) -> tuple[list[Part], bool]:
@@ -123,38 +207,27 @@ def _resolve_files(
     parts = []
     used_files_api = False
     for file_item in files:
-        # Handle unified format: strings or {"path": "..."} dicts
-        if isinstance(file_item, str):
-            file_path = Path(file_item)
-        elif isinstance(file_item, dict) and "path" in file_item:
-            file_path = Path(file_item["path"])
-        else:
-            raise ValueError(f"Invalid file item format: {file_item}")
+        file_path = _file_path(file_item)
         file_size = file_path.stat().st_size
 
         if file_size > GEMINI_INLINE_FILE_LIMIT_BYTES:
-            # Large file - use Files API
+            # Large file - use Files API, reusing an earlier upload
             used_files_api = True
-            uploaded_file = _get_client().files.upload(
-                file=str(file_path),
-                mime_type=get_gemini_safe_mime_type(file_path),
-            )
-            parts.append(Part(fileData=FileData(fileUri=uploaded_file.uri)))
+            parts.append(Part(fileData=FileData(fileUri=_upload_file(file_path))))
         else:
             # Small file - use inlineData with base64 encoding
             if is_text_file(file_path):
                 # For text files, read directly as text
-                content = file_path.read_text(encoding="utf-8")
+                content = read_text_cached(file_path)
                 parts.append(Part(text=f"[File: {file_path.name}]\n{content}"))
             else:
-                # For binary files, use inlineData
-                file_content = file_path.read_bytes()
-                encoded_content = base64.b64encode(file_content).decode()
+                # For binary files, use inlineData with the raw bytes, which
+                # the SDK base64-encodes as it sends the request
                 parts.append(
                     Part(
                         inlineData=Blob(
                             mimeType=get_gemini_safe_mime_type(file_path),
-                            data=encoded_content,
+                            data=read_bytes_cached(file_path),
                         )
                     )
                 )
@@ -163,9 +236,9 @@ def _resolve_files(
 
 
 def _resolve_images(
-    images: list[str] | None = None,
-) -> list[Image.Image]:
-    """Resolve image inputs to PIL Image objects."""
+    images: list[str] | None = None, target: ImageTarget | None = None
+) -> list[Image.Image | Part]:
+    """Resolve image inputs to PIL Image objects, or to parts downsized for a target."""
     if images is None:
         images = []
     image_list = []
@@ -173,19 +246,103 @@ def _resolve_images(
     # Handle images array
     for image_item in images:
         image_bytes = resolve_image_data(image_item)
-        image_list.append(Image.open(io.BytesIO(image_bytes)))
+        if target is None:
+            image_list.append(Image.open(io.BytesIO(image_bytes)))
+        else:
+            data, mime_type = prepare_image(
+                image_bytes, image_mime_type(image_item), target
+            )
+            image_list.append(Part.from_bytes(data=data, mime_type=mime_type))
 
     return image_list
 
 
-def _gemini_generation_adapter(
+def _context_cache_key(
+    model: str, system_instruction: str, files: list[str], tools: list[Tool]
+) -> str:
+    """Hash a request's cacheable context: its files, system instruction and tools."""
+    context = {
+        "model": model,
+        "system_instruction": system_instruction or "",
+        "files": [_file_sha256(_file_path(file_item)) for file_item in files],
+        "tools": [tool.to_json_dict() for tool in tools],
+    }
+    return hashlib.sha256(json.dumps(context, sort_keys=True).encode()).hexdigest()
+
+
+def _cached_context(
+    model: str, system_instruction: str, files: list[str], tools: list[Tool]
+) -> str | None:
+    """Get a context cache for a request's files, system instruction and tools.
+
+    A context is cached once it reaches the model's minimum cache size and is
+    either large or has been sent before by this process. Returns None when
+    the request should be sent uncached.
+    """
+    if not files and not system_instruction:
+        return None
+    key = _context_cache_key(model, system_instruction, files, tools)
+    entry = context_cache_registry.get(key)
+    if entry is not None:
+        return entry["name"]
+    if key in _uncacheable_contexts:
+        return None
+
+    context_tokens = (
+        estimate_tokens(system_instruction or "")
+        + sum(_file_path(file_item).stat().st_size for file_item in files)
+        // CHARS_PER_TOKEN
+    )
+    # MODEL_CONFIGS keeps only token limits, so read the minimum from the YAML;
+    # models it doesn't list take the default
+    model_info = get_provider_models("gemini").config["models"].get(model, {})
+    min_tokens = model_info.get("cache_min_tokens", DEFAULT_CACHE_MIN_TOKENS)
+    if context_tokens < min_tokens:
+        return None
+    if (
+        context_tokens < settings.gemini_context_cache_tokens
+        and key not in _seen_contexts
+    ):
+        _seen_contexts.add(key)
+        return None
+
+    file_parts, _ = _resolve_files(files)
+    try:
+        cache = _get_client().caches.create(
+            model=model,
+            config=CreateCachedContentConfig(
+                contents=[Content(role="user", parts=file_parts)] if files else None,
+                system_instruction=system_instruction or None,
+                tools=tools or None,
+                ttl=f"{settings.gemini_context_cache_ttl}s",
+            ),
+        )
+    except ClientError as e:
+        # Token counts are only estimated, so the API may find the context
+        # below the model's minimum; send this context uncached from now on.
+        # Any other failure, such as auth or quota, is the caller's to see
+        if e.status != "INVALID_ARGUMENT" or "too small" not in (e.message or ""):
+            raise
+        _uncacheable_contexts.add(key)
+        return None
+    context_cache_registry.put(key, cache.name, cache.expire_time.timestamp())
+    return cache.name
+
+
+def _gemini_request(
     prompt: str,
     model: str,
     history: list[dict[str, str]],
     system_instruction: str,
-    **kwargs,
-) -> dict[str, Any]:
-    """Gemini-specific text generation function for the shared processor."""
+    kwargs: dict[str, Any],
+    context_cache: bool = True,
+) -> tuple[Any, GenerateContentConfig, bool]:
+    """Build the contents and config for a text generation request.
+
+    With context_cache, the files, system instruction and tools are sent
+    through a context cache where _cached_context provides one.
+    Returns tuple of (contents, config, Files API used flag).
+    """
     # Extract Gemini-specific parameters
     temperature = kwargs.get("temperature", 1.0)
     grounding = kwargs.get("grounding", False)
@@ -200,8 +357,14 @@ def _gemini_generation_adapter(
         else:
             tools.append(Tool(google_search=GoogleSearch()))
 
-    # Resolve file contents
-    file_parts, used_files_api = _resolve_files(files)
+    # Reuse a context cache, or resolve file contents
+    cached_content = None
+    if context_cache and settings.gemini_context_caching:
+        cached_content = _cached_context(model, system_instruction, files, tools)
+    if cached_content:
+        file_parts, used_files_api = [], False
+    else:
+        file_parts, used_files_api = _resolve_files(files)
 
     # Get model configuration and token limits
     model_config = _get_model_config(model)
@@ -215,10 +378,13 @@ def _gemini_generation_adapter(
         "temperature": temperature,
         "max_output_tokens": output_tokens,
     }
-    if system_instruction:
-        config_params["system_instruction"] = system_instruction
-    if tools:
-        config_params["tools"] = tools
+    if cached_content:
+        config_params["cached_content"] = cached_content
+    else:
+        if system_instruction:
+            config_params["system_instruction"] = system_instruction
+        if tools:
+            config_params["tools"] = tools
 
     config = GenerateContentConfig(**config_params)
 
@@ -231,33 +397,26 @@ def _gemini_generation_adapter(
         for msg in history
     ]
 
-    # Generate content
-    try:
-        if gemini_history:
-            # Continue existing conversation
-            user_parts = [Part(text=prompt)] + file_parts
-            contents = gemini_history + [
-                {"role": "user", "parts": [part.to_json_dict() for part in user_parts]}
-            ]
-            response = _get_client().models.generate_content(
-                model=model, contents=contents, config=config
-            )
-        else:
-            # New conversation
-            if file_parts:
-                content_parts = [Part(text=prompt)] + file_parts
-                response = _get_client().models.generate_content(
-                    model=model, contents=content_parts, config=config
-                )
-            else:
-                response = _get_client().models.generate_content(
-                    model=model, contents=prompt, config=config
-                )
-    except Exception as e:
-        # Convert all API errors to ValueError for consistent error handling
-        raise ValueError(f"Gemini API error: {str(e)}") from e
+    if gemini_history:
+        # Continue existing conversation
+        user_parts = [Part(text=prompt)] + file_parts
+        contents = gemini_history + [
+            {"role": "user", "parts": [part.to_json_dict() for part in user_parts]}
+        ]
+    elif file_parts:
+        # New conversation with files
+        contents = [Part(text=prompt)] + file_parts
+    else:
+        contents = prompt
+    return contents, config, used_files_api
 
-    if not response.text:
+
+def _generation_data(response, text: str, server_timed: bool) -> dict[str, Any]:
+    """Extract response data from the final (or only) response of a generation.
+
+    server_timed says whether the response carries a server-timing header.
+    """
+    if not text:
         raise RuntimeError("No response text generated")
 
     # Extract grounding metadata - direct access, fail fast
@@ -289,9 +448,10 @@ def _gemini_generation_adapter(
             avg_logprobs = float(candidate.avg_logprobs)
 
     # Extract generation time from server-timing header - fail fast on format changes
-    # Files API responses don't include timing headers, only inline responses do
+    # Files API and batch responses don't include timing headers, only inline
+    # responses do. Streamed responses are timed by the shared processor instead
     generation_time_ms = 0
-    if not used_files_api and response.sdk_http_response:
+    if server_timed and response.sdk_http_response:
         http_dict = response.sdk_http_response.to_json_dict()
         headers = http_dict["headers"]
         server_timing = headers["server-timing"]
@@ -300,10 +460,16 @@ def _gemini_generation_adapter(
             dur_part = server_timing.split("dur=")[1].split(";")[0].split(",")[0]
             generation_time_ms = int(float(dur_part))
 
+    # The prompt count includes tokens read from a context cache, which are
+    # reported beside it and billed at the cached input price
     return {
-        "text": response.text,
+        "text": text,
         "input_tokens": response.usage_metadata.prompt_token_count,
         "output_tokens": response.usage_metadata.candidates_token_count,
+        "cache_read_input_tokens": (
+            response.usage_metadata.cached_content_token_count or 0
+        ),
+        "input_includes_cache_reads": True,
         "grounding_metadata": grounding_metadata,
         "finish_reason": finish_reason,
         "avg_logprobs": avg_logprobs,
@@ -313,6 +479,176 @@ def _gemini_generation_adapter(
     }
 
 
+def _gemini_generation_adapter(
+    prompt: str,
+    model: str,
+    history: list[dict[str, str]],
+    system_instruction: str,
+    **kwargs,
+) -> dict[str, Any]:
+    """Gemini-specific text generation function for the shared processor."""
+    contents, config, used_files_api = _gemini_request(
+        prompt, model, history, system_instruction, kwargs
+    )
+    on_text = kwargs.get("on_text")
+
+    # Generate content
+    try:
+        if on_text:
+            # Each chunk carries its own text; the last also carries usage and
+            # finish reason
+            text_parts = []
+            for response in _get_client().models.generate_content_stream(
+                model=model, contents=contents, config=config
+            ):
+                if response.text:
+                    text_parts.append(response.text)
+                    on_text(response.text)
+            text = "".join(text_parts)
+        else:
+            response = _get_client().models.generate_content(
+                model=model, contents=contents, config=config
+            )
+            text = response.text
+    except Exception as e:
+        # Convert all API errors to ValueError for consistent error handling
+        raise ValueError(f"Gemini API error: {str(e)}") from e
+
+    return _generation_data(
+        response, text, server_timed=not used_files_api and not on_text
+    )
+
+
+async def _gemini_generation_adapter_async(
+    prompt: str,
+    model: str,
+    history: list[dict[str, str]],
+    system_instruction: str,
+    **kwargs,
+) -> dict[str, Any]:
+    """Async counterpart of _gemini_generation_adapter using the client's aio API.
+
+    Large files are uploaded to the Files API in a worker thread.
+    """
+    contents, config, used_files_api = await anyio.to_thread.run_sync(
+        _gemini_request, prompt, model, history, system_instruction, kwargs
+    )
+    on_text = kwargs.get("on_text")
+
+    try:
+        if on_text:
+            text_parts = []
+            async for (
+                response
+            ) in await _get_client().aio.models.generate_content_stream(
+                model=model, contents=contents, config=config
+            ):
+                if response.text:
+                    text_parts.append(response.text)
+                    await on_text(response.text)
+            text = "".join(text_parts)
+        else:
+            response = await _get_client().aio.models.generate_content(
+                model=model, contents=contents, config=config
+            )
+            text = response.text
+    except Exception as e:
+        raise ValueError(f"Gemini API error: {str(e)}") from e
+
+    return _generation_data(
+        response, text, server_timed=not used_files_api and not on_text
+    )
+
+
+def _gemini_batch_line(
+    custom_id: str,
+    prompt: str,
+    model: str,
+    system_instruction: str | None,
+    kwargs: dict[str, Any],
+) -> dict[str, Any]:
+    """Build a batch JSONL line for one generate content request.
+
+    The SDK config is split into the REST request's generation config, system
+    instruction and tools. Large files are uploaded to the Files API first.
+    """
+    # Context caches may expire before the job runs, so batch lines don't use them
+    contents, config, _ = _gemini_request(
+        prompt, model, [], system_instruction, kwargs, context_cache=False
+    )
+    if isinstance(contents, str):
+        parts = [{"text": contents}]
+    else:
+        parts = [part.to_json_dict() for part in contents]
+
+    generation_config = config.to_json_dict()
+    request = {"contents": [{"role": "user", "parts": parts}]}
+    system_instruction = generation_config.pop("system_instruction", None)
+    if system_instruction:
+        request["system_instruction"] = {"parts": [{"text": system_instruction}]}
+    tools = generation_config.pop("tools", None)
+    if tools:
+        request["tools"] = tools
+    request["generation_config"] = generation_config
+    return {"key": custom_id, "request": request}
+
+
+def _gemini_batch_submit(requests_file: Path, model: str, job_id: str) -> str:
+    """Upload a JSONL request file and start a batch job for it."""
+    uploaded_file = _get_client().files.upload(
+        file=str(requests_file),
+        config=UploadFileConfig(mime_type="jsonl", display_name=job_id),
+    )
+    batch_job = _get_client().batches.create(
+        model=model,
+        src=uploaded_file.name,
+        config=CreateBatchJobConfig(display_name=job_id),
+    )
+    return batch_job.name
+
+
+_GEMINI_BATCH_STATUSES = {
+    "JOB_STATE_SUCCEEDED": "completed",
+    "JOB_STATE_FAILED": "failed",
+    "JOB_STATE_CANCELLED": "cancelled",
+    "JOB_STATE_EXPIRED": "expired",
+}
+
+
+def _gemini_batch_poll(name: str) -> str:
+    """Get a batch job's status, counting pending and running jobs as in progress."""
+    state = _get_client().batches.get(name=name).state.name
+    return _GEMINI_BATCH_STATUSES.get(state, "in_progress")
+
+
+def _gemini_batch_results(name: str) -> dict[str, dict[str, Any] | str]:
+    """Read a finished batch job's results file by request key."""
+    batch_job = _get_client().batches.get(name=name)
+    content = _get_client().files.download(file=batch_job.dest.file_name)
+    results = {}
+    for line in content.decode().splitlines():
+        entry = json.loads(line)
+        if "error" in entry:
+            results[entry["key"]] = entry["error"]["message"]
+            continue
+        response = GenerateContentResponse.model_validate(entry["response"])
+        if not response.text:
+            results[entry["key"]] = "No response text generated"
+            continue
+        results[entry["key"]] = _generation_data(
+            response, response.text, server_timed=False
+        )
+    return results
+
+
+BATCH_PROVIDER = BatchProvider(
+    request_line=_gemini_batch_line,
+    submit=_gemini_batch_submit,
+    poll=_gemini_batch_poll,
+    results=_gemini_batch_results,
+)
+
+
 def _gemini_image_analysis_adapter(
     prompt: str,
     model: str,
@@ -326,7 +662,8 @@ def _gemini_image_analysis_adapter(
     max_output_tokens = kwargs.get("max_output_tokens")
 
     # Load images
-    image_list = _resolve_images(images)
+    target = image_target("gemini") if kwargs.get("downsize", True) else None
+    image_list = _resolve_images(images, target)
 
     # Get model configuration
     model_config = _get_model_config(model)
@@ -364,9 +701,12 @@ def _gemini_image_analysis_adapter(
     }
 
 
-@mcp.tool(
-    description="Delegates a user query to external Google Gemini AI service. Can take a prompt directly or load it from a template file with variables. Returns Gemini's verbatim response. Use `agent_name` for separate conversation thread. For code reviews, use code2prompt first."
-)
+ASK_DESCRIPTION = "Delegates a user query to external Google Gemini AI service. Can take a prompt directly or load it from a template file with variables. Returns Gemini's verbatim response. Use `agent_name` for separate conversation thread. For code reviews, use code2prompt first."
+ASK_BATCH_DESCRIPTION = "Delegates many independent queries to external Google Gemini AI service concurrently, for screening or bulk processing. Each prompt or prompt file is sent as its own request without conversation memory, sharing the other parameters, and its response is written to its own file in `output_dir`. Returns per-item usage with aggregate cost and wall time."
+SUBMIT_BATCH_DESCRIPTION = "Submits many independent queries to the Gemini Batch API at discounted batch pricing, for bulk work that can wait up to 24 hours. Each prompt or prompt file becomes one request without conversation memory, sharing the other parameters. Returns a job to check later with `batch_status`."
+BATCH_STATUS_DESCRIPTION = "Checks a Gemini Batch API job started by `submit_batch`. Once the job has completed, writes each response to its own file in the job's `output_dir` and returns per-item usage at batch pricing with aggregate cost."
+
+
 def ask(
     prompt: str = Field(
         default=None,
@@ -420,6 +760,18 @@ def ask(
         default_factory=dict,
         description="A dictionary of variables for template substitution in the system prompt using ${var} syntax.",
     ),
+    history_budget: int = Field(
+        default=0,
+        description="Token budget for conversation history. 0 fits the model's input limit, a positive value caps history at that many tokens, -1 sends the full history.",
+    ),
+    cache_response: bool = Field(
+        default=False,
+        description="If True, reuse the response to an identical earlier request at no cost, and cache this one. Temperature-0 requests are also cached when the response cache is enabled.",
+    ),
+    stream: bool = Field(
+        default=False,
+        description="If True, stream the response, appending it to output_file as it arrives and reporting it as progress notifications.",
+    ),
 ) -> LLMResult:
     """Ask Gemini a question with optional persistent memory."""
     return process_llm_request(
@@ -439,9 +791,24 @@ def ask(
         system_prompt=system_prompt,
         system_prompt_file=system_prompt_file,
         system_prompt_vars=system_prompt_vars,
+        history_budget=history_budget,
+        cache_response=cache_response,
+        stream=stream,
     )
 
 
+mcp.tool(name="ask", description=ASK_DESCRIPTION)(
+    async_ask_tool(ask, "gemini", _gemini_generation_adapter_async, mcp)
+)
+mcp.tool(name="ask_batch", description=ASK_BATCH_DESCRIPTION)(
+    async_ask_batch_tool(ask, "gemini", _gemini_generation_adapter_async, mcp)
+)
+
+submit_batch, batch_status = batch_job_tools(ask, "gemini", BATCH_PROVIDER)
+mcp.tool(name="submit_batch", description=SUBMIT_BATCH_DESCRIPTION)(submit_batch)
+mcp.tool(name="batch_status", description=BATCH_STATUS_DESCRIPTION)(batch_status)
+
+
 @mcp.tool(
     description="Delegates image analysis to external Gemini vision AI service on behalf of the user. Returns Gemini's verbatim visual analysis to assist the user."
 )
@@ -478,6 +845,10 @@ def analyze_image(
         default=None,
         description="System instructions to send to external Gemini AI service. Remembered for this conversation thread.",
     ),
+    downsize: bool = Field(
+        default=True,
+        description="If True, scale large images down to the resolution the model uses and re-encode them as WebP before upload. Set False to send the original files.",
+    ),
 ) -> LLMResult:
     """Analyze images with Gemini vision model."""
     return process_llm_request(
@@ -492,6 +863,7 @@ def analyze_image(
         focus=focus,
         max_output_tokens=max_output_tokens,
         system_prompt=system_prompt,
+        downsize=downsize,
     )
 
 
@@ -781,6 +1153,75 @@ def list_models() -> ModelListing:
     return get_structured_model_listing("gemini", api_model_names)
 
 
+@mcp.tool(
+    description="Reports LLM spend and token usage recorded by all provider tools, as precomputed hourly or daily totals per provider and model. Covers the current month unless a range is given. Use this to answer questions such as how much has been spent this month."
+)
+def usage_report(
+    period: str = Field(
+        default="day", description="Bucket size of the totals: 'hour' or 'day'."
+    ),
+    since: str = Field(
+        default="",
+        description="ISO date or datetime to report from. Defaults to the start of the current month.",
+    ),
+    until: str = Field(
+        default="",
+        description="ISO date or datetime to report up to, exclusive. Defaults to no limit.",
+    ),
+    provider: str = Field(
+        default="",
+        description="Only report this provider (e.g., 'openai'). Empty for all providers.",
+    ),
+    model: str = Field(
+        default="", description="Only report this model. Empty for all models."
+    ),
+) -> UsageReport:
+    """Report recorded LLM usage and spend from the usage ledger."""
+    return build_usage_report(period, since, until, provider, model)
+
+
+@mcp.tool(
+    description="Deletes large files this server uploaded to the Gemini Files API once they are older than `older_than_hours`, freeing Files API storage. Later requests upload such files again when needed. Set `include_unregistered` to also delete other old uploads under the API key, such as batch request files."
+)
+def cleanup_files(
+    older_than_hours: float = Field(
+        default=24.0,
+        description="Delete uploads made at least this many hours ago. Gemini deletes uploads itself after 48 hours.",
+    ),
+    include_unregistered: bool = Field(
+        default=False,
+        description="If True, also delete old uploads this server didn't register for reuse.",
+    ),
+) -> OperationResult:
+    """Delete stale Files API uploads and forget expired ones."""
+    cutoff = time.time() - older_than_hours * 3600
+    keys_by_name = {
+        entry["name"]: key for key, entry in uploaded_file_registry.entries().items()
+    }
+
+    deleted = []
+    for remote_file in _get_client().files.list():
+        key = keys_by_name.get(remote_file.name)
+        if key is None and not include_unregistered:
+            continue
+        if remote_file.create_time.timestamp() > cutoff:
+            continue
+        _get_client().files.delete(name=remote_file.name)
+        deleted.append(remote_file.name)
+        if key is not None:
+            uploaded_file_registry.discard(key)
+    forgotten = uploaded_file_registry.prune()
+
+    return OperationResult(
+        status="success",
+        message=(
+            f"Deleted {len(deleted)} uploaded files and forgot {forgotten} "
+            "expired uploads."
+        ),
+        data={"deleted": deleted, "expired": forgotten},
+    )
+
+
 @mcp.tool(
     description="Checks Gemini Tool server status and API connectivity. Returns version info, model availability, and a list of available functions."
 )
@@ -797,6 +1238,7 @@ def server_info() -> ServerInfo:
         memory_manager=memory_manager,
         vision_support=True,
         image_generation=True,
+        batch_jobs=True,
     )
 
     # Manually add embedding capabilities to the server info
@@ -805,6 +1247,7 @@ def server_info() -> ServerInfo:
         "calculate_similarity - Compare two texts for semantic similarity.",
         "index_documents - Create a searchable index from files.",
         "search_documents - Search an index for a query.",
+        "cleanup_files - Delete stale Files API uploads.",
     ]
     info.capabilities.extend(embedding_capabilities)
 
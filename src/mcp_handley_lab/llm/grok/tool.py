@@ -5,7 +5,7 @@ from typing import Any
 
 from mcp.server.fastmcp import FastMCP
 from pydantic import Field
-from xai_sdk import Client
+from xai_sdk import AsyncClient, Client
 
 from mcp_handley_lab.common.config import settings
 from mcp_handley_lab.llm.common import (
@@ -13,16 +13,24 @@ from mcp_handley_lab.llm.common import (
     load_provider_models,
     resolve_files_for_llm,
 )
+from mcp_handley_lab.llm.image_processing import image_target
 from mcp_handley_lab.llm.memory import memory_manager
 from mcp_handley_lab.llm.model_loader import (
     get_structured_model_listing,
 )
-from mcp_handley_lab.llm.shared import process_image_generation, process_llm_request
+from mcp_handley_lab.llm.shared import (
+    async_ask_batch_tool,
+    async_ask_tool,
+    process_image_generation,
+    process_llm_request,
+)
+from mcp_handley_lab.llm.usage import build_usage_report
 from mcp_handley_lab.shared.models import (
     ImageGenerationResult,
     LLMResult,
     ModelListing,
     ServerInfo,
+    UsageReport,
 )
 
 mcp = FastMCP("Grok Tool")
@@ -44,18 +52,33 @@ def _get_client() -> Client:
     return _client
 
 
+_async_client: AsyncClient | None = None
+
+
+def _get_async_client() -> AsyncClient:
+    """Get or create the global async Grok client with thread safety."""
+    global _async_client
+    with _client_lock:
+        if _async_client is None:
+            try:
+                _async_client = AsyncClient(api_key=settings.xai_api_key)
+            except Exception as e:
+                raise RuntimeError(f"Failed to initialize Grok client: {e}") from e
+    return _async_client
+
+
 # Load model configurations using shared loader
 MODEL_CONFIGS, DEFAULT_MODEL, _get_model_config = load_provider_models("grok")
 
 
-def _grok_generation_adapter(
+def _grok_request_params(
     prompt: str,
     model: str,
     history: list[dict[str, str]],
     system_instruction: str,
-    **kwargs,
+    kwargs: dict[str, Any],
 ) -> dict[str, Any]:
-    """Grok-specific text generation function for the shared processor."""
+    """Build chat parameters for a text generation request."""
     from xai_sdk import chat
 
     # Extract Grok-specific parameters
@@ -102,11 +125,11 @@ def _grok_generation_adapter(
         request_params["max_tokens"] = max_output_tokens
     else:
         request_params["max_tokens"] = default_tokens
+    return request_params
 
-    # Make API call using XAI SDK's two-step process
-    chat_session = _get_client().chat.create(**request_params)
-    response = chat_session.sample()
 
+def _response_data(response) -> dict[str, Any]:
+    """Extract the response text and metadata from a Grok response."""
     if not response or not response.proto or not response.proto.choices:
         raise RuntimeError("No response generated")
 
@@ -145,6 +168,58 @@ def _grok_generation_adapter(
     }
 
 
+def _grok_generation_adapter(
+    prompt: str,
+    model: str,
+    history: list[dict[str, str]],
+    system_instruction: str,
+    **kwargs,
+) -> dict[str, Any]:
+    """Grok-specific text generation function for the shared processor."""
+    request_params = _grok_request_params(
+        prompt, model, history, system_instruction, kwargs
+    )
+    on_text = kwargs.get("on_text")
+
+    # Make API call using XAI SDK's two-step process
+    chat_session = _get_client().chat.create(**request_params)
+    if on_text:
+        # The stream yields the response accumulated so far with each chunk
+        response = None
+        for partial, chunk in chat_session.stream():
+            response = partial
+            on_text(chunk.content)
+    else:
+        response = chat_session.sample()
+
+    return _response_data(response)
+
+
+async def _grok_generation_adapter_async(
+    prompt: str,
+    model: str,
+    history: list[dict[str, str]],
+    system_instruction: str,
+    **kwargs,
+) -> dict[str, Any]:
+    """Async counterpart of _grok_generation_adapter using the async xai-sdk client."""
+    request_params = _grok_request_params(
+        prompt, model, history, system_instruction, kwargs
+    )
+    on_text = kwargs.get("on_text")
+
+    chat_session = _get_async_client().chat.create(**request_params)
+    if on_text:
+        response = None
+        async for partial, chunk in chat_session.stream():
+            response = partial
+            await on_text(chunk.content)
+    else:
+        response = await chat_session.sample()
+
+    return _response_data(response)
+
+
 def _grok_image_analysis_adapter(
     prompt: str,
     model: str,
@@ -167,7 +242,10 @@ def _grok_image_analysis_adapter(
     if focus != "general":
         prompt = f"Focus on {focus} aspects. {prompt}"
 
-    prompt_text, image_blocks = resolve_images_for_multimodal_prompt(prompt, images)
+    target = image_target("grok") if kwargs.get("downsize", True) else None
+    prompt_text, image_blocks = resolve_images_for_multimodal_prompt(
+        prompt, images, target
+    )
 
     # Build messages using xai-sdk helpers
     messages = []
@@ -244,9 +322,10 @@ def _grok_image_analysis_adapter(
     }
 
 
-@mcp.tool(
-    description="Delegates a user query to external xAI Grok service. Can take a prompt directly or load it from a template file with variables. Returns Grok's verbatim response. Use `agent_name` for separate conversation thread. For code reviews, use code2prompt first."
-)
+ASK_DESCRIPTION = "Delegates a user query to external xAI Grok service. Can take a prompt directly or load it from a template file with variables. Returns Grok's verbatim response. Use `agent_name` for separate conversation thread. For code reviews, use code2prompt first."
+ASK_BATCH_DESCRIPTION = "Delegates many independent queries to external xAI Grok service concurrently, for screening or bulk processing. Each prompt or prompt file is sent as its own request without conversation memory, sharing the other parameters, and its response is written to its own file in `output_dir`. Returns per-item usage with aggregate cost and wall time."
+
+
 def ask(
     prompt: str = Field(
         default=None,
@@ -296,6 +375,18 @@ def ask(
         default_factory=dict,
         description="A dictionary of variables for template substitution in the system prompt using ${var} syntax.",
     ),
+    history_budget: int = Field(
+        default=0,
+        description="Token budget for conversation history. 0 fits the model's input limit, a positive value caps history at that many tokens, -1 sends the full history.",
+    ),
+    cache_response: bool = Field(
+        default=False,
+        description="If True, reuse the response to an identical earlier request at no cost, and cache this one. Temperature-0 requests are also cached when the response cache is enabled.",
+    ),
+    stream: bool = Field(
+        default=False,
+        description="If True, stream the response, appending it to output_file as it arrives and reporting it as progress notifications.",
+    ),
 ) -> LLMResult:
     """Ask Grok a question with optional persistent memory."""
     return process_llm_request(
@@ -314,9 +405,20 @@ def ask(
         system_prompt=system_prompt,
         system_prompt_file=system_prompt_file,
         system_prompt_vars=system_prompt_vars,
+        history_budget=history_budget,
+        cache_response=cache_response,
+        stream=stream,
     )
 
 
+mcp.tool(name="ask", description=ASK_DESCRIPTION)(
+    async_ask_tool(ask, "grok", _grok_generation_adapter_async, mcp)
+)
+mcp.tool(name="ask_batch", description=ASK_BATCH_DESCRIPTION)(
+    async_ask_batch_tool(ask, "grok", _grok_generation_adapter_async, mcp)
+)
+
+
 @mcp.tool(
     description="Delegates image analysis to external Grok vision AI service on behalf of the user. Returns Grok's verbatim visual analysis to assist the user."
 )
@@ -353,6 +455,10 @@ def analyze_image(
         default=None,
         description="System instructions to send to external Grok AI service. Remembered for this conversation thread.",
     ),
+    downsize: bool = Field(
+        default=True,
+        description="If True, scale large images down to the resolution the model uses and re-encode them as JPEG before upload. Set False to send the original files.",
+    ),
 ) -> LLMResult:
     """Analyze images with Grok vision model."""
     return process_llm_request(
@@ -367,6 +473,7 @@ def analyze_image(
         focus=focus,
         max_output_tokens=max_output_tokens,
         system_prompt=system_prompt,
+        downsize=downsize,
     )
 
 
@@ -451,6 +558,33 @@ def list_models() -> ModelListing:
     return get_structured_model_listing("grok", api_model_ids)
 
 
+@mcp.tool(
+    description="Reports LLM spend and token usage recorded by all provider tools, as precomputed hourly or daily totals per provider and model. Covers the current month unless a range is given. Use this to answer questions such as how much has been spent this month."
+)
+def usage_report(
+    period: str = Field(
+        default="day", description="Bucket size of the totals: 'hour' or 'day'."
+    ),
+    since: str = Field(
+        default="",
+        description="ISO date or datetime to report from. Defaults to the start of the current month.",
+    ),
+    until: str = Field(
+        default="",
+        description="ISO date or datetime to report up to, exclusive. Defaults to no limit.",
+    ),
+    provider: str = Field(
+        default="",
+        description="Only report this provider (e.g., 'openai'). Empty for all providers.",
+    ),
+    model: str = Field(
+        default="", description="Only report this model. Empty for all models."
+    ),
+) -> UsageReport:
+    """Report recorded LLM usage and spend from the usage ledger."""
+    return build_usage_report(period, since, until, provider, model)
+
+
 @mcp.tool(
     description="Checks Grok Tool server status and API connectivity. Returns version info, model availability, and a list of available functions."
 )
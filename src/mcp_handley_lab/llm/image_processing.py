@@ -0,0 +1,97 @@
+"""Downsizing of images before they are sent to vision models."""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from PIL import Image, ImageOps
+
+from mcp_handley_lab.llm.model_loader import get_provider_models
+
+# Number of prepared images kept in memory for reuse
+PREPARED_IMAGE_CACHE_ENTRIES = 64
+
+
+class ImageTarget(NamedTuple):
+    """The size and encoding a provider's images are prepared for.
+
+    max_dimension is the longest side in pixels, beyond which the provider
+    downscales images itself; format is a Pillow format name such as "WEBP".
+    """
+
+    max_dimension: int
+    format: str
+    quality: int
+
+
+def image_target(provider: str) -> ImageTarget:
+    """Get a provider's image target from the image_preprocessing in its models.yaml."""
+    config = get_provider_models(provider).config["image_preprocessing"]
+    return ImageTarget(
+        max_dimension=config["max_dimension"],
+        format=config["format"].upper(),
+        quality=config["quality"],
+    )
+
+
+_prepared: OrderedDict[tuple[str, ImageTarget], tuple[bytes, str]] = OrderedDict()
+_prepared_lock = threading.Lock()
+
+
+def prepare_image(
+    image_bytes: bytes, mime_type: str, target: ImageTarget
+) -> tuple[bytes, str]:
+    """Downsize and re-encode an image for a provider.
+
+    Images are scaled to fit target.max_dimension and re-encoded in the target
+    format. An image that needs no scaling is sent as it is when re-encoding
+    would not make it smaller, as are animated images. Results are cached by
+    content hash.
+
+    Returns tuple of (image bytes, MIME type).
+    """
+    key = (hashlib.sha256(image_bytes).hexdigest(), target)
+    with _prepared_lock:
+        prepared = _prepared.get(key)
+        if prepared is not None:
+            _prepared.move_to_end(key)
+            return prepared
+
+    prepared = _prepare(image_bytes, mime_type, target)
+    with _prepared_lock:
+        _prepared[key] = prepared
+        while len(_prepared) > PREPARED_IMAGE_CACHE_ENTRIES:
+            _prepared.popitem(last=False)
+    return prepared
+
+
+def _prepare(
+    image_bytes: bytes, mime_type: str, target: ImageTarget
+) -> tuple[bytes, str]:
+    image = Image.open(io.BytesIO(image_bytes))
+    if getattr(image, "is_animated", False):
+        return image_bytes, mime_type
+
+    # Phone photos are often stored sideways with an orientation tag
+    image = ImageOps.exif_transpose(image)
+    resized = max(image.size) > target.max_dimension
+    if resized:
+        image.thumbnail(
+            (target.max_dimension, target.max_dimension), Image.Resampling.LANCZOS
+        )
+
+    has_alpha = "A" in image.getbands() or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    if has_alpha and target.format == "JPEG":
+        # JPEG has no alpha channel, so flatten transparency onto white
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+
+    output = io.BytesIO()
+    image.save(output, format=target.format, quality=target.quality)
+    if not resized and output.tell() >= len(image_bytes):
+        return image_bytes, mime_type
+    return output.getvalue(), f"image/{target.format.lower()}"
@@ -1,10 +1,26 @@
 """Agent memory management for persistent LLM conversations."""
 
-from datetime import datetime
+import fcntl
+import gzip
+import json
+import math
+import os
+import sqlite3
+import threading
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, GetCoreSchemaHandler, PrivateAttr
+from pydantic_core import core_schema
+
+from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm.sqlite_database import SQLiteDatabase
 
 
 class Message(BaseModel):
@@ -23,6 +39,217 @@ class Message(BaseModel):
     )
 
 
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_ROLES: list[str] = ["user", "assistant", "system"]
+_ROLE_CODES: dict[str, int] = {role: code for code, role in enumerate(_ROLES)}
+
+
+def _role_code(role: str) -> int:
+    """Get the compact code for a role, registering unseen roles."""
+    if role not in _ROLE_CODES:
+        _ROLE_CODES[role] = len(_ROLES)
+        _ROLES.append(role)
+    return _ROLE_CODES[role]
+
+
+class MessageStore(Sequence):
+    """Columnar storage for an agent's messages.
+
+    Roles, timestamps, token counts and costs live in parallel typed arrays
+    next to a list of content strings, so each message costs a few dozen bytes
+    beyond its text instead of a Pydantic model and a datetime. Indexing
+    materialises ``Message`` objects on demand; ``history`` and ``content`` read
+    the columns directly. Serialises to the same JSON as a list of messages.
+    """
+
+    __slots__ = ("_roles", "_contents", "_timestamps", "_tokens", "_costs")
+
+    def __init__(self, messages: Iterable[Message] = ()):
+        self._roles = array("B")
+        self._contents: list[str] = []
+        self._timestamps = array("q")
+        self._tokens = array("q")
+        self._costs = array("d")
+        for message in messages:
+            self.append(message)
+
+    def append_row(
+        self,
+        role: str,
+        content: str,
+        timestamp: datetime,
+        tokens: int | None,
+        cost: float | None,
+    ):
+        """Append a message from its field values."""
+        self._roles.append(_role_code(role))
+        self._contents.append(content)
+        self._timestamps.append((timestamp - _EPOCH) // _MICROSECOND)
+        self._tokens.append(-1 if tokens is None else tokens)
+        self._costs.append(math.nan if cost is None else cost)
+
+    def append(self, message: Message):
+        """Append a message."""
+        self.append_row(
+            message.role,
+            message.content,
+            message.timestamp,
+            message.tokens,
+            message.cost,
+        )
+
+    def _fields(self, i: int) -> dict[str, Any]:
+        """Get the field values of the message at a non-negative index."""
+        tokens = self._tokens[i]
+        cost = self._costs[i]
+        return {
+            "role": _ROLES[self._roles[i]],
+            "content": self._contents[i],
+            "timestamp": _EPOCH + self._timestamps[i] * _MICROSECOND,
+            "tokens": None if tokens < 0 else tokens,
+            "cost": None if math.isnan(cost) else cost,
+        }
+
+    def __len__(self) -> int:
+        # Costs are appended last, so every column holds at least this many rows
+        # even while another thread is appending.
+        return len(self._costs)
+
+    def __getitem__(self, index: int | slice) -> Message | list[Message]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Message(**self._fields(range(len(self))[index]))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"MessageStore({len(self)} messages)"
+
+    def content(self, index: int) -> str:
+        """Get the content of the message at an index."""
+        return self._contents[index]
+
+    def history(self, limit: int | None = None) -> list[dict[str, str]]:
+        """Get role and content of the first limit messages without building models."""
+        count = len(self) if limit is None else min(limit, len(self))
+        return [
+            {"role": _ROLES[code], "content": content}
+            for code, content in zip(
+                self._roles[:count], self._contents[:count], strict=True
+            )
+        ]
+
+    def replace_oldest(self, count: int, message: Message) -> list[Message]:
+        """Replace the first count messages with one message, returning them."""
+        replaced = self[:count]
+        count = len(replaced)
+        self._roles[:count] = array("B", [_role_code(message.role)])
+        self._contents[:count] = [message.content]
+        self._timestamps[:count] = array(
+            "q", [(message.timestamp - _EPOCH) // _MICROSECOND]
+        )
+        self._tokens[:count] = array(
+            "q", [-1 if message.tokens is None else message.tokens]
+        )
+        self._costs[:count] = array(
+            "d", [math.nan if message.cost is None else message.cost]
+        )
+        return replaced
+
+    def _serialize(self, info: core_schema.SerializationInfo) -> list[dict]:
+        """Serialise as a list of message dictionaries."""
+        rows = [self._fields(i) for i in range(len(self))]
+        if info.mode_is_json():
+            for row in rows:
+                row["timestamp"] = row["timestamp"].isoformat()
+        return rows
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        from_messages = core_schema.no_info_after_validator_function(
+            cls, core_schema.list_schema(handler.generate_schema(Message))
+        )
+        return core_schema.union_schema(
+            [core_schema.is_instance_schema(cls), from_messages],
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                cls._serialize, info_arg=True
+            ),
+        )
+
+
+class AgentSummary(BaseModel):
+    """Lightweight description of an agent, kept in the manifest."""
+
+    name: str = Field(..., description="The unique name of the agent.")
+    system_prompt: str | None = Field(
+        default=None, description="The system prompt for the agent."
+    )
+    created_at: datetime = Field(
+        ..., description="The timestamp when the agent was created."
+    )
+    message_count: int = Field(
+        default=0, description="The number of messages in the agent's history."
+    )
+    total_tokens: int = Field(
+        default=0, description="The cumulative token count for this agent."
+    )
+    total_cost: float = Field(
+        default=0.0, description="The cumulative cost for this agent's conversations."
+    )
+    last_used: datetime | None = Field(
+        default=None,
+        description="When the agent last received a message, if it has any.",
+    )
+    parent: str | None = Field(
+        default=None, description="The agent this one was forked from, if any."
+    )
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get summary statistics for the agent."""
+        return {
+            "name": self.name,
+            "created_at": self.created_at.isoformat(),
+            "message_count": self.message_count,
+            "total_tokens": self.total_tokens,
+            "total_cost": self.total_cost,
+            "system_prompt": self.system_prompt,
+        }
+
+
+class MaintenanceReport(BaseModel):
+    """Outcome of applying the retention policy to agent memory."""
+
+    evicted: list[str] = Field(
+        default_factory=list, description="Agents deleted by the retention policy."
+    )
+    compressed: list[str] = Field(
+        default_factory=list, description="Idle agents whose snapshots were compressed."
+    )
+    bytes_reclaimed: int = Field(
+        default=0, description="Disk space freed by eviction and compression."
+    )
+
+
+class SearchHit(BaseModel):
+    """A message matching a full-text search."""
+
+    agent_name: str = Field(..., description="The agent whose history matched.")
+    index: int = Field(
+        ..., description="Position of the message in the agent's history."
+    )
+    role: str = Field(..., description="The role of the message sender.")
+    snippet: str = Field(
+        ..., description="Excerpt of the message with matches in [brackets]."
+    )
+    score: float = Field(..., description="Relevance score; higher is better.")
+
+
 class AgentMemory(BaseModel):
     """Persistent memory for a named agent."""
 
@@ -34,8 +261,9 @@ class AgentMemory(BaseModel):
     created_at: datetime = Field(
         ..., description="The timestamp when the agent was created."
     )
-    messages: list[Message] = Field(
-        default_factory=list, description="The list of conversation messages."
+    messages: MessageStore = Field(
+        default_factory=MessageStore,
+        description="The conversation messages, stored column-wise.",
     )
     total_tokens: int = Field(
         default=0, description="The cumulative token count for this agent."
@@ -43,8 +271,53 @@ class AgentMemory(BaseModel):
     total_cost: float = Field(
         default=0.0, description="The cumulative cost for this agent's conversations."
     )
+    parent: str | None = Field(
+        default=None, description="The agent this one was forked from, if any."
+    )
+    parent_length: int = Field(
+        default=0,
+        description="The number of the parent's messages this agent continues from.",
+    )
+    _parent: "AgentMemory | None" = PrivateAttr(default=None)
+
+    @property
+    def history_length(self) -> int:
+        """The number of messages in the history, including inherited ones."""
+        return self.parent_length + len(self.messages)
+
+    def attach_parent(self, parent: "AgentMemory"):
+        """Link the loaded parent whose history prefix this agent shares."""
+        self._parent = parent
+
+    def detach_parent(self) -> list[Message]:
+        """Copy the inherited messages into this agent and drop the parent link.
 
-    def add_message(self, role: str, content: str, tokens: int = 0, cost: float = 0.0):
+        Returns the messages that were copied.
+        """
+        inherited = self._inherited(self.parent_length)
+        self.messages = MessageStore([*inherited, *self.messages])
+        self.parent = None
+        self.parent_length = 0
+        self._parent = None
+        return inherited
+
+    def _inherited(self, limit: int) -> list[Message]:
+        """Get the first limit messages of the history as models."""
+        count = min(limit, self.parent_length)
+        head = self._parent_agent()._inherited(count) if count else []
+        return head + self.messages[: limit - count]
+
+    def _parent_agent(self) -> "AgentMemory":
+        """Get the attached parent, failing if it was never loaded."""
+        if self._parent is None:
+            raise RuntimeError(
+                f"Parent agent '{self.parent}' of '{self.name}' is not loaded"
+            )
+        return self._parent
+
+    def add_message(
+        self, role: str, content: str, tokens: int = 0, cost: float = 0.0
+    ) -> Message:
         """Add a message to the agent's memory."""
         message = Message(
             role=role,
@@ -53,97 +326,1092 @@ class AgentMemory(BaseModel):
             tokens=tokens,
             cost=cost,
         )
+        self.append_message(message)
+        return message
+
+    def append_message(self, message: Message):
+        """Append an existing message and update the running totals."""
         self.messages.append(message)
-        self.total_tokens += tokens
-        self.total_cost += cost
+        self.total_tokens += message.tokens or 0
+        self.total_cost += message.cost or 0.0
+
+    def replace_oldest(self, count: int, summary: Message) -> list[Message]:
+        """Replace the oldest messages with a single summary message.
+
+        Running totals are cumulative and keep the replaced messages' usage; the
+        summary's own tokens and cost are added. Returns the replaced messages.
+        """
+        replaced = self.messages.replace_oldest(count, summary)
+        self.total_tokens += summary.tokens or 0
+        self.total_cost += summary.cost or 0.0
+        return replaced
 
     def clear_history(self):
-        """Clear all conversation history."""
-        self.messages = []
+        """Clear all conversation history, including any inherited prefix."""
+        self.messages = MessageStore()
         self.total_tokens = 0
         self.total_cost = 0.0
+        self.parent = None
+        self.parent_length = 0
+        self._parent = None
 
-    def get_history(self) -> list[dict[str, str]]:
-        """Get conversation history in provider-agnostic format."""
-        return [
-            {"role": message.role, "content": message.content}
-            for message in self.messages
-        ]
+    def get_history(self, limit: int | None = None) -> list[dict[str, str]]:
+        """Get conversation history in provider-agnostic format.
+
+        A forked agent's history starts with the parent's first ``parent_length``
+        messages. Pass limit to get only the first limit messages.
+        """
+        if limit is None:
+            limit = self.history_length
+        count = min(limit, self.parent_length)
+        head = self._parent_agent().get_history(count) if count else []
+        return head + self.messages.history(limit - count)
 
     def get_stats(self) -> dict[str, Any]:
         """Get summary statistics for the agent."""
-        return {
-            "name": self.name,
-            "created_at": self.created_at.isoformat(),
-            "message_count": len(self.messages),
-            "total_tokens": self.total_tokens,
-            "total_cost": self.total_cost,
-            "system_prompt": self.system_prompt,
-        }
+        return self.summary().get_stats()
+
+    def summary(self) -> AgentSummary:
+        """Get the manifest entry describing this agent."""
+        return AgentSummary(
+            name=self.name,
+            system_prompt=self.system_prompt,
+            created_at=self.created_at,
+            message_count=self.history_length,
+            total_tokens=self.total_tokens,
+            total_cost=self.total_cost,
+            last_used=self.messages[-1].timestamp if self.messages else None,
+            parent=self.parent,
+        )
 
     def get_response(self, index: int = -1) -> str:
         """Get a message content by index. Raises IndexError if not found."""
-        if not self.messages:
+        if not self.history_length:
             raise IndexError("Cannot get response: agent has no message history")
-        return self.messages[index].content
+        position = range(self.history_length)[index]
+        if position < self.parent_length:
+            return self._parent_agent().get_response(position)
+        return self.messages.content(position - self.parent_length)
+
+
+def _archive_messages(archive_file: Path, messages: list[Message]):
+    """Append messages to an agent's archive file, one JSON object per line."""
+    archive_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(archive_file, "a", encoding="utf-8") as f:
+        for message in messages:
+            f.write(message.model_dump_json() + "\n")
+
+
+def read_archive(archive_file: Path) -> list[Message]:
+    """Read the messages archived from an agent's history by compaction."""
+    if not archive_file.exists():
+        return []
+    return [
+        Message.model_validate_json(line)
+        for line in archive_file.read_text(encoding="utf-8").splitlines()
+    ]
+
+
+def select_evictions(
+    agents: list[tuple[str, datetime, int]],
+    now: datetime,
+    max_age_days: int = 0,
+    max_agents: int = 0,
+    max_bytes: int = 0,
+) -> list[str]:
+    """Choose agents to evict given (name, last used, size in bytes) tuples.
+
+    Agents idle for longer than max_age_days go first; then the least recently
+    used are evicted until at most max_agents remain, using at most max_bytes.
+    A limit of 0 is not enforced.
+    """
+    by_last_use = sorted(agents, key=itemgetter(1))
+    if max_age_days > 0:
+        cutoff = now - timedelta(days=max_age_days)
+        expired = [entry for entry in by_last_use if entry[1] < cutoff]
+        by_last_use = by_last_use[len(expired) :]
+    else:
+        expired = []
+
+    total_bytes = sum(size for _, _, size in by_last_use)
+    lru = 0
+    while lru < len(by_last_use) and (
+        (max_agents > 0 and len(by_last_use) - lru > max_agents)
+        or (max_bytes > 0 and total_bytes > max_bytes)
+    ):
+        total_bytes -= by_last_use[lru][2]
+        lru += 1
+
+    return [name for name, _, _ in expired + by_last_use[:lru]]
+
+
+@contextmanager
+def file_lock(lock_file: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock on a file, shared across processes."""
+    with open(lock_file, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_json_agent(agent_file: Path) -> AgentMemory:
+    """Load an agent's JSON snapshot, plain or gzipped, and replay its journal."""
+    data = agent_file.read_bytes()
+    if agent_file.suffix == ".gz":
+        data = gzip.decompress(data)
+    agent = AgentMemory.model_validate_json(data)
+    _replay_journal(agent, agent_file.parent / f"{agent.name}.jsonl")
+    return agent
+
+
+def _replay_journal(
+    agent: AgentMemory, journal_file: Path, offset: int = 0
+) -> tuple[int, int]:
+    """Apply journaled messages that are not yet part of the snapshot.
+
+    Entries carry their position in the history, so a journal left behind by
+    an interrupted compaction is skipped rather than duplicated. A torn final
+    line (no trailing newline) from an interrupted append is ignored.
+
+    Returns:
+        tuple: (bytes of complete lines read from offset, number of lines)
+    """
+    try:
+        with open(journal_file, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return 0, 0
+
+    complete = data[: data.rfind(b"\n") + 1]
+    lines = complete.splitlines()
+    for line in lines:
+        entry = json.loads(line)
+        if entry["seq"] >= len(agent.messages):
+            agent.append_message(Message.model_validate(entry["message"]))
+    return len(complete), len(lines)
+
+
+def atomic_write(path: Path, data: bytes):
+    """Replace a file's contents so readers see either the old or the new file."""
+    tmp_file = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_file.write_bytes(data)
+    os.replace(tmp_file, path)
+
+
+class MessageSearchIndex(SQLiteDatabase):
+    """Full-text index over the messages of every agent.
+
+    Message text is kept in ``search_entries`` and indexed by an FTS5 table that
+    triggers keep in sync, so each added message costs one indexed insert and
+    searches never scan histories. Positions are stored alongside, letting
+    compaction shift an agent's entries with a single indexed update. Once
+    opened, ``is_new`` tells whether the index was just created and needs
+    building from existing messages.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS search_entries (
+            id INTEGER PRIMARY KEY,
+            agent TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS search_entries_by_agent
+            ON search_entries (agent, idx);
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+            content,
+            content='search_entries',
+            content_rowid='id',
+            tokenize='porter unicode61'
+        );
+        CREATE TRIGGER IF NOT EXISTS search_entries_insert
+            AFTER INSERT ON search_entries BEGIN
+                INSERT INTO search_fts (rowid, content) VALUES (new.id, new.content);
+            END;
+        CREATE TRIGGER IF NOT EXISTS search_entries_delete
+            AFTER DELETE ON search_entries BEGIN
+                INSERT INTO search_fts (search_fts, rowid, content)
+                    VALUES ('delete', old.id, old.content);
+            END;
+    """
+
+    is_new = False
+
+    def _setup(self):
+        conn = self._connection()
+        self.is_new = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'search_entries'"
+        ).fetchall()
+        conn.executescript(self.SCHEMA)
+
+    def add(self, agent_name: str, entries: list[tuple[int, str, str]]):
+        """Index messages given as (index, role, content) tuples."""
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO search_entries (agent, idx, role, content) "
+                "VALUES (?, ?, ?, ?)",
+                [(agent_name, *entry) for entry in entries],
+            )
+
+    def remove_agent(self, agent_name: str):
+        """Drop every indexed message of an agent."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM search_entries WHERE agent = ?", (agent_name,))
+
+    def replace_oldest(self, agent_name: str, count: int, summary: str):
+        """Mirror a compaction: drop the oldest entries and index the summary."""
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM search_entries WHERE agent = ? AND idx < ?",
+                (agent_name, count),
+            )
+            conn.execute(
+                "UPDATE search_entries SET idx = idx - ? WHERE agent = ?",
+                (count - 1, agent_name),
+            )
+            conn.execute(
+                "INSERT INTO search_entries (agent, idx, role, content) "
+                "VALUES (?, 0, 'user', ?)",
+                (agent_name, summary),
+            )
+
+    def search(
+        self, query: str, agent_name: str | None = None, limit: int = 10
+    ) -> list[SearchHit]:
+        """Find the messages best matching all words of the query."""
+        terms = query.split()
+        if not terms:
+            raise ValueError("Search query cannot be empty")
+        # Quote each word so FTS5 operators in user input are matched literally
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+        sql = (
+            "SELECT e.agent, e.idx, e.role, "
+            "snippet(search_fts, 0, '[', ']', '...', 12), bm25(search_fts) "
+            "FROM search_fts JOIN search_entries e ON e.id = search_fts.rowid "
+            "WHERE search_fts MATCH ?"
+        )
+        params: tuple = (match,)
+        if agent_name is not None:
+            sql += " AND e.agent = ?"
+            params += (agent_name,)
+        sql += " ORDER BY bm25(search_fts) LIMIT ?"
+
+        return [
+            SearchHit(
+                agent_name=agent, index=idx, role=role, snippet=snippet, score=-rank
+            )
+            for agent, idx, role, snippet, rank in self._query(sql, params + (limit,))
+        ]
 
 
 class MemoryManager:
-    """Manages agent memories with file-based persistence."""
+    """Manages agent memories with file-based persistence.
 
-    def __init__(self, storage_dir: str = ".mcp_handley_lab"):
+    Each agent is stored as a JSON snapshot (``<name>.json``) plus an append-only
+    JSONL journal (``<name>.jsonl``) of the messages added since the snapshot was
+    written. Adding a message costs one small append regardless of history
+    length; the journal is folded back into the snapshot every ``compact_every``
+    messages.
+
+    A manifest (``agents_index.json``) holds an ``AgentSummary`` per agent, so
+    listing agents and reading their statistics never parses message
+    histories. Full histories are loaded on first ``get_agent`` and cached.
+
+    Messages replaced by a summary in ``compact_history`` are moved to
+    ``archive/<name>.jsonl``. A ``MessageSearchIndex`` in ``search.db`` is
+    updated alongside every change and built once from existing agents.
+    Directories and the index are created on first use, not on construction.
+
+    ``apply_retention`` evicts agents by age, count and size, least recently
+    used first, and gzips idle snapshots to ``<name>.json.gz``; compressed
+    agents are decompressed transparently on first access.
+
+    Every operation on an agent holds a per-agent thread lock and an advisory
+    ``fcntl`` lock on ``locks/<name>.lock``, so threads and processes sharing the
+    storage directory serialise their writes. Snapshots and the manifest are
+    replaced by atomic rename, and cached agents pick up messages that other
+    processes appended to the journal before each use. Messages added inside
+    ``batch`` are written in a single flush.
+
+    ``fork_agent`` creates a child that shares a prefix of its parent's history
+    by reference: the child's snapshot records the parent and prefix length and
+    holds only the child's own messages, and a loaded child reads the prefix
+    from the cached parent. Before a parent's history is rewritten by clearing,
+    compaction or deletion, its children are detached by copying the prefix
+    into them.
+    """
+
+    def __init__(self, storage_dir: str = ".mcp_handley_lab", compact_every: int = 500):
         self.storage_dir = Path(storage_dir)
         self.agents_dir = self.storage_dir / "agents"
-        self.agents_dir.mkdir(parents=True, exist_ok=True)
+        self.archive_dir = self.storage_dir / "archive"
+        self.locks_dir = self.storage_dir / "locks"
+        self.index_file = self.storage_dir / "agents_index.json"
+        self.compact_every = compact_every
         self._agents: dict[str, AgentMemory] = {}
-        self._load_agents()
+        # Snapshot identity and journal position each cached agent reflects
+        self._snapshots: dict[str, tuple[int, int, int]] = {}
+        self._journal_offsets: dict[str, int] = {}
+        self._journal_lengths: dict[str, int] = {}
+        self._locks: dict[str, threading.RLock] = {}
+        self._lock_depths: dict[str, int] = {}
+        self._locks_guard = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._pending: dict[str, list[Message]] = {}
+        self._search_index = MessageSearchIndex(self.storage_dir / "search.db")
+        self._open_lock = threading.Lock()
+        self._opened = False
+
+    def _open(self):
+        """Create the storage directories, manifest and search index on first use.
+
+        The manifest is built from legacy snapshots and the index from existing
+        agents when either is missing.
+        """
+        if self._opened:
+            return
+        with self._open_lock:
+            if self._opened:
+                return
+            self.agents_dir.mkdir(parents=True, exist_ok=True)
+            self.locks_dir.mkdir(exist_ok=True)
+            self._load_agents()
+            self._search_index._connection()
+            if self._search_index.is_new:
+                for summary in self._read_index().values():
+                    # Skip agents whose files were deleted since the manifest
+                    # was written, as list_agents does
+                    agent_file = self._get_stored_file(summary.name)
+                    if agent_file is None:
+                        continue
+                    agent = _read_json_agent(agent_file)
+                    self._index_messages(
+                        agent.name, agent.messages, agent.parent_length
+                    )
+            self._opened = True
+
+    @property
+    def search_index(self) -> MessageSearchIndex:
+        """The full-text index of every agent's messages."""
+        self._open()
+        return self._search_index
+
+    def _index_messages(self, name: str, messages: list[Message], start: int = 0):
+        """Add messages to the search index, numbering them from start."""
+        self._search_index.add(
+            name,
+            [(start + i, m.role, m.content) for i, m in enumerate(messages)],
+        )
+
+    @contextmanager
+    def _locked(self, name: str) -> Iterator[None]:
+        """Hold an agent's thread lock and cross-process file lock.
+
+        Re-entrant within a thread: the file lock is taken only by the outermost
+        call, since a second ``flock`` from the same process would block.
+        """
+        self._open()
+        with self._locks_guard:
+            lock = self._locks.setdefault(name, threading.RLock())
+        with lock:
+            depth = self._lock_depths.get(name, 0)
+            self._lock_depths[name] = depth + 1
+            try:
+                if depth:
+                    yield
+                else:
+                    with file_lock(self.locks_dir / f"{name}.lock"):
+                        yield
+            finally:
+                self._lock_depths[name] = depth
 
     def _get_agent_file(self, name: str) -> Path:
         """Get the file path for an agent."""
         return self.agents_dir / f"{name}.json"
 
+    def _get_compressed_file(self, name: str) -> Path:
+        """Get the compressed snapshot path for an idle agent."""
+        return self.agents_dir / f"{name}.json.gz"
+
+    def _get_stored_file(self, name: str) -> Path | None:
+        """Get whichever snapshot of an agent exists, plain or compressed."""
+        for agent_file in (self._get_agent_file(name), self._get_compressed_file(name)):
+            if agent_file.exists():
+                return agent_file
+        return None
+
+    def _get_journal_file(self, name: str) -> Path:
+        """Get the journal file path for an agent."""
+        return self.agents_dir / f"{name}.jsonl"
+
+    def get_archive_file(self, name: str) -> Path:
+        """Get the file holding an agent's compacted messages."""
+        return self.archive_dir / f"{name}.jsonl"
+
     def _load_agents(self):
-        """Load agents from disk."""
-        if not self.agents_dir.exists():
+        """Ensure the agent manifest exists, building it from legacy snapshots."""
+        if self.index_file.exists() or not self.agents_dir.exists():
             return
 
-        for agent_file in self.agents_dir.glob("*.json"):
-            agent = AgentMemory.model_validate_json(agent_file.read_text())
-            self._agents[agent.name] = agent
+        with self._index_locked():
+            if self.index_file.exists():
+                return
+            index = {}
+            agent_files = [
+                *self.agents_dir.glob("*.json"),
+                *self.agents_dir.glob("*.json.gz"),
+            ]
+            for agent_file in agent_files:
+                agent = _read_json_agent(agent_file)
+                index[agent.name] = agent.summary()
+            if index:
+                self._write_index(index)
+
+    def _load(self, name: str) -> AgentMemory | None:
+        """Get an agent, bringing the cached copy up to date with the files.
+
+        Must be called with the agent's lock held. A forked agent's parent is
+        loaded too, taking the parent's lock after the child's.
+        """
+        agent_file = self._get_agent_file(name)
+        try:
+            stat = agent_file.stat()
+        except FileNotFoundError:
+            self._forget(name)
+            compressed_file = self._get_compressed_file(name)
+            if not compressed_file.exists():
+                return None
+            agent = _read_json_agent(compressed_file)
+            self._agents[name] = agent
+            self._save_agent(agent)
+            compressed_file.unlink()
+        else:
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            agent = self._agents.get(name)
+            if agent is None or self._snapshots.get(name) != signature:
+                agent = AgentMemory.model_validate_json(agent_file.read_bytes())
+                self._agents[name] = agent
+                self._snapshots[name] = signature
+                self._journal_offsets[name] = 0
+                self._journal_lengths[name] = 0
+
+            read, lines = _replay_journal(
+                agent, self._get_journal_file(name), self._journal_offsets[name]
+            )
+            self._journal_offsets[name] += read
+            self._journal_lengths[name] += lines
+
+        if agent.parent:
+            with self._locked(agent.parent):
+                parent = self._load(agent.parent)
+            if parent is None:
+                raise ValueError(f"Parent agent '{agent.parent}' of '{name}' not found")
+            agent.attach_parent(parent)
+        return agent
+
+    def _forget(self, name: str):
+        """Drop an agent from the cache."""
+        self._agents.pop(name, None)
+        self._snapshots.pop(name, None)
+        self._journal_offsets.pop(name, None)
+        self._journal_lengths.pop(name, None)
+
+    @contextmanager
+    def _index_locked(self) -> Iterator[None]:
+        """Hold the manifest's thread lock and cross-process file lock."""
+        with self._index_lock, file_lock(self.locks_dir / "agents_index.lock"):
+            yield
+
+    def _read_index(self) -> dict[str, AgentSummary]:
+        """Read the agent manifest from disk."""
+        if not self.index_file.exists():
+            return {}
+        entries = json.loads(self.index_file.read_text(encoding="utf-8"))
+        return {name: AgentSummary.model_validate(e) for name, e in entries.items()}
+
+    def _write_index(self, index: dict[str, AgentSummary]):
+        """Atomically replace the agent manifest on disk."""
+        entries = {
+            name: summary.model_dump(mode="json") for name, summary in index.items()
+        }
+        atomic_write(self.index_file, json.dumps(entries, indent=2).encode())
+
+    def _update_index(self, name: str, summary: AgentSummary | None):
+        """Set or remove a single manifest entry, keeping other agents' entries."""
+        with self._index_locked():
+            index = self._read_index()
+            if summary is None:
+                index.pop(name, None)
+            else:
+                index[name] = summary
+            self._write_index(index)
 
     def _save_agent(self, agent: AgentMemory):
-        """Save a single agent to disk."""
+        """Write a full snapshot of an agent and discard its journal."""
+        self._open()
         agent_file = self._get_agent_file(agent.name)
-        agent_file.write_text(agent.model_dump_json(indent=2))
+        atomic_write(agent_file, agent.model_dump_json(indent=2).encode())
+        self._get_journal_file(agent.name).unlink(missing_ok=True)
+        stat = agent_file.stat()
+        self._snapshots[agent.name] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self._journal_offsets[agent.name] = 0
+        self._journal_lengths[agent.name] = 0
+        self._update_index(agent.name, agent.summary())
+
+    def _append_to_journal(self, agent: AgentMemory, messages: list[Message]):
+        """Append messages to the agent's journal in one write, compacting if due."""
+        name = agent.name
+        if self._journal_lengths.get(name, 0) + len(messages) >= self.compact_every:
+            self._save_agent(agent)
+            return
+
+        first_seq = len(agent.messages) - len(messages)
+        data = "".join(
+            json.dumps({"seq": first_seq + i, "message": m.model_dump(mode="json")})
+            + "\n"
+            for i, m in enumerate(messages)
+        ).encode()
+        offset = self._journal_offsets.get(name, 0)
+        with open(self._get_journal_file(name), "ab") as f:
+            # Discard a torn line left by a writer that died mid-append
+            if f.tell() != offset:
+                f.truncate(offset)
+            f.write(data)
+        self._journal_offsets[name] = offset + len(data)
+        self._journal_lengths[name] = self._journal_lengths.get(name, 0) + len(messages)
+        self._update_index(name, agent.summary())
+
+    @contextmanager
+    def batch(self, agent_name: str) -> Iterator[None]:
+        """Group the messages added to an agent into a single flush.
+
+        The agent stays locked for the duration, so the messages are stored
+        contiguously and no other thread or process interleaves with them.
+        """
+        with self._locked(agent_name):
+            if agent_name in self._pending:
+                yield
+                return
+            self._pending[agent_name] = []
+            try:
+                yield
+            finally:
+                messages = self._pending.pop(agent_name)
+                if messages:
+                    self._flush(self._agents[agent_name], messages)
+
+    def _flush(self, agent: AgentMemory, messages: list[Message]):
+        """Persist and index messages already added to the cached agent."""
+        self._append_to_journal(agent, messages)
+        self._index_messages(agent.name, messages, agent.history_length - len(messages))
+
+    def _detach(self, agent: AgentMemory):
+        """Copy a forked agent's inherited prefix into it and save it standalone."""
+        inherited = agent.detach_parent()
+        self._save_agent(agent)
+        self._index_messages(agent.name, inherited)
+
+    @contextmanager
+    def _locked_for_rewrite(self, name: str) -> Iterator[None]:
+        """Lock an agent whose history is about to change, detaching its forks.
+
+        Children are detached before the agent is locked, since loading a child
+        takes the child's lock and then the parent's. A fork created in between
+        is caught by the check under the lock and detached on the next round.
+        """
+        while True:
+            for summary in self.list_agents():
+                if summary.parent == name:
+                    with self._locked(summary.name):
+                        child = self._load(summary.name)
+                        if child and child.parent == name:
+                            self._detach(child)
+            with self._locked(name):
+                if not any(s.parent == name for s in self.list_agents()):
+                    yield
+                    return
 
     def create_agent(self, name: str, system_prompt: str | None = None) -> AgentMemory:
         """Create a new agent."""
-        if name in self._agents:
-            raise ValueError(f"Agent '{name}' already exists")
+        with self._locked(name):
+            if self._get_stored_file(name):
+                raise ValueError(f"Agent '{name}' already exists")
+
+            agent = AgentMemory(
+                name=name, system_prompt=system_prompt, created_at=datetime.now()
+            )
+            self._agents[name] = agent
+            self._save_agent(agent)
+            return agent
+
+    def fork_agent(
+        self, parent_name: str, child_name: str, length: int | None = None
+    ) -> AgentMemory:
+        """Create an agent that continues from the first length messages of another.
+
+        The child shares the parent's history prefix instead of copying it, so
+        a fork costs the same whatever the parent's length. By default the
+        child continues from the parent's whole current history.
+        """
+        with self._locked(child_name):
+            if self._get_stored_file(child_name):
+                raise ValueError(f"Agent '{child_name}' already exists")
+
+            with self._locked(parent_name):
+                parent = self._load(parent_name)
+                if not parent:
+                    raise ValueError(f"Agent '{parent_name}' not found")
+                if length is None:
+                    length = parent.history_length
+                if not 0 <= length <= parent.history_length:
+                    raise ValueError(
+                        f"Cannot fork agent '{parent_name}' at {length}: it has "
+                        f"{parent.history_length} messages"
+                    )
+
+                agent = AgentMemory(
+                    name=child_name,
+                    system_prompt=parent.system_prompt,
+                    created_at=datetime.now(),
+                )
+                if length:
+                    agent.parent = parent_name
+                    agent.parent_length = length
+                    agent.attach_parent(parent)
+                self._agents[child_name] = agent
+                self._save_agent(agent)
+                return agent
+
+    def get_agent(self, name: str) -> AgentMemory | None:
+        """Get an existing agent, loading its full history on first access."""
+        with self._locked(name):
+            return self._load(name)
+
+    def list_agents(self) -> list[AgentSummary]:
+        """List summaries of all agents without loading their histories."""
+        self._open()
+        return list(self._read_index().values())
+
+    def get_stats(self, agent_name: str) -> dict[str, Any]:
+        """Get summary statistics for an agent without loading its history."""
+        self._open()
+        summary = self._read_index().get(agent_name)
+        if summary is None:
+            raise ValueError(f"Agent '{agent_name}' not found")
+        return summary.get_stats()
+
+    def delete_agent(self, name: str) -> None:
+        """Delete an agent, first detaching any agents forked from it."""
+        with self._locked_for_rewrite(name):
+            if not self._get_stored_file(name):
+                raise ValueError(f"Agent '{name}' not found")
+            self._forget(name)
+            self._get_agent_file(name).unlink(missing_ok=True)
+            self._get_compressed_file(name).unlink(missing_ok=True)
+            self._get_journal_file(name).unlink(missing_ok=True)
+            self.get_archive_file(name).unlink(missing_ok=True)
+            self._update_index(name, None)
+            self.search_index.remove_agent(name)
+
+    def add_message(
+        self,
+        agent_name: str,
+        role: str,
+        content: str,
+        tokens: int = 0,
+        cost: float = 0.0,
+    ):
+        """Add a message to an agent's memory."""
+        with self._locked(agent_name):
+            agent = self._load(agent_name)
+            if agent:
+                message = agent.add_message(role, content, tokens, cost)
+                if agent_name in self._pending:
+                    self._pending[agent_name].append(message)
+                else:
+                    self._flush(agent, [message])
+
+    def set_system_prompt(self, agent_name: str, system_prompt: str | None) -> None:
+        """Replace an agent's system prompt."""
+        with self._locked(agent_name):
+            agent = self._load(agent_name)
+            if not agent:
+                raise ValueError(f"Agent '{agent_name}' not found")
+            agent.system_prompt = system_prompt
+            self._save_agent(agent)
+
+    def clear_agent_history(self, agent_name: str) -> None:
+        """Clear an agent's conversation history."""
+        with self._locked_for_rewrite(agent_name):
+            agent = self._load(agent_name)
+            if not agent:
+                raise ValueError(f"Agent '{agent_name}' not found")
+            agent.clear_history()
+            self._save_agent(agent)
+            self.search_index.remove_agent(agent_name)
+
+    def compact_history(
+        self,
+        agent_name: str,
+        count: int,
+        summary: str,
+        tokens: int = 0,
+        cost: float = 0.0,
+    ) -> int:
+        """Replace an agent's oldest messages with a summary, archiving the originals.
+
+        A forked agent is detached first, so positions count from the start of
+        its full history. Returns the number of messages archived.
+        """
+        with self._locked_for_rewrite(agent_name):
+            agent = self._load(agent_name)
+            if not agent:
+                raise ValueError(f"Agent '{agent_name}' not found")
+            if agent.parent and count > 0:
+                self._detach(agent)
+            replaced = agent.messages[:count]
+            if not replaced:
+                return 0
+
+            _archive_messages(self.get_archive_file(agent_name), replaced)
+            agent.replace_oldest(
+                len(replaced),
+                Message(
+                    role="user",
+                    content=summary,
+                    timestamp=replaced[-1].timestamp,
+                    tokens=tokens,
+                    cost=cost,
+                ),
+            )
+            self._save_agent(agent)
+            self.search_index.replace_oldest(agent_name, len(replaced), summary)
+            return len(replaced)
+
+    def get_response(self, agent_name: str, index: int = -1) -> str:
+        """Get a message content from an agent by index. Default -1 gets the last message."""
+        agent = self.get_agent(agent_name)
+        if not agent:
+            raise ValueError(f"Agent '{agent_name}' not found")
+
+        return agent.get_response(index)
+
+    def search(
+        self, query: str, agent_name: str | None = None, limit: int = 10
+    ) -> list[SearchHit]:
+        """Full-text search across the messages of all agents, best match first."""
+        return self.search_index.search(query, agent_name, limit)
+
+    def _disk_usage(self, name: str) -> int:
+        """Bytes used on disk by an agent's snapshot, journal and archive."""
+        files = (
+            self._get_agent_file(name),
+            self._get_compressed_file(name),
+            self._get_journal_file(name),
+            self.get_archive_file(name),
+        )
+        return sum(f.stat().st_size for f in files if f.exists())
+
+    def _compress_agent(self, name: str):
+        """Replace an agent's snapshot and journal with a gzipped snapshot."""
+        with self._locked(name):
+            agent_file = self._get_agent_file(name)
+            if not agent_file.exists():
+                return
+            agent = _read_json_agent(agent_file)
+            atomic_write(
+                self._get_compressed_file(name),
+                gzip.compress(agent.model_dump_json().encode()),
+            )
+            agent_file.unlink()
+            self._get_journal_file(name).unlink(missing_ok=True)
+            self._forget(name)
+
+    def apply_retention(
+        self,
+        max_age_days: int = 0,
+        max_agents: int = 0,
+        max_bytes: int = 0,
+        compress_after_days: int = 0,
+    ) -> MaintenanceReport:
+        """Evict agents beyond the retention limits and compress idle ones.
+
+        Limits of 0 are not enforced. Agents are ranked by their last message,
+        falling back to their creation time.
+        """
+        now = datetime.now()
+        summaries = self.list_agents()
+        usage = {s.name: self._disk_usage(s.name) for s in summaries}
+        evicted = select_evictions(
+            [(s.name, s.last_used or s.created_at, usage[s.name]) for s in summaries],
+            now,
+            max_age_days,
+            max_agents,
+            max_bytes,
+        )
+        for name in evicted:
+            self.delete_agent(name)
+
+        compressed = []
+        if compress_after_days > 0:
+            cutoff = now - timedelta(days=compress_after_days)
+            for s in summaries:
+                if (
+                    s.name not in evicted
+                    and (s.last_used or s.created_at) < cutoff
+                    and self._get_agent_file(s.name).exists()
+                ):
+                    self._compress_agent(s.name)
+                    compressed.append(s.name)
+
+        remaining = sum(self._disk_usage(name) for name in compressed)
+        return MaintenanceReport(
+            evicted=evicted,
+            compressed=compressed,
+            bytes_reclaimed=sum(usage[name] for name in evicted + compressed)
+            - remaining,
+        )
+
+
+class SQLiteMemoryManager(SQLiteDatabase):
+    """Manages agent memories in a SQLite database.
+
+    Exposes the same API as ``MemoryManager`` but keeps agents and messages in
+    ``memory.db`` tables, so appending, indexing, clearing and statistics are
+    single indexed statements rather than file rewrites. The database runs in
+    WAL mode, letting several MCP servers share one storage directory.
+    Histories are read fresh on every ``get_agent``; agents returned are
+    detached copies, so changes must go through the manager. Messages replaced
+    by a summary in ``compact_history`` are moved to ``archive/<name>.jsonl``.
+    The ``MessageSearchIndex`` lives in the same database file, and both are
+    opened, migrated and built on first use.
+    ``apply_retention`` evicts agents like ``MemoryManager`` and then vacuums
+    the database to return the freed pages.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS agents (
+            name TEXT PRIMARY KEY,
+            system_prompt TEXT,
+            created_at TEXT NOT NULL,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            total_cost REAL NOT NULL DEFAULT 0.0
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            agent TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            tokens INTEGER,
+            cost REAL,
+            PRIMARY KEY (agent, idx)
+        );
+        CREATE INDEX IF NOT EXISTS messages_by_timestamp
+            ON messages (agent, timestamp);
+    """
+
+    def __init__(self, storage_dir: str = ".mcp_handley_lab"):
+        self.storage_dir = Path(storage_dir)
+        self.archive_dir = self.storage_dir / "archive"
+        super().__init__(self.storage_dir / "memory.db")
+        self._search_index = MessageSearchIndex(self.db_path)
+
+    def _setup(self):
+        """Create the tables, import a JSON store beside them and build the index."""
+        conn = self._connection()
+        is_new = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'agents'"
+        ).fetchall()
+        conn.executescript(self.SCHEMA)
+
+        if is_new and (self.storage_dir / "agents").exists():
+            self.migrate_from_json()
+
+        self._search_index._connection()
+        if self._search_index.is_new:
+            rows = self._query(
+                "SELECT agent, idx, role, content FROM messages ORDER BY agent, idx"
+            )
+            for agent_name, agent_rows in groupby(rows, key=itemgetter(0)):
+                self._search_index.add(agent_name, [row[1:] for row in agent_rows])
+
+    @property
+    def search_index(self) -> MessageSearchIndex:
+        """The full-text index of every agent's messages."""
+        self._connection()
+        return self._search_index
 
+    def get_archive_file(self, name: str) -> Path:
+        """Get the file holding an agent's compacted messages."""
+        return self.archive_dir / f"{name}.jsonl"
+
+    @staticmethod
+    def _summary_from_row(row: tuple) -> AgentSummary:
+        """Build an AgentSummary from an ``agents`` table row."""
+        name, system_prompt, created_at, count, tokens, cost = row
+        return AgentSummary(
+            name=name,
+            system_prompt=system_prompt,
+            created_at=datetime.fromisoformat(created_at),
+            message_count=count,
+            total_tokens=tokens,
+            total_cost=cost,
+        )
+
+    def _get_summary(self, name: str) -> AgentSummary | None:
+        """Read a single agent row."""
+        rows = self._query("SELECT * FROM agents WHERE name = ?", (name,))
+        return self._summary_from_row(rows[0]) if rows else None
+
+    def _insert_agent(self, conn: sqlite3.Connection, agent: AgentMemory):
+        """Insert an agent and all of its messages."""
+        conn.execute(
+            "INSERT INTO agents VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                agent.name,
+                agent.system_prompt,
+                agent.created_at.isoformat(),
+                len(agent.messages),
+                agent.total_tokens,
+                agent.total_cost,
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    agent.name,
+                    idx,
+                    m.role,
+                    m.content,
+                    m.timestamp.isoformat(),
+                    m.tokens,
+                    m.cost,
+                )
+                for idx, m in enumerate(agent.messages)
+            ],
+        )
+
+    def create_agent(self, name: str, system_prompt: str | None = None) -> AgentMemory:
+        """Create a new agent."""
         agent = AgentMemory(
             name=name, system_prompt=system_prompt, created_at=datetime.now()
         )
-        self._agents[name] = agent
-        self._save_agent(agent)
+        try:
+            with self._transaction() as conn:
+                self._insert_agent(conn, agent)
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Agent '{name}' already exists") from e
         return agent
 
+    def fork_agent(
+        self, parent_name: str, child_name: str, length: int | None = None
+    ) -> AgentMemory:
+        """Create an agent that continues from the first length messages of another.
+
+        The prefix is copied inside the database with a single statement rather
+        than shared, since rows are cheap to duplicate here and agents are read
+        fresh on every access anyway.
+        """
+        parent = self._get_summary(parent_name)
+        if parent is None:
+            raise ValueError(f"Agent '{parent_name}' not found")
+        if length is None:
+            length = parent.message_count
+        if not 0 <= length <= parent.message_count:
+            raise ValueError(
+                f"Cannot fork agent '{parent_name}' at {length}: it has "
+                f"{parent.message_count} messages"
+            )
+
+        agent = AgentMemory(
+            name=child_name,
+            system_prompt=parent.system_prompt,
+            created_at=datetime.now(),
+        )
+        try:
+            with self._transaction() as conn:
+                self._insert_agent(conn, agent)
+                conn.execute(
+                    "INSERT INTO messages SELECT ?, idx, role, content, timestamp, "
+                    "tokens, cost FROM messages WHERE agent = ? AND idx < ?",
+                    (child_name, parent_name, length),
+                )
+                conn.execute(
+                    "UPDATE agents SET message_count = ? WHERE name = ?",
+                    (length, child_name),
+                )
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Agent '{child_name}' already exists") from e
+        self.search_index.add(
+            child_name,
+            self._query(
+                "SELECT idx, role, content FROM messages WHERE agent = ? ORDER BY idx",
+                (child_name,),
+            ),
+        )
+        return self.get_agent(child_name)
+
     def get_agent(self, name: str) -> AgentMemory | None:
-        """Get an existing agent."""
-        return self._agents.get(name)
+        """Get an existing agent with its full history."""
+        summary = self._get_summary(name)
+        if summary is None:
+            return None
+        rows = self._query(
+            "SELECT role, content, timestamp, tokens, cost FROM messages "
+            "WHERE agent = ? ORDER BY idx",
+            (name,),
+        )
+        messages = MessageStore()
+        for role, content, timestamp, tokens, cost in rows:
+            messages.append_row(
+                role, content, datetime.fromisoformat(timestamp), tokens, cost
+            )
+        return AgentMemory(
+            name=summary.name,
+            system_prompt=summary.system_prompt,
+            created_at=summary.created_at,
+            messages=messages,
+            total_tokens=summary.total_tokens,
+            total_cost=summary.total_cost,
+        )
+
+    @contextmanager
+    def batch(self, agent_name: str) -> Iterator[None]:
+        """Provided for parity with MemoryManager.batch.
 
-    def list_agents(self) -> list[AgentMemory]:
-        """List all agents."""
-        return list(self._agents.values())
+        Each message is already stored in a single transaction, so no grouping
+        is needed.
+        """
+        yield
+
+    def list_agents(self) -> list[AgentSummary]:
+        """List summaries of all agents without loading their histories."""
+        rows = self._query("SELECT * FROM agents ORDER BY name")
+        return [self._summary_from_row(row) for row in rows]
+
+    def get_stats(self, agent_name: str) -> dict[str, Any]:
+        """Get summary statistics for an agent without loading its history."""
+        summary = self._get_summary(agent_name)
+        if summary is None:
+            raise ValueError(f"Agent '{agent_name}' not found")
+        return summary.get_stats()
 
     def delete_agent(self, name: str) -> None:
         """Delete an agent."""
-        if name not in self._agents:
-            raise ValueError(f"Agent '{name}' not found")
-        del self._agents[name]
-        agent_file = self._get_agent_file(name)
-        if agent_file.exists():
-            agent_file.unlink()
+        with self._transaction() as conn:
+            if conn.execute("DELETE FROM agents WHERE name = ?", (name,)).rowcount == 0:
+                raise ValueError(f"Agent '{name}' not found")
+            conn.execute("DELETE FROM messages WHERE agent = ?", (name,))
+        self.get_archive_file(name).unlink(missing_ok=True)
+        self.search_index.remove_agent(name)
 
     def add_message(
         self,
@@ -154,27 +1422,228 @@ class MemoryManager:
         cost: float = 0.0,
     ):
         """Add a message to an agent's memory."""
-        agent = self.get_agent(agent_name)
-        if agent:
-            agent.add_message(role, content, tokens, cost)
-            self._save_agent(agent)
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT message_count FROM agents WHERE name = ?", (agent_name,)
+            ).fetchone()
+            if row is None:
+                return
+            conn.execute(
+                "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    agent_name,
+                    row[0],
+                    role,
+                    content,
+                    datetime.now().isoformat(),
+                    tokens,
+                    cost,
+                ),
+            )
+            conn.execute(
+                "UPDATE agents SET message_count = message_count + 1, "
+                "total_tokens = total_tokens + ?, total_cost = total_cost + ? "
+                "WHERE name = ?",
+                (tokens, cost, agent_name),
+            )
+        self.search_index.add(agent_name, [(row[0], role, content)])
+
+    def set_system_prompt(self, agent_name: str, system_prompt: str | None) -> None:
+        """Replace an agent's system prompt."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE agents SET system_prompt = ? WHERE name = ?",
+                (system_prompt, agent_name),
+            )
+            if cursor.rowcount == 0:
+                raise ValueError(f"Agent '{agent_name}' not found")
 
     def clear_agent_history(self, agent_name: str) -> None:
         """Clear an agent's conversation history."""
-        agent = self.get_agent(agent_name)
-        if not agent:
-            raise ValueError(f"Agent '{agent_name}' not found")
-        agent.clear_history()
-        self._save_agent(agent)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE agents SET message_count = 0, total_tokens = 0, "
+                "total_cost = 0.0 WHERE name = ?",
+                (agent_name,),
+            )
+            if cursor.rowcount == 0:
+                raise ValueError(f"Agent '{agent_name}' not found")
+            conn.execute("DELETE FROM messages WHERE agent = ?", (agent_name,))
+        self.search_index.remove_agent(agent_name)
+
+    def compact_history(
+        self,
+        agent_name: str,
+        count: int,
+        summary: str,
+        tokens: int = 0,
+        cost: float = 0.0,
+    ) -> int:
+        """Replace an agent's oldest messages with a summary, archiving the originals.
+
+        Returns the number of messages archived.
+        """
+        with self._transaction() as conn:
+            if not conn.execute(
+                "SELECT 1 FROM agents WHERE name = ?", (agent_name,)
+            ).fetchone():
+                raise ValueError(f"Agent '{agent_name}' not found")
+            rows = conn.execute(
+                "SELECT role, content, timestamp, tokens, cost FROM messages "
+                "WHERE agent = ? AND idx < ? ORDER BY idx",
+                (agent_name, count),
+            ).fetchall()
+            if not rows:
+                return 0
+
+            replaced = [
+                Message(
+                    role=role,
+                    content=content,
+                    timestamp=datetime.fromisoformat(timestamp),
+                    tokens=tokens,
+                    cost=cost,
+                )
+                for role, content, timestamp, tokens, cost in rows
+            ]
+            removed = len(replaced)
+            conn.execute(
+                "DELETE FROM messages WHERE agent = ? AND idx < ?",
+                (agent_name, removed),
+            )
+            # Shift through negative indices so no row collides with the key
+            conn.execute(
+                "UPDATE messages SET idx = -idx WHERE agent = ?", (agent_name,)
+            )
+            conn.execute(
+                "UPDATE messages SET idx = -idx - ? WHERE agent = ?",
+                (removed - 1, agent_name),
+            )
+            conn.execute(
+                "INSERT INTO messages VALUES (?, 0, 'user', ?, ?, ?, ?)",
+                (agent_name, summary, rows[-1][2], tokens, cost),
+            )
+            conn.execute(
+                "UPDATE agents SET message_count = message_count - ?, "
+                "total_tokens = total_tokens + ?, total_cost = total_cost + ? "
+                "WHERE name = ?",
+                (removed - 1, tokens, cost, agent_name),
+            )
+            _archive_messages(self.get_archive_file(agent_name), replaced)
+        self.search_index.replace_oldest(agent_name, removed, summary)
+        return removed
 
     def get_response(self, agent_name: str, index: int = -1) -> str:
         """Get a message content from an agent by index. Default -1 gets the last message."""
-        agent = self.get_agent(agent_name)
-        if not agent:
+        summary = self._get_summary(agent_name)
+        if summary is None:
             raise ValueError(f"Agent '{agent_name}' not found")
+        if summary.message_count == 0:
+            raise IndexError("Cannot get response: agent has no message history")
 
-        return agent.get_response(index)
+        position = index + summary.message_count if index < 0 else index
+        rows = self._query(
+            "SELECT content FROM messages WHERE agent = ? AND idx = ?",
+            (agent_name, position),
+        )
+        if not rows:
+            raise IndexError(f"Message index {index} out of range")
+        return rows[0][0]
+
+    def search(
+        self, query: str, agent_name: str | None = None, limit: int = 10
+    ) -> list[SearchHit]:
+        """Full-text search across the messages of all agents, best match first."""
+        return self.search_index.search(query, agent_name, limit)
+
+    def _disk_usage(self) -> int:
+        """Bytes used by the database and its write-ahead log."""
+        files = (self.db_path, self.db_path.with_name(self.db_path.name + "-wal"))
+        return sum(f.stat().st_size for f in files if f.exists())
+
+    def apply_retention(
+        self,
+        max_age_days: int = 0,
+        max_agents: int = 0,
+        max_bytes: int = 0,
+        compress_after_days: int = 0,
+    ) -> MaintenanceReport:
+        """Evict agents beyond the retention limits and vacuum the database.
+
+        Limits of 0 are not enforced. Agent size is the length of its stored
+        message text. compress_after_days is accepted for parity with
+        MemoryManager; SQLite pages are not compressed.
+        """
+        rows = self._query(
+            "SELECT a.name, COALESCE(MAX(m.timestamp), a.created_at), "
+            "COALESCE(SUM(LENGTH(m.content)), 0) "
+            "FROM agents a LEFT JOIN messages m ON m.agent = a.name GROUP BY a.name"
+        )
+        evicted = select_evictions(
+            [(name, datetime.fromisoformat(used), size) for name, used, size in rows],
+            datetime.now(),
+            max_age_days,
+            max_agents,
+            max_bytes,
+        )
+        if not evicted:
+            return MaintenanceReport()
+
+        before = self._disk_usage()
+        for name in evicted:
+            self.delete_agent(name)
+        conn = self._connection()
+        with self._lock:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return MaintenanceReport(
+            evicted=evicted, bytes_reclaimed=max(before - self._disk_usage(), 0)
+        )
+
+    def migrate_from_json(self) -> int:
+        """Import agents from the JSON store in the same directory.
+
+        The snapshots and journals are read directly, leaving the JSON store
+        untouched. Agents that already exist in the database are skipped, and
+        forked agents are imported with their inherited messages copied in.
+        Returns the number of agents imported.
+        """
+        agents_dir = self.storage_dir / "agents"
+        agents = {}
+        # A plain snapshot is newer than a compressed one left beside it
+        for agent_file in [*agents_dir.glob("*.json.gz"), *agents_dir.glob("*.json")]:
+            agent = _read_json_agent(agent_file)
+            agents[agent.name] = agent
+        for agent in agents.values():
+            if agent.parent:
+                if agent.parent not in agents:
+                    raise ValueError(
+                        f"Parent agent '{agent.parent}' of '{agent.name}' not found"
+                    )
+                agent.attach_parent(agents[agent.parent])
+
+        imported = 0
+        for agent in agents.values():
+            if self._get_summary(agent.name) is not None:
+                continue
+            if agent.parent:
+                agent.detach_parent()
+            with self._transaction() as conn:
+                self._insert_agent(conn, agent)
+            imported += 1
+        return imported
+
+
+def create_memory_manager(
+    storage_dir: str = ".mcp_handley_lab", backend: str = "json"
+) -> MemoryManager | SQLiteMemoryManager:
+    """Create a memory manager for the given storage backend ('json' or 'sqlite')."""
+    if backend == "json":
+        return MemoryManager(storage_dir)
+    if backend == "sqlite":
+        return SQLiteMemoryManager(storage_dir)
+    raise ValueError(f"Unknown memory backend: '{backend}'")
 
 
 # Global memory manager instance
-memory_manager = MemoryManager()
+memory_manager = create_memory_manager(backend=settings.memory_backend)
@@ -0,0 +1,58 @@
+"""Command-line maintenance for LLM agent memory."""
+
+import click
+
+from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm.memory import memory_manager
+
+
+@click.command()
+@click.option(
+    "--max-age-days",
+    type=int,
+    default=settings.memory_max_age_days,
+    show_default=True,
+    help="Evict agents unused for this many days (0 keeps them).",
+)
+@click.option(
+    "--max-agents",
+    type=int,
+    default=settings.memory_max_agents,
+    show_default=True,
+    help="Keep at most this many agents, least recently used evicted first (0 is unlimited).",
+)
+@click.option(
+    "--max-bytes",
+    type=int,
+    default=settings.memory_max_bytes,
+    show_default=True,
+    help="Keep agent storage under this size, least recently used evicted first (0 is unlimited).",
+)
+@click.option(
+    "--compress-after-days",
+    type=int,
+    default=settings.memory_compress_after_days,
+    show_default=True,
+    help="Gzip agents unused for this many days (0 never compresses).",
+)
+def main(max_age_days: int, max_agents: int, max_bytes: int, compress_after_days: int):
+    """Apply the agent memory retention policy and report the space reclaimed."""
+    report = memory_manager.apply_retention(
+        max_age_days=max_age_days,
+        max_agents=max_agents,
+        max_bytes=max_bytes,
+        compress_after_days=compress_after_days,
+    )
+
+    click.echo(f"Storage: {memory_manager.storage_dir}")
+    click.echo(f"Evicted {len(report.evicted)} agent(s)")
+    for name in report.evicted:
+        click.echo(f"  - {name}")
+    click.echo(f"Compressed {len(report.compressed)} agent(s)")
+    for name in report.compressed:
+        click.echo(f"  - {name}")
+    click.echo(f"Reclaimed {report.bytes_reclaimed:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,29 @@
 """Utility for loading model configurations from YAML files."""
 
+import hashlib
+import json
+import os
+import threading
 from pathlib import Path
 from typing import Any
 
 import yaml
+from pydantic import BaseModel, Field
+
+from mcp_handley_lab.common.config import settings
+
+
+def get_models_file(provider: str) -> Path:
+    """Get the models.yaml file for a provider."""
+    return Path(__file__).parent / provider / "models.yaml"
 
 
 def load_model_config(provider: str) -> dict[str, Any]:
     """Load model configuration from YAML file for a specific provider.
 
+    This parses the YAML on every call; use ``get_provider_models`` for the
+    cached, compiled registry.
+
     Args:
         provider: Provider name ('openai', 'claude', 'gemini')
 
@@ -20,10 +35,13 @@ def load_model_config(provider: str) -> dict[str, Any]:
         yaml.YAMLError: If YAML file is invalid
         ValueError: If required sections are missing
     """
-    yaml_path = Path(__file__).parent / provider / "models.yaml"
+    with open(get_models_file(provider), encoding="utf-8") as f:
+        return parse_model_config(f.read())
+
 
-    with open(yaml_path, encoding="utf-8") as f:
-        config = yaml.safe_load(f)
+def parse_model_config(text: str) -> dict[str, Any]:
+    """Parse and validate the contents of a models.yaml file."""
+    config = yaml.safe_load(text)
 
     # Validate required sections (business logic, not defensive programming)
     required_sections = ["models", "display_categories", "default_model", "usage_notes"]
@@ -36,6 +54,136 @@ def load_model_config(provider: str) -> dict[str, Any]:
     return config
 
 
+# Registries cached on disk are recompiled whenever this module changes, since
+# its code decides what a compiled registry holds
+_LOADER_HASH = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+class ProviderModels(BaseModel):
+    """A provider's models.yaml, validated and compiled for fast lookups."""
+
+    provider: str = Field(..., description="The provider name.")
+    file_hash: str = Field(
+        ..., description="SHA-256 of the models.yaml this was compiled from."
+    )
+    loader_hash: str = Field(
+        ..., description="SHA-256 of the model loader that compiled this."
+    )
+    config: dict[str, Any] = Field(..., description="The validated YAML contents.")
+    model_configs: dict[str, dict[str, Any]] = Field(
+        ..., description="Per-model generation settings, as MODEL_CONFIGS."
+    )
+    tag_index: dict[str, list[str]] = Field(
+        ..., description="Model IDs carrying each tag, in YAML order."
+    )
+
+    @classmethod
+    def compile(cls, provider: str, text: str, file_hash: str) -> "ProviderModels":
+        """Validate a models.yaml and precompute its derived tables."""
+        config = parse_model_config(text)
+        tag_index: dict[str, list[str]] = {}
+        for model_id, model_config in config["models"].items():
+            for tag in model_config.get("tags", []):
+                tag_index.setdefault(tag, []).append(model_id)
+        return cls(
+            provider=provider,
+            file_hash=file_hash,
+            loader_hash=_LOADER_HASH,
+            config=config,
+            model_configs=build_model_configs_dict(provider, config),
+            tag_index=tag_index,
+        )
+
+    def models_by_tags(
+        self, required_tags: list[str], exclude_tags: list[str] | None = None
+    ) -> dict[str, dict[str, Any]]:
+        """Filter models by tags using the tag index, like ``get_models_by_tags``."""
+        models = self.config["models"]
+        if required_tags:
+            matching = set.intersection(
+                *(set(self.tag_index.get(tag, [])) for tag in required_tags)
+            )
+        else:
+            matching = set(models)
+        for tag in exclude_tags or []:
+            matching.difference_update(self.tag_index.get(tag, []))
+        return {
+            model_id: model_config
+            for model_id, model_config in models.items()
+            if model_id in matching
+        }
+
+
+_registry: dict[str, tuple[tuple[int, int], ProviderModels]] = {}
+_registry_lock = threading.Lock()
+
+
+def _registry_cache_file(provider: str) -> Path | None:
+    """Get the on-disk cache file for a provider, or None if caching is disabled."""
+    if not settings.model_registry_cache_dir:
+        return None
+    cache_dir = Path(settings.model_registry_cache_dir).expanduser()
+    return cache_dir / "model_registry" / f"{provider}.json"
+
+
+def _read_cached_registry(cache_file: Path, file_hash: str) -> ProviderModels | None:
+    """Read a compiled registry from disk, or None if missing, invalid or stale."""
+    try:
+        cached = ProviderModels.model_validate(json.loads(cache_file.read_bytes()))
+    except (OSError, ValueError):
+        return None
+    if cached.file_hash != file_hash or cached.loader_hash != _LOADER_HASH:
+        return None
+    return cached
+
+
+def _compile_provider_models(provider: str, data: bytes) -> ProviderModels:
+    """Compile a provider's models.yaml, reusing the on-disk cache if its hash matches."""
+    file_hash = hashlib.sha256(data).hexdigest()
+    cache_file = _registry_cache_file(provider)
+    if cache_file is not None:
+        cached = _read_cached_registry(cache_file, file_hash)
+        if cached is not None:
+            return cached
+
+    compiled = ProviderModels.compile(provider, data.decode("utf-8"), file_hash)
+    if cache_file is not None:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f".{cache_file.name}.{os.getpid()}.tmp")
+        # Plain json keeps infinite tier thresholds, which pydantic would null
+        tmp_file.write_text(json.dumps(compiled.model_dump()), encoding="utf-8")
+        os.replace(tmp_file, cache_file)
+    return compiled
+
+
+def get_provider_models(provider: str) -> ProviderModels:
+    """Get a provider's compiled model registry, cached in memory and on disk.
+
+    Raises:
+        FileNotFoundError: If the provider has no models.yaml
+    """
+    models_file = get_models_file(provider)
+    stat = models_file.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _registry_lock:
+        cached = _registry.get(provider)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        compiled = _compile_provider_models(provider, models_file.read_bytes())
+        _registry[provider] = (signature, compiled)
+        return compiled
+
+
+def get_model_input_tokens(provider: str, model: str) -> int | None:
+    """Get a model's input token limit from its YAML configuration.
+
+    Returns None for models that are not configured or have no token limit
+    (e.g., image generation models).
+    """
+    model_info = get_provider_models(provider).config["models"].get(model)
+    return model_info.get("input_tokens") if model_info else None
+
+
 def get_models_by_tags(
     config: dict[str, Any],
     required_tags: list[str],
@@ -70,16 +218,20 @@ def get_models_by_tags(
     return matching_models
 
 
-def build_model_configs_dict(provider: str) -> dict[str, dict[str, Any]]:
+def build_model_configs_dict(
+    provider: str, config: dict[str, Any] | None = None
+) -> dict[str, dict[str, Any]]:
     """Build MODEL_CONFIGS dictionary from YAML configuration.
 
     Args:
         provider: Provider name ('openai', 'claude', 'gemini')
+        config: Already loaded configuration; loaded from YAML if omitted
 
     Returns:
         Dictionary compatible with existing MODEL_CONFIGS format
     """
-    config = load_model_config(provider)
+    if config is None:
+        config = load_model_config(provider)
     model_configs = {}
 
     for model_id, model_info in config["models"].items():
@@ -167,7 +319,8 @@ def get_structured_model_listing(provider: str, api_model_ids: set | None = None
         ModelPricing,
     )
 
-    config = load_model_config(provider)
+    registry = get_provider_models(provider)
+    config = registry.config
 
     # Build summary
     summary = ModelListingSummary(
@@ -188,7 +341,7 @@ def get_structured_model_listing(provider: str, api_model_ids: set | None = None
         exclude_tags = category.get("exclude_tags", [])
 
         # Get models for this category
-        category_models = get_models_by_tags(config, required_tags, exclude_tags)
+        category_models = registry.models_by_tags(required_tags, exclude_tags)
 
         category_model_objects = []
 
@@ -273,7 +426,8 @@ def format_model_listing(provider: str, api_model_ids: set | None = None) -> str
     """
     from mcp_handley_lab.common.pricing import calculate_cost
 
-    config = load_model_config(provider)
+    registry = get_provider_models(provider)
+    config = registry.config
     model_info = []
 
     # Build summary
@@ -302,7 +456,7 @@ def format_model_listing(provider: str, api_model_ids: set | None = None) -> str
         model_info.append("=" * len(category_name))
 
         # Get models for this category
-        category_models = get_models_by_tags(config, required_tags, exclude_tags)
+        category_models = registry.models_by_tags(required_tags, exclude_tags)
 
         for model_id, model_config in category_models.items():
             # Check API availability
@@ -2,6 +2,7 @@
 
 import json
 import threading
+from collections.abc import Callable
 from pathlib import Path
 from typing import Any
 
@@ -9,20 +10,33 @@ import httpx
 import numpy as np
 import openai
 from mcp.server.fastmcp import FastMCP
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletion
 from pydantic import Field
 
 from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm.batch_jobs import (
+    FINISHED_STATUSES,
+    BatchProvider,
+    batch_job_tools,
+)
 from mcp_handley_lab.llm.common import (
     build_server_info,
     load_provider_models,
     resolve_files_for_llm,
 )
+from mcp_handley_lab.llm.image_processing import image_target
 from mcp_handley_lab.llm.memory import memory_manager
 from mcp_handley_lab.llm.model_loader import (
     get_structured_model_listing,
 )
-from mcp_handley_lab.llm.shared import process_image_generation, process_llm_request
+from mcp_handley_lab.llm.shared import (
+    async_ask_batch_tool,
+    async_ask_tool,
+    process_image_generation,
+    process_llm_request,
+)
+from mcp_handley_lab.llm.usage import build_usage_report
 from mcp_handley_lab.shared.models import (
     DocumentIndex,
     EmbeddingResult,
@@ -33,6 +47,7 @@ from mcp_handley_lab.shared.models import (
     SearchResult,
     ServerInfo,
     SimilarityResult,
+    UsageReport,
 )
 
 mcp = FastMCP("OpenAI Tool")
@@ -58,18 +73,33 @@ def _get_client() -> OpenAI:
     return _client
 
 
+_async_client: AsyncOpenAI | None = None
+
+
+def _get_async_client() -> AsyncOpenAI:
+    """Get or create the global AsyncOpenAI client with thread safety."""
+    global _async_client
+    with _client_lock:
+        if _async_client is None:
+            try:
+                _async_client = AsyncOpenAI(api_key=settings.openai_api_key)
+            except Exception as e:
+                raise RuntimeError(f"Failed to initialize OpenAI client: {e}") from e
+    return _async_client
+
+
 # Load model configurations using shared loader
 MODEL_CONFIGS, DEFAULT_MODEL, _get_model_config = load_provider_models("openai")
 
 
-def _openai_generation_adapter(
+def _openai_request_params(
     prompt: str,
     model: str,
     history: list[dict[str, str]],
     system_instruction: str,
-    **kwargs,
+    kwargs: dict[str, Any],
 ) -> dict[str, Any]:
-    """OpenAI-specific text generation function for the shared processor."""
+    """Build chat completion parameters for a text generation request."""
     # Get model configuration first for validation
     model_config = _get_model_config(model)
 
@@ -77,8 +107,8 @@ def _openai_generation_adapter(
     temperature = kwargs.get("temperature", 1.0)
     files = kwargs.get("files")
     max_output_tokens = kwargs.get("max_output_tokens")
-    enable_logprobs = kwargs["enable_logprobs"]
-    top_logprobs = kwargs["top_logprobs"]
+    enable_logprobs = kwargs.get("enable_logprobs", False)
+    top_logprobs = kwargs.get("top_logprobs", 0)
 
     # Validate temperature parameter
     if not model_config.get("supports_temperature", True) and temperature != 1.0:
@@ -126,10 +156,11 @@ def _openai_generation_adapter(
 
     # Add max tokens with correct parameter name
     request_params[param_name] = max_output_tokens or default_tokens
+    return request_params
 
-    # Make API call
-    response = _get_client().chat.completions.create(**request_params)
 
+def _completion_data(response) -> dict[str, Any]:
+    """Extract the response text and metadata from a chat completion."""
     # Extract additional OpenAI metadata
     choice = response.choices[0]
     finish_reason = choice.finish_reason
@@ -140,10 +171,127 @@ def _openai_generation_adapter(
         logprobs = [token.logprob for token in choice.logprobs.content]
         avg_logprobs = sum(logprobs) / len(logprobs)
 
-    # Extract token details
+    return {
+        "text": response.choices[0].message.content,
+        "finish_reason": finish_reason,
+        "avg_logprobs": avg_logprobs,
+        "model_version": response.model,
+        "response_id": response.id,
+        "system_fingerprint": response.system_fingerprint or "",
+        "service_tier": response.service_tier or "",
+        **_usage_data(response.usage),
+    }
+
+
+def _openai_generation_adapter(
+    prompt: str,
+    model: str,
+    history: list[dict[str, str]],
+    system_instruction: str,
+    **kwargs,
+) -> dict[str, Any]:
+    """OpenAI-specific text generation function for the shared processor."""
+    request_params = _openai_request_params(
+        prompt, model, history, system_instruction, kwargs
+    )
+    on_text = kwargs.get("on_text")
+
+    # Make API call
+    if on_text:
+        return _stream_openai_completion(request_params, on_text)
+    response = _get_client().chat.completions.create(**request_params)
+    return _completion_data(response)
+
+
+async def _openai_generation_adapter_async(
+    prompt: str,
+    model: str,
+    history: list[dict[str, str]],
+    system_instruction: str,
+    **kwargs,
+) -> dict[str, Any]:
+    """Async counterpart of _openai_generation_adapter using AsyncOpenAI."""
+    request_params = _openai_request_params(
+        prompt, model, history, system_instruction, kwargs
+    )
+    on_text = kwargs.get("on_text")
+
+    if on_text:
+        completion = _StreamedCompletion()
+        async for chunk in await _get_async_client().chat.completions.create(
+            **request_params, stream=True, stream_options={"include_usage": True}
+        ):
+            text = completion.add(chunk)
+            if text:
+                await on_text(text)
+        return completion.data()
+    response = await _get_async_client().chat.completions.create(**request_params)
+    return _completion_data(response)
+
+
+class _StreamedCompletion:
+    """Accumulates the chunks of a streamed chat completion."""
+
+    def __init__(self):
+        self.text_parts = []
+        self.logprobs = []
+        self.finish_reason = None
+        self.last_chunk = None
+
+    def add(self, chunk) -> str | None:
+        """Record a chunk, returning any new text it carries."""
+        self.last_chunk = chunk
+        # The final chunk carries the usage and no choices
+        if not chunk.choices:
+            return None
+        choice = chunk.choices[0]
+        if choice.delta.content:
+            self.text_parts.append(choice.delta.content)
+        if choice.logprobs and choice.logprobs.content:
+            self.logprobs.extend(token.logprob for token in choice.logprobs.content)
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+        return choice.delta.content
+
+    def data(self) -> dict[str, Any]:
+        """Build the response data once the stream has ended."""
+        chunk = self.last_chunk
+        if chunk is None or chunk.usage is None:
+            raise RuntimeError("OpenAI stream ended without usage information")
+
+        return {
+            "text": "".join(self.text_parts),
+            "finish_reason": self.finish_reason,
+            "avg_logprobs": sum(self.logprobs) / len(self.logprobs)
+            if self.logprobs
+            else 0.0,
+            "model_version": chunk.model,
+            "response_id": chunk.id,
+            "system_fingerprint": chunk.system_fingerprint or "",
+            "service_tier": chunk.service_tier or "",
+            **_usage_data(chunk.usage),
+        }
+
+
+def _stream_openai_completion(
+    request_params: dict[str, Any], on_text: Callable[[str], None]
+) -> dict[str, Any]:
+    """Stream a chat completion, passing each piece of text to on_text as it arrives."""
+    completion = _StreamedCompletion()
+    for chunk in _get_client().chat.completions.create(
+        **request_params, stream=True, stream_options={"include_usage": True}
+    ):
+        text = completion.add(chunk)
+        if text:
+            on_text(text)
+    return completion.data()
+
+
+def _usage_data(usage) -> dict[str, Any]:
+    """Extract token counts and their breakdowns from OpenAI usage."""
     completion_tokens_details = {}
-    if response.usage.completion_tokens_details:
-        details = response.usage.completion_tokens_details
+    if usage.completion_tokens_details:
+        details = usage.completion_tokens_details
         completion_tokens_details = {
             "reasoning_tokens": details.reasoning_tokens,
             "accepted_prediction_tokens": details.accepted_prediction_tokens,
@@ -152,28 +300,83 @@ def _openai_generation_adapter(
         }
 
     prompt_tokens_details = {}
-    if response.usage.prompt_tokens_details:
-        details = response.usage.prompt_tokens_details
+    if usage.prompt_tokens_details:
+        details = usage.prompt_tokens_details
         prompt_tokens_details = {
             "cached_tokens": details.cached_tokens,
             "audio_tokens": details.audio_tokens,
         }
 
     return {
-        "text": response.choices[0].message.content,
-        "input_tokens": response.usage.prompt_tokens,
-        "output_tokens": response.usage.completion_tokens,
-        "finish_reason": finish_reason,
-        "avg_logprobs": avg_logprobs,
-        "model_version": response.model,
-        "response_id": response.id,
-        "system_fingerprint": response.system_fingerprint or "",
-        "service_tier": response.service_tier or "",
+        "input_tokens": usage.prompt_tokens,
+        "output_tokens": usage.completion_tokens,
         "completion_tokens_details": completion_tokens_details,
         "prompt_tokens_details": prompt_tokens_details,
     }
 
 
+def _openai_batch_line(
+    custom_id: str,
+    prompt: str,
+    model: str,
+    system_instruction: str | None,
+    kwargs: dict[str, Any],
+) -> dict[str, Any]:
+    """Build a Batch API JSONL line for one chat completion request."""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": _openai_request_params(prompt, model, [], system_instruction, kwargs),
+    }
+
+
+def _openai_batch_submit(requests_file: Path, model: str, job_id: str) -> str:
+    """Upload a JSONL request file and start a Batch API job for it."""
+    with requests_file.open("rb") as f:
+        input_file = _get_client().files.create(file=f, purpose="batch")
+    batch = _get_client().batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+        metadata={"job_id": job_id},
+    )
+    return batch.id
+
+
+def _openai_batch_poll(batch_id: str) -> str:
+    """Get a Batch API job's status, counting validating and finalizing as running."""
+    status = _get_client().batches.retrieve(batch_id).status
+    return status if status in FINISHED_STATUSES else "in_progress"
+
+
+def _openai_batch_results(batch_id: str) -> dict[str, dict[str, Any] | str]:
+    """Read a finished Batch API job's output and error files by custom id."""
+    batch = _get_client().batches.retrieve(batch_id)
+    results = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in _get_client().files.content(file_id).text.splitlines():
+            entry = json.loads(line)
+            response = entry["response"]
+            if response and response["status_code"] == 200:
+                completion = ChatCompletion.model_validate(response["body"])
+                results[entry["custom_id"]] = _completion_data(completion)
+            else:
+                error = entry["error"] or response["body"]["error"]
+                results[entry["custom_id"]] = error["message"]
+    return results
+
+
+BATCH_PROVIDER = BatchProvider(
+    request_line=_openai_batch_line,
+    submit=_openai_batch_submit,
+    poll=_openai_batch_poll,
+    results=_openai_batch_results,
+)
+
+
 def _openai_image_analysis_adapter(
     prompt: str,
     model: str,
@@ -204,7 +407,10 @@ def _openai_image_analysis_adapter(
     if focus != "general":
         prompt = f"Focus on {focus} aspects. {prompt}"
 
-    prompt_text, image_blocks = resolve_images_for_multimodal_prompt(prompt, images)
+    target = image_target("openai") if kwargs.get("downsize", True) else None
+    prompt_text, image_blocks = resolve_images_for_multimodal_prompt(
+        prompt, images, target
+    )
 
     # Build message content with images in OpenAI format
     content = [{"type": "text", "text": prompt_text}]
@@ -265,9 +471,12 @@ def _openai_image_analysis_adapter(
     }
 
 
-@mcp.tool(
-    description="Delegates a user query to external OpenAI GPT service. Can take a prompt directly or load it from a template file with variables. Returns OpenAI's verbatim response. Use `agent_name` for separate conversation thread. For code reviews, use code2prompt first."
-)
+ASK_DESCRIPTION = "Delegates a user query to external OpenAI GPT service. Can take a prompt directly or load it from a template file with variables. Returns OpenAI's verbatim response. Use `agent_name` for separate conversation thread. For code reviews, use code2prompt first."
+ASK_BATCH_DESCRIPTION = "Delegates many independent queries to external OpenAI GPT service concurrently, for screening or bulk processing. Each prompt or prompt file is sent as its own request without conversation memory, sharing the other parameters, and its response is written to its own file in `output_dir`. Returns per-item usage with aggregate cost and wall time."
+SUBMIT_BATCH_DESCRIPTION = "Submits many independent queries to the OpenAI Batch API at discounted batch pricing, for bulk work that can wait up to 24 hours. Each prompt or prompt file becomes one request without conversation memory, sharing the other parameters. Returns a job to check later with `batch_status`."
+BATCH_STATUS_DESCRIPTION = "Checks a OpenAI Batch API job started by `submit_batch`. Once the job has completed, writes each response to its own file in the job's `output_dir` and returns per-item usage at batch pricing with aggregate cost."
+
+
 def ask(
     prompt: str = Field(
         default=None,
@@ -325,6 +534,18 @@ def ask(
         default_factory=dict,
         description="A dictionary of variables for template substitution in the system prompt using ${var} syntax.",
     ),
+    history_budget: int = Field(
+        default=0,
+        description="Token budget for conversation history. 0 fits the model's input limit, a positive value caps history at that many tokens, -1 sends the full history.",
+    ),
+    cache_response: bool = Field(
+        default=False,
+        description="If True, reuse the response to an identical earlier request at no cost, and cache this one. Temperature-0 requests are also cached when the response cache is enabled.",
+    ),
+    stream: bool = Field(
+        default=False,
+        description="If True, stream the response, appending it to output_file as it arrives and reporting it as progress notifications.",
+    ),
 ) -> LLMResult:
     """Ask OpenAI a question with optional persistent memory."""
     return process_llm_request(
@@ -345,9 +566,24 @@ def ask(
         system_prompt=system_prompt,
         system_prompt_file=system_prompt_file,
         system_prompt_vars=system_prompt_vars,
+        history_budget=history_budget,
+        cache_response=cache_response,
+        stream=stream,
     )
 
 
+mcp.tool(name="ask", description=ASK_DESCRIPTION)(
+    async_ask_tool(ask, "openai", _openai_generation_adapter_async, mcp)
+)
+mcp.tool(name="ask_batch", description=ASK_BATCH_DESCRIPTION)(
+    async_ask_batch_tool(ask, "openai", _openai_generation_adapter_async, mcp)
+)
+
+submit_batch, batch_status = batch_job_tools(ask, "openai", BATCH_PROVIDER)
+mcp.tool(name="submit_batch", description=SUBMIT_BATCH_DESCRIPTION)(submit_batch)
+mcp.tool(name="batch_status", description=BATCH_STATUS_DESCRIPTION)(batch_status)
+
+
 @mcp.tool(
     description="Delegates image analysis to external OpenAI vision AI service on behalf of the user. Returns OpenAI's verbatim visual analysis to assist the user."
 )
@@ -383,6 +619,10 @@ def analyze_image(
         default=None,
         description="System instructions to send to external OpenAI AI service. Remembered for this conversation thread.",
     ),
+    downsize: bool = Field(
+        default=True,
+        description="If True, scale large images down to the resolution the model uses and re-encode them as WebP before upload. Set False to send the original files.",
+    ),
 ) -> LLMResult:
     """Analyze images with OpenAI vision model."""
     return process_llm_request(
@@ -397,6 +637,7 @@ def analyze_image(
         focus=focus,
         max_output_tokens=max_output_tokens,
         system_prompt=system_prompt,
+        downsize=downsize,
     )
 
 
@@ -673,6 +914,33 @@ def list_models() -> ModelListing:
     return get_structured_model_listing("openai", api_model_ids)
 
 
+@mcp.tool(
+    description="Reports LLM spend and token usage recorded by all provider tools, as precomputed hourly or daily totals per provider and model. Covers the current month unless a range is given. Use this to answer questions such as how much has been spent this month."
+)
+def usage_report(
+    period: str = Field(
+        default="day", description="Bucket size of the totals: 'hour' or 'day'."
+    ),
+    since: str = Field(
+        default="",
+        description="ISO date or datetime to report from. Defaults to the start of the current month.",
+    ),
+    until: str = Field(
+        default="",
+        description="ISO date or datetime to report up to, exclusive. Defaults to no limit.",
+    ),
+    provider: str = Field(
+        default="",
+        description="Only report this provider (e.g., 'openai'). Empty for all providers.",
+    ),
+    model: str = Field(
+        default="", description="Only report this model. Empty for all models."
+    ),
+) -> UsageReport:
+    """Report recorded LLM usage and spend from the usage ledger."""
+    return build_usage_report(period, since, until, provider, model)
+
+
 @mcp.tool(
     description="Checks OpenAI Tool server status and API connectivity. Returns version info, model availability, and a list of available functions."
 )
@@ -688,6 +956,7 @@ def server_info() -> ServerInfo:
         memory_manager=memory_manager,
         vision_support=True,
         image_generation=True,
+        batch_jobs=True,
     )
 
     # Manually add embedding capabilities to the server info
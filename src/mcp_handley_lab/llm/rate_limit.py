@@ -0,0 +1,191 @@
+"""Client-side rate limiting of LLM provider calls with token buckets."""
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+
+import yaml
+from pydantic import BaseModel, Field
+
+from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm.usage import UsageLedger, usage_ledger
+
+
+class ProviderLimits(BaseModel):
+    """Rate and spend limits for one provider. Limits of 0 are not enforced."""
+
+    requests_per_minute: int = Field(
+        default=0, description="Maximum requests started per minute."
+    )
+    tokens_per_minute: int = Field(
+        default=0, description="Maximum input and output tokens per minute."
+    )
+    daily_cost_limit: float = Field(
+        default=0.0, description="Maximum spend in USD per calendar day."
+    )
+
+
+def load_rate_limits(limits_file: str) -> dict[str, ProviderLimits]:
+    """Load per-provider limits from a YAML file mapping providers to limits."""
+    if not limits_file:
+        return {}
+    with open(Path(limits_file).expanduser(), encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    return {
+        provider: ProviderLimits.model_validate(limits)
+        for provider, limits in config.items()
+    }
+
+
+class TokenBucket:
+    """An allowance that refills continuously up to one minute's worth.
+
+    The level may go negative when more is taken than was available, e.g. when
+    a request turns out to use more tokens than estimated; later callers then
+    wait for the debt to be repaid.
+    """
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken; amounts above capacity need a full bucket."""
+        self._refill(now)
+        shortfall = min(amount, self.capacity) - self.level
+        return max(shortfall, 0.0) / self.rate
+
+    def take(self, amount: float, now: float):
+        """Remove amount from the bucket."""
+        self._refill(now)
+        self.level -= amount
+
+
+class RateLimiter:
+    """Holds requests to one provider until its rate limits allow them.
+
+    Callers queue in arrival order and each waits at most ``max_wait`` seconds;
+    a request that cannot start in time, or any request once the day's spend
+    has reached ``daily_cost_limit``, raises RuntimeError instead of being sent
+    to be rejected by the provider.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        limits: ProviderLimits,
+        max_wait: float = 60.0,
+        ledger: UsageLedger | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.provider = provider
+        self.limits = limits
+        self.max_wait = max_wait
+        self.ledger = ledger or usage_ledger
+        self._clock = clock
+        now = clock()
+        self._requests = (
+            TokenBucket(limits.requests_per_minute, now)
+            if limits.requests_per_minute
+            else None
+        )
+        self._tokens = (
+            TokenBucket(limits.tokens_per_minute, now)
+            if limits.tokens_per_minute
+            else None
+        )
+        self._condition = threading.Condition()
+        self._queue: deque[object] = deque()
+
+    def _check_daily_cost(self):
+        """Refuse requests once today's recorded spend reaches the daily limit."""
+        limit = self.limits.daily_cost_limit
+        if not limit:
+            return
+        spent = self.ledger.total_cost(datetime.now(), self.provider)
+        if spent >= limit:
+            raise RuntimeError(
+                f"Daily cost limit of ${limit:.2f} for '{self.provider}' reached "
+                f"(${spent:.2f} spent today)"
+            )
+
+    def _delay(self, tokens: int, now: float) -> float:
+        """Seconds until both buckets can cover a request of the given size."""
+        return max(
+            self._requests.delay(1, now) if self._requests else 0.0,
+            self._tokens.delay(tokens, now) if self._tokens else 0.0,
+        )
+
+    def acquire(self, tokens: int = 0):
+        """Wait until a request estimated at tokens tokens may start, then reserve it."""
+        self._check_daily_cost()
+        if self._requests is None and self._tokens is None:
+            return
+
+        deadline = self._clock() + self.max_wait
+        ticket = object()
+        with self._condition:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    now = self._clock()
+                    remaining = deadline - now
+                    if self._queue[0] is ticket:
+                        delay = self._delay(tokens, now)
+                        if delay == 0:
+                            if self._requests:
+                                self._requests.take(1, now)
+                            if self._tokens:
+                                self._tokens.take(tokens, now)
+                            return
+                        if delay > remaining:
+                            raise RuntimeError(
+                                f"Rate limit for '{self.provider}' needs a "
+                                f"{delay:.1f}s wait, more than the "
+                                f"{self.max_wait:.0f}s allowed"
+                            )
+                    elif remaining <= 0:
+                        raise RuntimeError(
+                            f"Timed out after {self.max_wait:.0f}s queued for "
+                            f"the '{self.provider}' rate limit"
+                        )
+                    else:
+                        delay = remaining
+                    self._condition.wait(delay)
+            finally:
+                self._queue.remove(ticket)
+                self._condition.notify_all()
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token reservation once the request's real usage is known."""
+        if self._tokens is None:
+            return
+        with self._condition:
+            self._tokens.take(actual_tokens - estimated_tokens, self._clock())
+            self._condition.notify_all()
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """Get the shared rate limiter for a provider, configured from settings."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            limits = load_rate_limits(settings.llm_rate_limits_file)
+            _limiters[provider] = RateLimiter(
+                provider,
+                limits.get(provider, ProviderLimits()),
+                settings.llm_rate_limit_max_wait,
+            )
+        return _limiters[provider]
@@ -0,0 +1,178 @@
+"""Content-addressed cache of LLM responses to repeatable requests."""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm.sqlite_database import SQLiteDatabase
+from mcp_handley_lab.shared.models import LLMResult
+
+FILE_PARAMS = ("files", "images")
+
+
+def _file_digest(item: Any) -> Any:
+    """Identify a file argument by its content, so edits to the file miss the cache.
+
+    Items that are not readable files, such as data URLs, are used as given.
+    """
+    path = item["path"] if isinstance(item, dict) and "path" in item else item
+    if isinstance(path, str) and Path(path).is_file():
+        digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+        return {"path": path, "sha256": digest}
+    return item
+
+
+def request_key(
+    provider: str,
+    model: str,
+    system_instruction: str | None,
+    history: list[dict[str, str]],
+    prompt: str,
+    params: dict[str, Any],
+) -> str:
+    """Hash everything that determines a response into a cache key.
+
+    params are the generation parameters passed to the provider; file and
+    image paths among them are replaced by digests of their contents.
+    """
+    history_digest = hashlib.sha256(
+        json.dumps(history, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    params = {
+        name: [_file_digest(item) for item in value]
+        if name in FILE_PARAMS and value
+        else value
+        for name, value in params.items()
+    }
+    request = {
+        "provider": provider,
+        "model": model,
+        "system_instruction": system_instruction or "",
+        "history": history_digest,
+        "prompt": prompt,
+        "params": params,
+    }
+    return hashlib.sha256(
+        json.dumps(request, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class ResponseCache(SQLiteDatabase):
+    """Responses to repeatable LLM requests, keyed by ``request_key``.
+
+    Results are stored in ``responses.db`` with an in-memory LRU of recently
+    used entries in front, so repeated requests within a process skip the
+    database too. Entries expire ``ttl`` seconds after they were stored, and
+    the least recently read are evicted once stored results exceed
+    ``max_bytes``. A ttl or max_bytes of 0 is unlimited.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            created REAL NOT NULL,
+            used REAL NOT NULL,
+            size INTEGER NOT NULL,
+            result TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS responses_by_use ON responses (used);
+    """
+
+    def __init__(
+        self,
+        storage_dir: str = ".mcp_handley_lab",
+        ttl: float = 0,
+        max_bytes: int = 0,
+        memory_entries: int = 256,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.storage_dir = Path(storage_dir)
+        super().__init__(self.storage_dir / "responses.db")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._clock = clock
+        self._memory: OrderedDict[str, tuple[float, LLMResult]] = OrderedDict()
+        self._memory_lock = threading.Lock()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return bool(self.ttl) and created <= now - self.ttl
+
+    def _remember(self, key: str, created: float, result: LLMResult):
+        """Add an entry to the in-memory LRU, dropping the least recently used."""
+        with self._memory_lock:
+            self._memory[key] = (created, result)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> LLMResult | None:
+        """Get the cached result for a request key, or None if absent or expired."""
+        now = self._clock()
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    return entry[1]
+                del self._memory[key]
+
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT created, result FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            created, result_json = row
+            if self._expired(created, now):
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+
+        result = LLMResult.model_validate_json(result_json)
+        self._remember(key, created, result)
+        return result
+
+    def put(self, key: str, result: LLMResult):
+        """Store a result, then evict expired entries and any over the size limit."""
+        now = self._clock()
+        result_json = result.model_dump_json()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, now, now, len(result_json), result_json),
+            )
+            if self.ttl:
+                conn.execute(
+                    "DELETE FROM responses WHERE created <= ?", (now - self.ttl,)
+                )
+            if self.max_bytes:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM (SELECT key, SUM(size) OVER "
+                    "(ORDER BY used DESC, created DESC, key) AS total "
+                    "FROM responses) WHERE total > ?)",
+                    (self.max_bytes,),
+                )
+        self._remember(key, now, result)
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._memory_lock:
+            self._memory.clear()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+# Global response cache instance
+response_cache = ResponseCache(
+    ttl=settings.llm_response_cache_ttl,
+    max_bytes=settings.llm_response_cache_max_bytes,
+    memory_entries=settings.llm_response_cache_memory_entries,
+)
@@ -1,23 +1,49 @@
 """Shared utilities for LLM providers."""
 
+import asyncio
+import functools
+import inspect
 import tempfile
+import time
 import uuid
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable
 from pathlib import Path
+from typing import NamedTuple
 
+import anyio
+from pydantic import Field
+
+from mcp_handley_lab.common.config import settings
 from mcp_handley_lab.common.pricing import calculate_cost
 from mcp_handley_lab.llm.common import (
+    MESSAGE_OVERHEAD_TOKENS,
+    estimate_tokens,
+    fit_history_to_budget,
     get_session_id,
     handle_agent_memory,
     load_prompt_text,
 )
 from mcp_handley_lab.llm.memory import memory_manager
+from mcp_handley_lab.llm.model_loader import get_model_input_tokens, get_provider_models
+from mcp_handley_lab.llm.rate_limit import RateLimiter, get_rate_limiter
+from mcp_handley_lab.llm.response_cache import request_key, response_cache
+from mcp_handley_lab.llm.usage import usage_ledger
 from mcp_handley_lab.shared.models import (
+    BatchItemResult,
+    BatchResult,
     GroundingMetadata,
     ImageGenerationResult,
     LLMResult,
 )
 
+COMPACTION_PROMPT = """Summarise the conversation below so that the summary can replace it in a long-running conversation. Preserve facts, decisions, open questions, names, numbers and any standing instructions from the user. Reply with the summary only.
+
+"""
+SUMMARY_PREFIX = "[Summary of earlier conversation]\n"
+# Request parameters that the history summary is generated with, and their
+# defaults, as the provider adapters read them without checking
+COMPACTION_KWARGS = {"temperature": 1.0, "max_output_tokens": 0}
+
 
 def _handle_memory_setup(
     agent_name: str, system_prompt: str | None, mcp_instance
@@ -32,29 +58,160 @@ def _handle_memory_setup(
         if agent_name == "session":
             actual_agent_name = get_session_id(mcp_instance)
 
-        agent = memory_manager.get_agent(actual_agent_name)
-        if not agent:
-            agent = memory_manager.create_agent(actual_agent_name, system_prompt)
-        elif system_prompt is not None:
-            agent.system_prompt = system_prompt
-            memory_manager._save_agent(agent)
+        with memory_manager.batch(actual_agent_name):
+            agent = memory_manager.get_agent(actual_agent_name)
+            if not agent:
+                agent = memory_manager.create_agent(actual_agent_name, system_prompt)
+            elif system_prompt is not None and system_prompt != agent.system_prompt:
+                memory_manager.set_system_prompt(actual_agent_name, system_prompt)
+                agent.system_prompt = system_prompt
 
-        history = agent.get_history()
-        system_instruction = agent.system_prompt
+            history = agent.get_history()
+            system_instruction = agent.system_prompt
 
     return use_memory, actual_agent_name, history, system_instruction
 
 
-def _extract_response_metadata(response_data: dict, model: str, provider: str) -> dict:
-    """Extract metadata from provider response."""
+def _assemble_context(
+    history: list[dict[str, str]],
+    prompt: str,
+    system_instruction: str | None,
+    model: str,
+    provider: str,
+    history_budget: int,
+) -> tuple[list[dict[str, str]], int]:
+    """Trim conversation history to the most recent messages that fit the budget.
+
+    A positive history_budget caps the history at that many tokens. Zero uses the
+    model's input token limit less the prompt and system instruction. A negative
+    value sends the full history.
+
+    Returns:
+        tuple: (history to send, number of messages dropped)
+    """
+    if history_budget < 0 or not history:
+        return history, 0
+
+    if history_budget == 0:
+        input_limit = get_model_input_tokens(provider, model)
+        if input_limit is None:
+            return history, 0
+        history_budget = (
+            input_limit
+            - estimate_tokens(prompt)
+            - estimate_tokens(system_instruction or "")
+        )
+
+    return fit_history_to_budget(history, history_budget)
+
+
+def _estimate_request_tokens(
+    history: list[dict[str, str]], prompt: str, system_instruction: str | None
+) -> int:
+    """Estimate the input tokens of a request, for reserving rate-limit capacity."""
+    return (
+        estimate_tokens(prompt)
+        + estimate_tokens(system_instruction or "")
+        + sum(
+            estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+            for message in history
+        )
+    )
+
+
+def _compact_agent_history(
+    agent_name: str,
+    model: str,
+    provider: str,
+    generation_func: Callable,
+    mcp_instance,
+    kwargs: dict,
+) -> int:
+    """Summarise an agent's oldest messages once its history passes the threshold.
+
+    The summary is generated through process_llm_request with the provider's
+    compaction_model and replaces the oldest messages, which are archived.
+    The most recent messages are kept verbatim.
+
+    Returns:
+        int: Number of messages replaced by the summary
+    """
+    threshold = settings.memory_compaction_tokens
+    if threshold <= 0:
+        return 0
+
+    history = memory_manager.get_agent(agent_name).get_history()
+    history_tokens = sum(
+        estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        for message in history
+    )
+    if history_tokens <= threshold:
+        return 0
+
+    # Summarise whole turns so the kept messages start with a user message
+    count = len(history) - settings.memory_compaction_keep_messages
+    while 0 < count < len(history) and history[count]["role"] != "user":
+        count += 1
+    if count < 2:
+        return 0
+
+    transcript = "\n\n".join(
+        f"{message['role']}: {message['content']}" for message in history[:count]
+    )
+    # Only generation settings carry over: streaming, caching, attachments and
+    # provider options belong to the request being answered, not the summary
+    summary_kwargs = {
+        key: kwargs.get(key, default) for key, default in COMPACTION_KWARGS.items()
+    }
+    result = process_llm_request(
+        prompt=COMPACTION_PROMPT + transcript,
+        output_file="-",
+        agent_name=False,
+        model=get_provider_models(provider).config.get("compaction_model", model),
+        provider=provider,
+        generation_func=generation_func,
+        mcp_instance=mcp_instance,
+        files=[],
+        **summary_kwargs,
+    )
+
+    return memory_manager.compact_history(
+        agent_name,
+        count,
+        SUMMARY_PREFIX + result.content,
+        tokens=result.usage.input_tokens + result.usage.output_tokens,
+        cost=result.usage.cost,
+    )
+
+
+def extract_response_metadata(
+    response_data: dict, model: str, provider: str, batch: bool = False
+) -> dict:
+    """Extract metadata from provider response, priced at batch rates if batch."""
     input_tokens = response_data["input_tokens"]
     output_tokens = response_data["output_tokens"]
+    cached_input_tokens = response_data.get("cache_read_input_tokens", 0)
+    # Claude reports cache reads (and cache writes) on top of input, whereas
+    # Gemini counts its cache reads within input; pricing takes them on top
+    uncached_input_tokens = input_tokens
+    if response_data.get("input_includes_cache_reads"):
+        uncached_input_tokens -= cached_input_tokens
 
     return {
         "response_text": response_data["text"],
         "input_tokens": input_tokens,
         "output_tokens": output_tokens,
-        "cost": calculate_cost(model, input_tokens, output_tokens, provider),
+        "cost": calculate_cost(
+            model,
+            uncached_input_tokens,
+            output_tokens,
+            provider,
+            cached_input_tokens=cached_input_tokens,
+            batch=batch,
+            cache_write_input_tokens=response_data.get(
+                "cache_creation_input_tokens", 0
+            ),
+        ),
         "finish_reason": response_data.get("finish_reason", ""),
         "avg_logprobs": response_data.get("avg_logprobs", 0.0),
         "model_version": response_data.get("model_version", ""),
@@ -68,11 +225,97 @@ def _extract_response_metadata(response_data: dict, model: str, provider: str) -
         "cache_creation_input_tokens": response_data.get(
             "cache_creation_input_tokens", 0
         ),
-        "cache_read_input_tokens": response_data.get("cache_read_input_tokens", 0),
+        "cache_read_input_tokens": cached_input_tokens,
         "grounding_metadata_dict": response_data.get("grounding_metadata"),
     }
 
 
+def _progress_context(mcp_instance):
+    """Get the request context if the MCP client asked for progress notifications."""
+    context = mcp_instance.get_context()
+    try:
+        meta = context.request_context.meta
+    except ValueError:
+        return None
+    progress_token = meta.progressToken if meta else None
+    return context if isinstance(progress_token, str | int) else None
+
+
+def _progress_reporter(mcp_instance) -> Callable[[float, str], None] | None:
+    """Get a function relaying progress to the MCP client, if it asked for progress.
+
+    Notifications are sent through the server's event loop, so they can only be
+    relayed while the request runs in a worker thread. A request running on the
+    event loop itself streams to output_file alone.
+    """
+    context = _progress_context(mcp_instance)
+    if context is None:
+        return None
+
+    try:
+        asyncio.get_running_loop()
+        return None
+    except RuntimeError:
+        pass
+
+    def report(progress: float, message: str):
+        anyio.from_thread.run(context.report_progress, progress, None, message)
+
+    return report
+
+
+def _progress_sender(mcp_instance) -> Callable[[float, str], Awaitable[None]] | None:
+    """Get a coroutine function sending progress to the MCP client, for async requests."""
+    context = _progress_context(mcp_instance)
+    if context is None:
+        return None
+
+    async def send(progress: float, message: str):
+        await context.report_progress(progress, None, message)
+
+    return send
+
+
+class _StreamWriter:
+    """Appends streamed response text to output_file and relays it as progress.
+
+    Progress is the number of characters received so far, with each chunk of
+    text as the notification message. Sync adapters call the writer itself with
+    a plain report function; async adapters await ``send`` with a coroutine one.
+    """
+
+    def __init__(self, output_file: str, report: Callable | None = None):
+        self.output_path = None if output_file == "-" else Path(output_file)
+        self.report = report
+        self.chunks: list[str] = []
+        self.length = 0
+        if self.output_path:
+            self.output_path.write_text("")
+
+    def _append(self, text: str) -> bool:
+        if not text:
+            return False
+        self.chunks.append(text)
+        self.length += len(text)
+        if self.output_path:
+            with self.output_path.open("a") as f:
+                f.write(text)
+        return True
+
+    def __call__(self, text: str):
+        if self._append(text) and self.report:
+            self.report(self.length, text)
+
+    async def send(self, text: str):
+        if self._append(text) and self.report:
+            await self.report(self.length, text)
+
+    def finish(self, content: str):
+        """Rewrite output_file if the final response differs from the streamed text."""
+        if self.output_path and "".join(self.chunks) != content:
+            self.output_path.write_text(content)
+
+
 def _enhance_prompt_for_images(
     prompt: str, user_prompt: str, kwargs: dict
 ) -> tuple[str, str]:
@@ -93,23 +336,45 @@ def _enhance_prompt_for_images(
     return prompt, user_prompt
 
 
-def process_llm_request(
+class _PreparedRequest(NamedTuple):
+    """An LLM request resolved against agent memory and the response cache."""
+
+    prompt: str
+    user_prompt: str
+    use_memory: bool
+    agent_name: str
+    history: list[dict[str, str]]
+    system_instruction: str | None
+    history_messages_dropped: int
+    cache_key: str | None
+    cached_result: LLMResult | None
+    stream: bool
+    kwargs: dict
+
+    @property
+    def result_agent_name(self) -> str:
+        """The agent name to report, empty when memory is not used."""
+        return self.agent_name if self.use_memory else ""
+
+
+def _prepare_llm_request(
     prompt: str,
-    output_file: str,
     agent_name: str,
     model: str,
     provider: str,
-    generation_func: Callable,
     mcp_instance,
-    **kwargs,
-) -> LLMResult:
-    """Generic handler for LLM requests that abstracts common patterns."""
+    kwargs: dict,
+) -> _PreparedRequest:
+    """Resolve prompts, load history and look up the response cache."""
     # Extract prompt resolution parameters
     prompt_file = kwargs.pop("prompt_file", None)
     prompt_vars = kwargs.pop("prompt_vars", None)
     system_prompt = kwargs.pop("system_prompt", None)
     system_prompt_file = kwargs.pop("system_prompt_file", None)
     system_prompt_vars = kwargs.pop("system_prompt_vars", None)
+    history_budget = kwargs.pop("history_budget", 0)
+    cache_response = kwargs.pop("cache_response", False)
+    stream = kwargs.pop("stream", False)
 
     # Resolve final prompt and system prompt
     final_prompt = load_prompt_text(prompt, prompt_file, prompt_vars)
@@ -131,35 +396,117 @@ def process_llm_request(
         final_prompt, user_prompt, kwargs
     )
 
-    # Call provider-specific generation function
-    response_data = generation_func(
+    # Keep only as much history as fits the model's input budget
+    history, history_messages_dropped = _assemble_context(
+        history, final_prompt, system_instruction, model, provider, history_budget
+    )
+
+    # Serve repeatable requests from the response cache when possible
+    cache_key = None
+    cached_result = None
+    if cache_response or (
+        settings.llm_response_cache and kwargs.get("temperature") == 0
+    ):
+        cache_key = request_key(
+            provider, model, system_instruction, history, final_prompt, kwargs
+        )
+        cached_result = response_cache.get(cache_key)
+        if cached_result is not None:
+            cached_result = cached_result.model_copy(
+                update={
+                    "usage": cached_result.usage.model_copy(update={"cost": 0.0}),
+                    "from_cache": True,
+                }
+            )
+
+    return _PreparedRequest(
         prompt=final_prompt,
-        model=model,
+        user_prompt=user_prompt,
+        use_memory=use_memory,
+        agent_name=actual_agent_name,
         history=history,
         system_instruction=system_instruction,
-        **kwargs,
+        history_messages_dropped=history_messages_dropped,
+        cache_key=cache_key,
+        cached_result=cached_result,
+        stream=stream,
+        kwargs=kwargs,
     )
 
+
+def _reserve_capacity(
+    provider: str, request: _PreparedRequest
+) -> tuple[RateLimiter, int]:
+    """Wait for rate-limit capacity for a request, returning its token estimate."""
+    rate_limiter = get_rate_limiter(provider)
+    estimated_tokens = _estimate_request_tokens(
+        request.history, request.prompt, request.system_instruction
+    )
+    rate_limiter.acquire(estimated_tokens)
+    return rate_limiter, estimated_tokens
+
+
+def _generation_args(
+    request: _PreparedRequest, model: str, on_text: Callable | None
+) -> dict:
+    """Build the keyword arguments for a provider generation function.
+
+    With on_text, the provider streams its response and on_text is called
+    with each piece of text as it arrives.
+    """
+    args = {
+        "prompt": request.prompt,
+        "model": model,
+        "history": request.history,
+        "system_instruction": request.system_instruction,
+        **request.kwargs,
+    }
+    if on_text is not None:
+        args["on_text"] = on_text
+    return args
+
+
+def _llm_result(
+    response_data: dict,
+    model: str,
+    provider: str,
+    rate_limiter: RateLimiter,
+    estimated_tokens: int,
+    latency_ms: float,
+    request: _PreparedRequest,
+) -> LLMResult:
+    """Settle the rate limit, record the usage and build the result of a response."""
     # Extract response metadata
-    metadata = _extract_response_metadata(response_data, model, provider)
+    metadata = extract_response_metadata(response_data, model, provider)
+    rate_limiter.settle(
+        estimated_tokens, metadata["input_tokens"] + metadata["output_tokens"]
+    )
+    record_usage(metadata, model, provider, request.result_agent_name, latency_ms)
+    return result_from_metadata(metadata, model)
 
-    # Handle memory
-    if use_memory:
-        handle_agent_memory(
-            actual_agent_name,
-            user_prompt,
-            metadata["response_text"],
-            metadata["input_tokens"],
-            metadata["output_tokens"],
-            metadata["cost"],
-            lambda: actual_agent_name,
-        )
 
-    # Handle output
-    if output_file != "-":
-        output_path = Path(output_file)
-        output_path.write_text(metadata["response_text"])
+def record_usage(
+    metadata: dict, model: str, provider: str, agent: str, latency_ms: float
+):
+    """Record a response's usage in the usage ledger."""
+    # Claude and Gemini report cache reads directly, OpenAI within the prompt details
+    cached_input_tokens = metadata["cache_read_input_tokens"] or (
+        metadata["prompt_tokens_details"].get("cached_tokens") or 0
+    )
+    usage_ledger.record(
+        provider,
+        model,
+        agent=agent,
+        input_tokens=metadata["input_tokens"],
+        output_tokens=metadata["output_tokens"],
+        cached_input_tokens=cached_input_tokens,
+        cost=metadata["cost"],
+        latency_ms=latency_ms,
+    )
 
+
+def result_from_metadata(metadata: dict, model: str) -> LLMResult:
+    """Build the LLMResult of a response from its extracted metadata."""
     from mcp_handley_lab.shared.models import UsageStats
 
     usage_stats = UsageStats(
@@ -176,7 +523,6 @@ def process_llm_request(
     return LLMResult(
         content=metadata["response_text"],
         usage=usage_stats,
-        agent_name=actual_agent_name if use_memory else "",
         grounding_metadata=grounding_metadata,
         finish_reason=metadata["finish_reason"],
         avg_logprobs=metadata["avg_logprobs"],
@@ -193,6 +539,407 @@ def process_llm_request(
     )
 
 
+def _generate_llm_result(
+    request: _PreparedRequest,
+    model: str,
+    provider: str,
+    generation_func: Callable,
+    on_text: Callable[[str], None] | None = None,
+) -> LLMResult:
+    """Call the provider within its rate limit and record the usage."""
+    rate_limiter, estimated_tokens = _reserve_capacity(provider, request)
+    started = time.perf_counter()
+    response_data = generation_func(**_generation_args(request, model, on_text))
+    latency_ms = (time.perf_counter() - started) * 1000
+    return _llm_result(
+        response_data,
+        model,
+        provider,
+        rate_limiter,
+        estimated_tokens,
+        latency_ms,
+        request,
+    )
+
+
+async def _generate_llm_result_async(
+    request: _PreparedRequest,
+    model: str,
+    provider: str,
+    generation_func: Callable[..., Awaitable[dict]],
+    on_text: Callable[[str], Awaitable[None]] | None = None,
+) -> LLMResult:
+    """Await the provider within its rate limit and record the usage.
+
+    Waiting for rate-limit capacity and recording usage run in worker threads,
+    leaving the event loop free while they block.
+    """
+    rate_limiter, estimated_tokens = await anyio.to_thread.run_sync(
+        _reserve_capacity, provider, request
+    )
+    started = time.perf_counter()
+    response_data = await generation_func(**_generation_args(request, model, on_text))
+    latency_ms = (time.perf_counter() - started) * 1000
+    return await anyio.to_thread.run_sync(
+        _llm_result,
+        response_data,
+        model,
+        provider,
+        rate_limiter,
+        estimated_tokens,
+        latency_ms,
+        request,
+    )
+
+
+def _finish_llm_request(
+    request: _PreparedRequest,
+    result: LLMResult,
+    stream_writer: _StreamWriter | None,
+    output_file: str,
+    model: str,
+    provider: str,
+    generation_func: Callable,
+    mcp_instance,
+) -> LLMResult:
+    """Cache the result, add it to agent memory and write it to output_file."""
+    if request.cache_key is not None and request.cached_result is None:
+        response_cache.put(request.cache_key, result)
+
+    # Handle memory
+    history_messages_compacted = 0
+    if request.use_memory:
+        handle_agent_memory(
+            request.agent_name,
+            request.user_prompt,
+            result.content,
+            result.usage.input_tokens,
+            result.usage.output_tokens,
+            result.usage.cost,
+            lambda: request.agent_name,
+        )
+        history_messages_compacted = _compact_agent_history(
+            request.agent_name,
+            model,
+            provider,
+            generation_func,
+            mcp_instance,
+            request.kwargs,
+        )
+
+    # Handle output
+    if stream_writer is not None:
+        stream_writer.finish(result.content)
+    elif output_file != "-":
+        output_path = Path(output_file)
+        output_path.write_text(result.content)
+
+    return result.model_copy(
+        update={
+            "agent_name": request.result_agent_name,
+            "history_messages_dropped": request.history_messages_dropped,
+            "history_messages_compacted": history_messages_compacted,
+        }
+    )
+
+
+def process_llm_request(
+    prompt: str,
+    output_file: str,
+    agent_name: str,
+    model: str,
+    provider: str,
+    generation_func: Callable,
+    mcp_instance,
+    **kwargs,
+) -> LLMResult:
+    """Generic handler for LLM requests that abstracts common patterns."""
+    request = _prepare_llm_request(
+        prompt, agent_name, model, provider, mcp_instance, kwargs
+    )
+
+    result = request.cached_result
+    stream_writer = None
+    if result is None:
+        if request.stream:
+            stream_writer = _StreamWriter(output_file, _progress_reporter(mcp_instance))
+        result = _generate_llm_result(
+            request, model, provider, generation_func, stream_writer
+        )
+
+    return _finish_llm_request(
+        request,
+        result,
+        stream_writer,
+        output_file,
+        model,
+        provider,
+        generation_func,
+        mcp_instance,
+    )
+
+
+def _blocking_generation(
+    generation_func: Callable[..., Awaitable[dict]],
+) -> Callable[..., dict]:
+    """Wrap an async generation function for calling from a worker thread."""
+
+    def generate(**kwargs) -> dict:
+        return anyio.from_thread.run(functools.partial(generation_func, **kwargs))
+
+    return generate
+
+
+async def process_llm_request_async(
+    prompt: str,
+    output_file: str,
+    agent_name: str,
+    model: str,
+    provider: str,
+    generation_func: Callable[..., Awaitable[dict]],
+    mcp_instance,
+    **kwargs,
+) -> LLMResult:
+    """Async counterpart of process_llm_request for async generation functions.
+
+    Only the provider call runs on the event loop. Memory, cache and ledger work
+    runs in worker threads, so the server keeps serving other requests while
+    this one waits. Compaction summaries are generated from a worker thread with
+    the same generation function, called back on the event loop.
+    """
+    request = await anyio.to_thread.run_sync(
+        _prepare_llm_request, prompt, agent_name, model, provider, mcp_instance, kwargs
+    )
+
+    result = request.cached_result
+    stream_writer = None
+    if result is None:
+        if request.stream:
+            stream_writer = _StreamWriter(output_file, _progress_sender(mcp_instance))
+        result = await _generate_llm_result_async(
+            request,
+            model,
+            provider,
+            generation_func,
+            stream_writer.send if stream_writer else None,
+        )
+
+    return await anyio.to_thread.run_sync(
+        _finish_llm_request,
+        request,
+        result,
+        stream_writer,
+        output_file,
+        model,
+        provider,
+        _blocking_generation(generation_func),
+        mcp_instance,
+    )
+
+
+def async_ask_tool(
+    ask: Callable[..., LLMResult],
+    provider: str,
+    generation_func: Callable[..., Awaitable[dict]],
+    mcp_instance,
+    resolve_model: Callable[[str], str] | None = None,
+) -> Callable[..., Awaitable[LLMResult]]:
+    """Build the async MCP tool for a provider's ask function.
+
+    The tool takes the same parameters as ask and passes them on to
+    process_llm_request_async with the provider's async generation function,
+    so a slow completion doesn't hold up other calls to the server. ask itself
+    stays a plain function for synchronous callers.
+    """
+    signature = inspect.signature(ask)
+
+    @functools.wraps(ask)
+    async def ask_async(*args, **kwargs) -> LLMResult:
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        params = dict(arguments.arguments)
+        if resolve_model is not None:
+            params["model"] = resolve_model(params["model"])
+        return await process_llm_request_async(
+            provider=provider,
+            generation_func=generation_func,
+            mcp_instance=mcp_instance,
+            **params,
+        )
+
+    return ask_async
+
+
+async def process_llm_batch_async(
+    prompts: list[str],
+    prompt_files: list[str],
+    output_dir: str,
+    concurrency: int,
+    model: str,
+    provider: str,
+    generation_func: Callable[..., Awaitable[dict]],
+    mcp_instance,
+    **kwargs,
+) -> BatchResult:
+    """Send each of many prompts as its own request, with bounded concurrency.
+
+    Items are the prompts followed by the prompt files, numbered in that order.
+    Each goes through process_llm_request_async with the shared parameters and
+    no agent memory, and its response is written to output_dir as NNNN.txt,
+    named by its number. At most concurrency requests run at once. A failed
+    item records its error without cancelling the rest of the batch.
+    """
+    items = [(prompt, None) for prompt in prompts] + [
+        (None, prompt_file) for prompt_file in prompt_files
+    ]
+    if not items:
+        raise ValueError("Provide at least one prompt or prompt file")
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    limiter = anyio.CapacityLimiter(concurrency)
+    results: list[BatchItemResult | None] = [None] * len(items)
+
+    async def run(index: int, prompt: str | None, prompt_file: str | None):
+        output_file = str(output_path / f"{index:04d}.txt")
+        async with limiter:
+            try:
+                result = await process_llm_request_async(
+                    prompt=prompt,
+                    prompt_file=prompt_file,
+                    output_file=output_file,
+                    agent_name=False,
+                    model=model,
+                    provider=provider,
+                    generation_func=generation_func,
+                    mcp_instance=mcp_instance,
+                    **kwargs,
+                )
+            except Exception as e:
+                results[index] = BatchItemResult(
+                    index=index, prompt_file=prompt_file or "", error=str(e)
+                )
+                return
+        results[index] = BatchItemResult(
+            index=index,
+            prompt_file=prompt_file or "",
+            output_file=output_file,
+            usage=result.usage,
+            finish_reason=result.finish_reason,
+            from_cache=result.from_cache,
+        )
+
+    started = time.perf_counter()
+    async with anyio.create_task_group() as tg:
+        for index, (prompt, prompt_file) in enumerate(items):
+            tg.start_soon(run, index, prompt, prompt_file)
+    wall_time_ms = int((time.perf_counter() - started) * 1000)
+
+    usages = [item.usage for item in results if item.usage is not None]
+    return BatchResult(
+        items=results,
+        succeeded=len(usages),
+        failed=len(results) - len(usages),
+        total_input_tokens=sum(usage.input_tokens for usage in usages),
+        total_output_tokens=sum(usage.output_tokens for usage in usages),
+        total_cost=sum(usage.cost for usage in usages),
+        wall_time_ms=wall_time_ms,
+    )
+
+
+# ask parameters that differ per batch item, replaced by BATCH_PARAMETERS
+BATCH_ITEM_PARAMETERS = {
+    "prompt",
+    "prompt_file",
+    "output_file",
+    "agent_name",
+    "stream",
+}
+
+BATCH_PARAMETERS = [
+    inspect.Parameter(
+        "prompts",
+        inspect.Parameter.POSITIONAL_OR_KEYWORD,
+        default=Field(
+            default_factory=list,
+            description="Prompts to send, each as its own request without conversation memory.",
+        ),
+        annotation=list[str],
+    ),
+    inspect.Parameter(
+        "prompt_files",
+        inspect.Parameter.POSITIONAL_OR_KEYWORD,
+        default=Field(
+            default_factory=list,
+            description="Paths to files each containing one prompt, numbered after 'prompts'.",
+        ),
+        annotation=list[str],
+    ),
+    inspect.Parameter(
+        "output_dir",
+        inspect.Parameter.POSITIONAL_OR_KEYWORD,
+        default=Field(
+            ...,
+            description="Directory to write each response to, as NNNN.txt numbered by the item's position.",
+        ),
+        annotation=str,
+    ),
+    inspect.Parameter(
+        "concurrency",
+        inspect.Parameter.POSITIONAL_OR_KEYWORD,
+        default=Field(
+            default=8, description="Maximum number of requests in flight at once."
+        ),
+        annotation=int,
+    ),
+]
+
+
+def async_ask_batch_tool(
+    ask: Callable[..., LLMResult],
+    provider: str,
+    generation_func: Callable[..., Awaitable[dict]],
+    mcp_instance,
+    resolve_model: Callable[[str], str] | None = None,
+) -> Callable[..., Awaitable[BatchResult]]:
+    """Build the async MCP batch tool for a provider's ask function.
+
+    The tool takes lists of prompts and prompt files, an output directory and a
+    concurrency limit in place of ask's single prompt, output_file, agent_name
+    and stream. Its other parameters are ask's, shared by every item, and are
+    passed on to process_llm_batch_async.
+    """
+    signature = inspect.signature(ask)
+    signature = signature.replace(
+        parameters=BATCH_PARAMETERS
+        + [
+            parameter
+            for name, parameter in signature.parameters.items()
+            if name not in BATCH_ITEM_PARAMETERS
+        ],
+        return_annotation=BatchResult,
+    )
+
+    async def ask_batch(*args, **kwargs) -> BatchResult:
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        params = dict(arguments.arguments)
+        if resolve_model is not None:
+            params["model"] = resolve_model(params["model"])
+        return await process_llm_batch_async(
+            provider=provider,
+            generation_func=generation_func,
+            mcp_instance=mcp_instance,
+            **params,
+        )
+
+    ask_batch.__signature__ = signature
+    ask_batch.__doc__ = f"Send many prompts to {provider} concurrently."
+    return ask_batch
+
+
 def should_use_memory(agent_name: str | bool | None) -> bool:
     """Determines if agent memory should be used based on the agent_name parameter."""
     return (
@@ -216,7 +963,10 @@ def process_image_generation(
         raise ValueError("Prompt is required and cannot be empty")
 
     # Call the provider-specific generation function to get the image
+    get_rate_limiter(provider).acquire()
+    started = time.perf_counter()
     response_data = generation_func(prompt=prompt, model=model, **kwargs)
+    latency_ms = (time.perf_counter() - started) * 1000
     image_bytes = response_data["image_bytes"]
     input_tokens = response_data.get("input_tokens", 0)
     output_tokens = response_data.get("output_tokens", 1)
@@ -229,6 +979,15 @@ def process_image_generation(
     cost = calculate_cost(
         model, input_tokens, output_tokens, provider, images_generated=1
     )
+    usage_ledger.record(
+        provider,
+        model,
+        agent=agent_name or "",
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cost=cost,
+        latency_ms=latency_ms,
+    )
 
     handle_agent_memory(
         agent_name,
@@ -0,0 +1,75 @@
+"""SQLite connection shared by the LLM tools' on-disk stores."""
+
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class SQLiteDatabase:
+    """A single WAL-mode SQLite connection shared safely between threads.
+
+    The database and its directory are created when first used rather than on
+    construction, so module-level stores leave nothing on disk until a request
+    needs them. ``_setup`` creates the ``SCHEMA`` tables as the database opens.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._open_lock = threading.RLock()
+        self._conn: sqlite3.Connection | None = None
+        self._ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection, opening the database on first use.
+
+        Other threads wait while ``_setup`` runs, and the thread running it
+        gets the connection straight away, so setup can query the database.
+        """
+        if not self._ready:
+            with self._open_lock:
+                if self._conn is None:
+                    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._conn = sqlite3.connect(
+                        self.db_path,
+                        timeout=30,
+                        check_same_thread=False,
+                        isolation_level=None,
+                    )
+                    self._conn.execute("PRAGMA journal_mode=WAL")
+                    self._conn.execute("PRAGMA synchronous=NORMAL")
+                    try:
+                        self._setup()
+                    except BaseException:
+                        self._conn.close()
+                        self._conn = None
+                        raise
+                    self._ready = True
+        return self._conn
+
+    def _setup(self):
+        """Create the tables of a newly opened database."""
+        self._connection().executescript(self.SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in a write transaction that excludes other writers."""
+        conn = self._connection()
+        with self._lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """Run a read-only query and return all rows."""
+        conn = self._connection()
+        with self._lock:
+            return conn.execute(sql, params).fetchall()
@@ -0,0 +1,217 @@
+"""Persistent ledger of LLM usage and cost with hourly and daily rollups."""
+
+from datetime import datetime
+from pathlib import Path
+
+from mcp_handley_lab.llm.sqlite_database import SQLiteDatabase
+from mcp_handley_lab.shared.models import UsageReport, UsageRollup
+
+PERIODS = {"hour": 13, "day": 10}
+
+
+class UsageLedger(SQLiteDatabase):
+    """Append-only record of every LLM request, kept in ``usage.db``.
+
+    Each request is one row in ``usage``. In the same transaction it is added
+    to its hourly and daily buckets in ``usage_rollups``, keyed by provider and
+    model, so reports read a few rollup rows per bucket instead of scanning the
+    raw requests. Rows are never updated or deleted, so spend survives agents
+    being cleared or deleted.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS usage (
+            id INTEGER PRIMARY KEY,
+            ts TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            model TEXT NOT NULL,
+            agent TEXT NOT NULL,
+            input_tokens INTEGER NOT NULL,
+            output_tokens INTEGER NOT NULL,
+            cached_input_tokens INTEGER NOT NULL,
+            cost REAL NOT NULL,
+            latency_ms REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS usage_rollups (
+            period TEXT NOT NULL,
+            start TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            model TEXT NOT NULL,
+            requests INTEGER NOT NULL,
+            input_tokens INTEGER NOT NULL,
+            output_tokens INTEGER NOT NULL,
+            cached_input_tokens INTEGER NOT NULL,
+            cost REAL NOT NULL,
+            latency_ms REAL NOT NULL,
+            PRIMARY KEY (period, start, provider, model)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, storage_dir: str = ".mcp_handley_lab"):
+        self.storage_dir = Path(storage_dir)
+        super().__init__(self.storage_dir / "usage.db")
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        agent: str = "",
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cached_input_tokens: int = 0,
+        cost: float = 0.0,
+        latency_ms: float = 0.0,
+        timestamp: datetime | None = None,
+    ):
+        """Append one request to the ledger and add it to its rollup buckets."""
+        ts = (timestamp or datetime.now()).isoformat()
+        usage = (input_tokens, output_tokens, cached_input_tokens, cost, latency_ms)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO usage (ts, provider, model, agent, input_tokens, "
+                "output_tokens, cached_input_tokens, cost, latency_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (ts, provider, model, agent, *usage),
+            )
+            conn.executemany(
+                "INSERT INTO usage_rollups VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (period, start, provider, model) DO UPDATE SET "
+                "requests = requests + 1, "
+                "input_tokens = input_tokens + excluded.input_tokens, "
+                "output_tokens = output_tokens + excluded.output_tokens, "
+                "cached_input_tokens = "
+                "cached_input_tokens + excluded.cached_input_tokens, "
+                "cost = cost + excluded.cost, "
+                "latency_ms = latency_ms + excluded.latency_ms",
+                [
+                    (period, ts[:width], provider, model, *usage)
+                    for period, width in PERIODS.items()
+                ],
+            )
+
+    def rollups(
+        self,
+        period: str = "day",
+        since: datetime | None = None,
+        until: datetime | None = None,
+        provider: str = "",
+        model: str = "",
+    ) -> list[UsageRollup]:
+        """Get the rollup buckets starting in [since, until), oldest first.
+
+        Bounds are truncated to the period, so a bucket is included when the
+        hour or day it covers starts in the range.
+        """
+        if period not in PERIODS:
+            raise ValueError(
+                f"Unknown usage period '{period}': expected one of {list(PERIODS)}"
+            )
+        width = PERIODS[period]
+        conditions, params = ["period = ?"], [period]
+        if since is not None:
+            conditions.append("start >= ?")
+            params.append(since.isoformat()[:width])
+        if until is not None:
+            conditions.append("start < ?")
+            params.append(until.isoformat()[:width])
+        for column, value in (("provider", provider), ("model", model)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+
+        rows = self._query(
+            "SELECT start, provider, model, requests, input_tokens, output_tokens, "
+            "cached_input_tokens, cost, latency_ms FROM usage_rollups "
+            f"WHERE {' AND '.join(conditions)} ORDER BY start, provider, model",
+            tuple(params),
+        )
+        return [
+            UsageRollup(
+                period=period,
+                start=start,
+                provider=row_provider,
+                model=row_model,
+                requests=requests,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cached_input_tokens=cached_input_tokens,
+                cost=cost,
+                avg_latency_ms=latency_ms / requests,
+            )
+            for (
+                start,
+                row_provider,
+                row_model,
+                requests,
+                input_tokens,
+                output_tokens,
+                cached_input_tokens,
+                cost,
+                latency_ms,
+            ) in rows
+        ]
+
+    def total_cost(self, since: datetime, provider: str = "") -> float:
+        """Get the cost recorded since the start of since's day, from daily rollups."""
+        conditions, params = (
+            ["period = 'day'", "start >= ?"],
+            [since.date().isoformat()],
+        )
+        if provider:
+            conditions.append("provider = ?")
+            params.append(provider)
+        [(cost,)] = self._query(
+            f"SELECT COALESCE(SUM(cost), 0.0) FROM usage_rollups "
+            f"WHERE {' AND '.join(conditions)}",
+            tuple(params),
+        )
+        return cost
+
+    def report(
+        self,
+        period: str = "day",
+        since: datetime | None = None,
+        until: datetime | None = None,
+        provider: str = "",
+        model: str = "",
+    ) -> UsageReport:
+        """Get the rollups in a range together with their totals.
+
+        Without since, the report starts at the beginning of the current month.
+        """
+        if since is None:
+            since = datetime.now().replace(
+                day=1, hour=0, minute=0, second=0, microsecond=0
+            )
+        rollups = self.rollups(period, since, until, provider, model)
+        return UsageReport(
+            period=period,
+            since=since.isoformat(),
+            until=until.isoformat() if until else "",
+            rollups=rollups,
+            total_requests=sum(r.requests for r in rollups),
+            total_input_tokens=sum(r.input_tokens for r in rollups),
+            total_output_tokens=sum(r.output_tokens for r in rollups),
+            total_cost=sum(r.cost for r in rollups),
+        )
+
+
+def build_usage_report(
+    period: str = "day",
+    since: str = "",
+    until: str = "",
+    provider: str = "",
+    model: str = "",
+) -> UsageReport:
+    """Build a usage report from ISO date strings, as taken by the MCP tools."""
+    return usage_ledger.report(
+        period,
+        datetime.fromisoformat(since) if since else None,
+        datetime.fromisoformat(until) if until else None,
+        provider,
+        model,
+    )
+
+
+# Global usage ledger instance
+usage_ledger = UsageLedger()
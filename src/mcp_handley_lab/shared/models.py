@@ -37,6 +37,52 @@ class UsageStats(BaseModel):
     )
 
 
+class UsageRollup(BaseModel):
+    """Aggregated LLM usage of one model over one hour or day."""
+
+    period: str = Field(..., description="The bucket size, 'hour' or 'day'.")
+    start: str = Field(
+        ...,
+        description="The start of the bucket (e.g., '2025-06-01T13' or '2025-06-01').",
+    )
+    provider: str = Field(..., description="The LLM provider.")
+    model: str = Field(..., description="The model identifier.")
+    requests: int = Field(..., description="Number of requests in the bucket.")
+    input_tokens: int = Field(..., description="Total input tokens.")
+    output_tokens: int = Field(..., description="Total output tokens.")
+    cached_input_tokens: int = Field(
+        ..., description="Total input tokens served from a provider cache."
+    )
+    cost: float = Field(..., description="Total estimated cost in USD.")
+    avg_latency_ms: float = Field(
+        ..., description="Mean request latency in milliseconds."
+    )
+
+
+class UsageReport(BaseModel):
+    """LLM usage and spend over a time range, from the usage ledger."""
+
+    period: str = Field(..., description="The bucket size of the rollups.")
+    since: str = Field(..., description="The start of the reported range.")
+    until: str = Field(
+        default="", description="The end of the reported range, empty if open-ended."
+    )
+    rollups: list[UsageRollup] = Field(
+        default_factory=list,
+        description="Per-bucket usage for each provider and model, oldest first.",
+    )
+    total_requests: int = Field(default=0, description="Total requests in the range.")
+    total_input_tokens: int = Field(
+        default=0, description="Total input tokens in the range."
+    )
+    total_output_tokens: int = Field(
+        default=0, description="Total output tokens in the range."
+    )
+    total_cost: float = Field(
+        default=0.0, description="Total estimated cost in USD in the range."
+    )
+
+
 class GroundingMetadata(BaseModel):
     """Grounding metadata for LLM responses."""
 
@@ -112,7 +158,97 @@ class LLMResult(BaseModel):
         default=0, description="Tokens used for cache creation in Claude."
     )
     cache_read_input_tokens: int = Field(
-        default=0, description="Tokens read from cache in Claude."
+        default=0,
+        description="Tokens read from the Claude prompt cache or a Gemini context cache.",
+    )
+    history_messages_dropped: int = Field(
+        default=0,
+        description="Number of older conversation messages left out to fit the input token budget.",
+    )
+    history_messages_compacted: int = Field(
+        default=0,
+        description="Number of stored agent messages replaced by a summary after this response.",
+    )
+    from_cache: bool = Field(
+        default=False,
+        description="Whether the response was reused from the response cache, at no cost.",
+    )
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one prompt in a batch LLM request."""
+
+    index: int = Field(
+        ..., description="Position of the item, counting prompts before prompt files."
+    )
+    prompt_file: str = Field(
+        default="", description="The prompt file of the item, empty for a prompt."
+    )
+    output_file: str = Field(
+        default="", description="File the response was written to, empty on error."
+    )
+    usage: UsageStats | None = Field(
+        default=None, description="Token usage and cost, None on error."
+    )
+    finish_reason: str = Field(
+        default="", description="Reason why generation stopped (e.g., 'stop')."
+    )
+    from_cache: bool = Field(
+        default=False,
+        description="Whether the response was reused from the response cache.",
+    )
+    error: str = Field(default="", description="The error message if the item failed.")
+
+
+class BatchResult(BaseModel):
+    """Per-item and aggregate results of a batch LLM request."""
+
+    items: list[BatchItemResult] = Field(
+        default_factory=list, description="Results of each item, in order."
+    )
+    succeeded: int = Field(default=0, description="Number of items that succeeded.")
+    failed: int = Field(default=0, description="Number of items that failed.")
+    total_input_tokens: int = Field(
+        default=0, description="Total input tokens across all items."
+    )
+    total_output_tokens: int = Field(
+        default=0, description="Total output tokens across all items."
+    )
+    total_cost: float = Field(
+        default=0.0, description="Total estimated cost in USD across all items."
+    )
+    wall_time_ms: int = Field(
+        default=0, description="Time taken to run the whole batch in milliseconds."
+    )
+
+
+class BatchJob(BaseModel):
+    """State of a provider batch API job, persisted between polls."""
+
+    job_id: str = Field(..., description="Local identifier of the job.")
+    provider: str = Field(..., description="The LLM provider running the job.")
+    model: str = Field(..., description="The model every request in the job uses.")
+    provider_job_id: str = Field(
+        ..., description="The provider's identifier of the job."
+    )
+    status: str = Field(
+        default="in_progress",
+        description="'in_progress', 'completed', 'failed', 'cancelled' or 'expired'.",
+    )
+    output_dir: str = Field(
+        ..., description="Directory responses are written to once the job completes."
+    )
+    prompt_files: list[str] = Field(
+        default_factory=list,
+        description="The prompt file of each item in order, empty for a prompt.",
+    )
+    created_at: str = Field(..., description="When the job was submitted.")
+    finished_at: str = Field(
+        default="", description="When the job was seen to finish, empty until then."
+    )
+    result: BatchResult | None = Field(
+        default=None,
+        description="Per-item results at batch pricing, once the job has completed.",
     )
 
 
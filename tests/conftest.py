@@ -1,5 +1,6 @@
 import os
 import re
+import sys
 import tempfile
 from pathlib import Path
 
@@ -75,6 +76,41 @@ def vcr_config():
     }
 
 
+@pytest.fixture(autouse=True)
+def llm_storage(tmp_path, monkeypatch):
+    """Point the global LLM stores at a temporary directory for each test.
+
+    The stores only create their files on first use, so swapping them out
+    before a test runs keeps .mcp_handley_lab out of the checkout.
+    """
+    from mcp_handley_lab.common.config import settings
+    from mcp_handley_lab.llm import memory, rate_limit, response_cache, usage
+
+    storage_dir = str(tmp_path / ".mcp_handley_lab")
+    replacements = {
+        id(memory.memory_manager): memory.create_memory_manager(
+            storage_dir, settings.memory_backend
+        ),
+        id(usage.usage_ledger): usage.UsageLedger(storage_dir),
+        id(response_cache.response_cache): response_cache.ResponseCache(
+            storage_dir,
+            ttl=settings.llm_response_cache_ttl,
+            max_bytes=settings.llm_response_cache_max_bytes,
+            memory_entries=settings.llm_response_cache_memory_entries,
+        ),
+    }
+    # Modules that imported a store by name hold their own reference to it
+    for name, module in list(sys.modules.items()):
+        if not name.startswith("mcp_handley_lab"):
+            continue
+        for attribute, value in list(vars(module).items()):
+            if id(value) in replacements:
+                monkeypatch.setattr(module, attribute, replacements[id(value)])
+    # Rate limiters keep the ledger they were created with
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    return storage_dir
+
+
 @pytest.fixture
 def temp_storage_dir():
     with tempfile.TemporaryDirectory() as temp_dir:
@@ -0,0 +1,371 @@
+"""Unit tests for provider batch API jobs."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+from openai import OpenAI
+
+from mcp_handley_lab.common.pricing import calculate_cost, calculate_costs
+from mcp_handley_lab.llm.batch_jobs import (
+    BatchJobStore,
+    BatchProvider,
+    batch_job_tools,
+    refresh_batch_job,
+    submit_batch_job,
+)
+from mcp_handley_lab.llm.usage import UsageLedger
+
+
+class FakeBatchAPI:
+    """An in-memory batch API that completes jobs after a set number of polls."""
+
+    def __init__(self, polls_until_done=1, failing_ids=()):
+        self.polls_until_done = polls_until_done
+        self.failing_ids = set(failing_ids)
+        self.submitted = {}
+        self.polls = 0
+
+    def request_line(self, custom_id, prompt, model, system_instruction, params):
+        return {
+            "custom_id": custom_id,
+            "prompt": prompt,
+            "system": system_instruction,
+            "temperature": params["temperature"],
+        }
+
+    def submit(self, requests_file, model, job_id):
+        lines = [json.loads(line) for line in requests_file.read_text().splitlines()]
+        self.submitted[f"batch-{job_id}"] = lines
+        return f"batch-{job_id}"
+
+    def poll(self, provider_job_id):
+        self.polls += 1
+        return "completed" if self.polls >= self.polls_until_done else "in_progress"
+
+    def results(self, provider_job_id):
+        return {
+            line["custom_id"]: "Request errored"
+            if line["custom_id"] in self.failing_ids
+            else {
+                "text": f"Re: {line['prompt']}",
+                "input_tokens": 1000,
+                "output_tokens": 500,
+            }
+            for line in self.submitted[provider_job_id]
+        }
+
+    def provider(self):
+        return BatchProvider(self.request_line, self.submit, self.poll, self.results)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BatchJobStore(str(tmp_path / "memory"))
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage"))
+    with patch("mcp_handley_lab.llm.shared.usage_ledger", ledger):
+        yield ledger
+
+
+def _submit(api, store, tmp_path, **kwargs):
+    kwargs.setdefault("prompts", ["Q0", "Q1"])
+    kwargs.setdefault("prompt_files", [])
+    return submit_batch_job(
+        output_dir=str(tmp_path / "out"),
+        model="gpt-4o",
+        provider="openai",
+        batch_provider=api.provider(),
+        store=store,
+        temperature=0.0,
+        **kwargs,
+    )
+
+
+class TestBatchPricing:
+    """Test batch API discounts in the pricing calculator."""
+
+    def test_batch_cost_discounted(self):
+        """Test that batch requests cost the provider's batch fraction."""
+        standard = calculate_cost("gpt-4o", 1000, 500, "openai")
+        assert calculate_cost("gpt-4o", 1000, 500, "openai", batch=True) == (
+            pytest.approx(standard * 0.5)
+        )
+
+    def test_batch_costs_discounted(self):
+        """Test that vectorised batch costs match per-record batch costs."""
+        costs = calculate_costs("gpt-4o", [1000, 2000], [500, 0], "openai", batch=True)
+        assert costs.tolist() == pytest.approx(
+            [
+                calculate_cost("gpt-4o", 1000, 500, "openai", batch=True),
+                calculate_cost("gpt-4o", 2000, 0, "openai", batch=True),
+            ]
+        )
+
+
+class TestBatchJobs:
+    """Test submitting, polling and collecting batch jobs."""
+
+    def test_submit_writes_requests_and_state(self, store, tmp_path):
+        """Test that submission builds one request line per item and saves the job."""
+        prompt_file = tmp_path / "paper.txt"
+        prompt_file.write_text("Screen ${title}")
+        api = FakeBatchAPI()
+
+        job = _submit(
+            api,
+            store,
+            tmp_path,
+            prompt_files=[str(prompt_file)],
+            prompt_vars={"title": "Paper A"},
+            system_prompt="Be brief",
+        )
+
+        lines = api.submitted[job.provider_job_id]
+        assert [line["custom_id"] for line in lines] == ["0000", "0001", "0002"]
+        assert lines[2]["prompt"] == "Screen Paper A"
+        assert all(line["system"] == "Be brief" for line in lines)
+        assert all(line["temperature"] == 0.0 for line in lines)
+        assert store.requests_file(job.job_id).read_text().count("\n") == 3
+        assert job.prompt_files == ["", "", str(prompt_file)]
+        assert store.get(job.job_id) == job
+
+    def test_running_job_unchanged(self, store, tmp_path):
+        """Test that polling a running job leaves it in progress."""
+        api = FakeBatchAPI(polls_until_done=2)
+        job = _submit(api, store, tmp_path)
+
+        refreshed = refresh_batch_job(job.job_id, api.provider(), store)
+
+        assert refreshed.status == "in_progress"
+        assert refreshed.result is None
+        assert not (tmp_path / "out").exists()
+
+    def test_completed_job_collected_at_batch_prices(self, store, ledger, tmp_path):
+        """Test that completion writes outputs, prices at batch rates and records usage."""
+        api = FakeBatchAPI()
+        job = _submit(api, store, tmp_path)
+
+        job = refresh_batch_job(job.job_id, api.provider(), store)
+
+        assert job.status == "completed"
+        assert job.finished_at
+        assert (tmp_path / "out" / "0001.txt").read_text() == "Re: Q1"
+        item_cost = calculate_cost("gpt-4o", 1000, 500, "openai", batch=True)
+        assert job.result.items[0].usage.cost == pytest.approx(item_cost)
+        assert job.result.total_cost == pytest.approx(2 * item_cost)
+        assert job.result.total_input_tokens == 2000
+        assert ledger.report().total_requests == 2
+        assert store.get(job.job_id) == job
+
+    def test_failed_items_recorded(self, store, ledger, tmp_path):
+        """Test that per-request errors are kept without output files."""
+        api = FakeBatchAPI(failing_ids={"0000"})
+        job = _submit(api, store, tmp_path)
+
+        job = refresh_batch_job(job.job_id, api.provider(), store)
+
+        assert job.result.failed == 1
+        assert job.result.items[0].error == "Request errored"
+        assert not (tmp_path / "out" / "0000.txt").exists()
+        assert job.result.items[1].usage.input_tokens == 1000
+
+    def test_finished_job_not_polled_again(self, store, ledger, tmp_path):
+        """Test that a finished job is returned from its saved state."""
+        api = FakeBatchAPI()
+        job = _submit(api, store, tmp_path)
+        refresh_batch_job(job.job_id, api.provider(), store)
+
+        refresh_batch_job(job.job_id, api.provider(), store)
+
+        assert api.polls == 1
+        assert ledger.report().total_requests == 2
+
+    def test_list_jobs_by_provider(self, store, tmp_path):
+        """Test that jobs are listed oldest first, optionally for one provider."""
+        first = _submit(FakeBatchAPI(), store, tmp_path)
+        second = _submit(FakeBatchAPI(), store, tmp_path)
+
+        assert [job.job_id for job in store.list_jobs()] == [
+            first.job_id,
+            second.job_id,
+        ]
+        assert store.list_jobs("claude") == []
+
+    def test_unknown_job_raises(self, store):
+        """Test that polling a job that was never submitted fails."""
+        with pytest.raises(ValueError, match="not found"):
+            refresh_batch_job("openai-missing", FakeBatchAPI().provider(), store)
+
+    def test_empty_batch_raises(self, store, tmp_path):
+        """Test that a batch without prompts is rejected."""
+        with pytest.raises(ValueError, match="at least one prompt"):
+            _submit(FakeBatchAPI(), store, tmp_path, prompts=[])
+
+
+def _stub_openai_server():
+    """Start a local server implementing the OpenAI Files and Batch endpoints.
+
+    Batches complete immediately, answering each chat completion request with
+    "Re: " and its last message.
+    """
+    uploads = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body):
+            data = body if isinstance(body, bytes) else json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            if self.path == "/v1/files":
+                # The multipart upload holds the JSONL lines verbatim
+                lines = [
+                    json.loads(line)
+                    for line in body.decode().splitlines()
+                    if line.startswith('{"custom_id"')
+                ]
+                uploads["file-in"] = lines
+                self._send({"id": "file-in", "object": "file", "purpose": "batch"})
+            elif self.path == "/v1/batches":
+                assert json.loads(body)["input_file_id"] == "file-in"
+                self._send(self._batch())
+
+        def do_GET(self):
+            if self.path == "/v1/batches/batch-1":
+                self._send(self._batch())
+            elif self.path == "/v1/files/file-out/content":
+                self._send(
+                    "".join(
+                        json.dumps(self._output_line(line)) + "\n"
+                        for line in uploads["file-in"]
+                    ).encode()
+                )
+
+        @staticmethod
+        def _batch():
+            return {
+                "id": "batch-1",
+                "object": "batch",
+                "endpoint": "/v1/chat/completions",
+                "input_file_id": "file-in",
+                "completion_window": "24h",
+                "status": "completed",
+                "created_at": int(time.time()),
+                "output_file_id": "file-out",
+                "error_file_id": None,
+            }
+
+        @staticmethod
+        def _output_line(line):
+            body = line["body"]
+            return {
+                "custom_id": line["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {
+                        "id": f"chatcmpl-{line['custom_id']}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": body["model"],
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {
+                                    "role": "assistant",
+                                    "content": "Re: " + body["messages"][-1]["content"],
+                                },
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {
+                            "prompt_tokens": 10,
+                            "completion_tokens": 2,
+                            "total_tokens": 12,
+                        },
+                    },
+                },
+                "error": None,
+            }
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TestOpenAIBatchProvider:
+    """Test the OpenAI batch tools end to end against a local stub server."""
+
+    def test_submit_and_collect(self, store, ledger, tmp_path):
+        """Test that the tools submit JSONL requests and collect their completions."""
+        from mcp_handley_lab.llm.openai import tool
+
+        server = _stub_openai_server()
+        client = OpenAI(
+            api_key="stub", base_url=f"http://127.0.0.1:{server.server_port}/v1"
+        )
+        submit_batch, batch_status = batch_job_tools(
+            tool.ask, "openai", tool.BATCH_PROVIDER
+        )
+        try:
+            with (
+                patch.object(tool, "_client", client),
+                patch("mcp_handley_lab.llm.batch_jobs.batch_job_store", store),
+            ):
+                job = submit_batch(
+                    prompts=["Q0", "Q1"],
+                    prompt_files=[],
+                    output_dir=str(tmp_path / "out"),
+                    model="gpt-4o",
+                    temperature=0.0,
+                    max_output_tokens=0,
+                    files=[],
+                    enable_logprobs=False,
+                    top_logprobs=0,
+                    prompt_vars={},
+                    system_prompt=None,
+                    system_prompt_file=None,
+                    system_prompt_vars={},
+                )
+                job = batch_status(job.job_id)
+        finally:
+            server.shutdown()
+
+        assert job.provider_job_id == "batch-1"
+        assert job.status == "completed"
+        assert (tmp_path / "out" / "0000.txt").read_text() == "Re: Q0"
+        assert job.result.items[1].usage.cost == pytest.approx(
+            calculate_cost("gpt-4o", 10, 2, "openai", batch=True)
+        )
+        requests = [
+            json.loads(line)
+            for line in store.requests_file(job.job_id).read_text().splitlines()
+        ]
+        assert requests[0]["url"] == "/v1/chat/completions"
+        assert requests[0]["body"]["temperature"] == 0.0
+
+    @pytest.mark.parametrize("provider", ["openai", "claude", "gemini"])
+    def test_batch_tools_registered(self, provider):
+        """Test that each batch-capable server registers the batch job tools."""
+        import importlib
+
+        module = importlib.import_module(f"mcp_handley_lab.llm.{provider}.tool")
+        submit = module.mcp._tool_manager.get_tool("submit_batch")
+        status = module.mcp._tool_manager.get_tool("batch_status")
+
+        assert submit.parameters["required"] == ["output_dir"]
+        assert "history_budget" not in submit.parameters["properties"]
+        assert list(status.parameters["properties"]) == ["job_id"]
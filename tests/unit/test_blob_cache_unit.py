@@ -0,0 +1,135 @@
+"""Unit tests for the process-wide blob cache of file contents."""
+
+import base64
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from mcp_handley_lab.llm.blob_cache import BlobCache
+from mcp_handley_lab.llm.common import (
+    read_file_smart,
+    resolve_images_for_multimodal_prompt,
+    resolve_multimodal_content,
+)
+
+
+@pytest.fixture
+def cache():
+    """An empty blob cache, also used by the file readers in llm.common."""
+    cache = BlobCache(max_bytes=1000)
+    with patch("mcp_handley_lab.llm.common.blob_cache", cache):
+        yield cache
+
+
+def _read(path):
+    return path.read_text()
+
+
+def test_repeated_reads_hit(tmp_path, cache):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("hello")
+
+    assert cache.get(notes, "text", _read) == "hello"
+    assert cache.get(notes, "text", _read) == "hello"
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": 5}
+
+
+def test_edited_file_read_again(tmp_path, cache):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("hello")
+    cache.get(notes, "text", _read)
+
+    notes.write_text("hello, world")
+    stat = notes.stat()
+    os.utime(notes, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.get(notes, "text", _read) == "hello, world"
+    assert cache.misses == 2
+
+
+def test_forms_cached_separately(tmp_path, cache):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("hello")
+    cache.get(notes, "text", _read)
+    cache.get(notes, "base64", lambda path: "aGVsbG8=")
+    assert cache.stats()["entries"] == 2
+
+
+def test_least_recently_used_evicted(tmp_path, cache):
+    paths = []
+    for name in "abc":
+        path = tmp_path / f"{name}.txt"
+        path.write_text(name * 400)
+        paths.append(path)
+
+    cache.get(paths[0], "text", _read)
+    cache.get(paths[1], "text", _read)
+    cache.get(paths[0], "text", _read)
+    cache.get(paths[2], "text", _read)  # evicts b, the least recently used
+
+    assert cache.stats()["bytes"] == 800
+    cache.get(paths[0], "text", _read)
+    assert cache.hits == 2
+    cache.get(paths[1], "text", _read)
+    assert cache.misses == 4
+
+
+def test_oversized_payload_not_cached(tmp_path, cache):
+    big = tmp_path / "big.txt"
+    big.write_text("x" * 2000)
+    assert cache.get(big, "text", _read) == "x" * 2000
+    assert cache.stats()["entries"] == 0
+
+
+def test_disabled_cache(tmp_path):
+    cache = BlobCache(max_bytes=0)
+    notes = tmp_path / "notes.txt"
+    notes.write_text("hello")
+    for _ in range(2):
+        assert cache.get(notes, "text", _read) == "hello"
+    assert cache.stats() == {"hits": 0, "misses": 2, "entries": 0, "bytes": 0}
+
+
+def test_concurrent_misses_load_once(tmp_path, cache):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("hello")
+    loads = []
+
+    def slow_read(path):
+        loads.append(path)
+        time.sleep(0.05)
+        return path.read_text()
+
+    results = []
+
+    def ask():
+        results.append(cache.get(notes, "text", slow_read))
+
+    threads = [threading.Thread(target=ask) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["hello"] * 4
+    assert len(loads) == 1
+    assert cache.stats()["hits"] == 3
+
+
+def test_file_readers_share_cache(tmp_path, cache):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("hello")
+    image = tmp_path / "pixel.png"
+    image.write_bytes(b"\x89PNG fake")
+
+    content, is_text = read_file_smart(notes)
+    assert is_text and content.endswith("hello")
+    blocks = resolve_multimodal_content(files=[str(notes)], images=[str(image)])
+    assert blocks[0]["text"] == "hello"
+    _, image_blocks = resolve_images_for_multimodal_prompt("", [str(image)])
+    assert image_blocks[0]["data"] == base64.b64encode(b"\x89PNG fake").decode()
+
+    assert cache.hits == 2
+    assert cache.misses == 2
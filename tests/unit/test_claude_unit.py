@@ -1,11 +1,17 @@
 """Unit tests for Claude LLM module."""
 
+import pytest
+
+from mcp_handley_lab.common.config import settings
 from mcp_handley_lab.llm.claude.tool import (
     MODEL_CONFIGS,
+    _claude_request_params,
     _get_model_config,
     _resolve_model_alias,
 )
 
+CACHE_CONTROL = {"type": "ephemeral"}
+
 
 class TestClaudeModelConfiguration:
     """Test Claude model configuration and functionality."""
@@ -98,3 +104,87 @@ class TestClaudeErrorHandling:
         assert isinstance(config, dict)
         assert "output_tokens" in config
         assert "input_tokens" in config
+
+
+class TestClaudePromptCaching:
+    """Test prompt cache breakpoints in Claude requests."""
+
+    @pytest.fixture(autouse=True)
+    def caching_enabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "claude_prompt_caching", True)
+
+    def _params(self, prompt="Question?", history=None, system=None, files=None):
+        return _claude_request_params(
+            prompt,
+            "sonnet",
+            history or [],
+            system,
+            {"temperature": 1.0, "files": files, "max_output_tokens": 0},
+        )
+
+    def test_long_system_prompt_marked(self):
+        system = "Be thorough. " * 1000
+        params = self._params(system=system)
+        assert params["system"] == [
+            {"type": "text", "text": system, "cache_control": CACHE_CONTROL}
+        ]
+
+    def test_short_prefix_left_unmarked(self):
+        history = [
+            {"role": "user", "content": "Hi"},
+            {"role": "assistant", "content": "Hello"},
+        ]
+        params = self._params(history=history, system="Be brief.")
+        assert params["system"] == "Be brief."
+        assert all(isinstance(m["content"], str) for m in params["messages"])
+
+    def test_last_history_message_marked(self):
+        history = [
+            {"role": "user", "content": "Summarise this. " + "word " * 5000},
+            {"role": "assistant", "content": "A summary."},
+        ]
+        messages = self._params(history=history)["messages"]
+        assert messages[0]["content"] == history[0]["content"]
+        assert messages[1]["content"] == [
+            {"type": "text", "text": "A summary.", "cache_control": CACHE_CONTROL}
+        ]
+        assert messages[2]["content"] == "Question?"
+
+    def test_files_cached_ahead_of_prompt(self, tmp_path):
+        document = tmp_path / "notes.txt"
+        document.write_text("note " * 5000)
+        content = self._params(files=[str(document)])["messages"][-1]["content"]
+        assert len(content) == 2
+        assert "note note" in content[0]["text"]
+        assert content[0]["cache_control"] == CACHE_CONTROL
+        assert content[1] == {"type": "text", "text": "Question?"}
+
+    def test_haiku_needs_longer_prefix(self):
+        system = "Be thorough. " * 400  # ~1300 tokens
+        sonnet = self._params(system=system)
+        haiku = _claude_request_params(
+            "Question?",
+            "claude-3-5-haiku-20241022",
+            [],
+            system,
+            {"temperature": 1.0, "files": None, "max_output_tokens": 0},
+        )
+        assert isinstance(sonnet["system"], list)
+        assert haiku["system"] == system
+
+    def test_unlisted_model_uses_default_minimum(self):
+        system = "Be thorough. " * 400  # ~1300 tokens
+        params = _claude_request_params(
+            "Question?",
+            "claude-sonnet-4-20250514",
+            [],
+            system,
+            {"temperature": 1.0, "files": None, "max_output_tokens": 0},
+        )
+        assert params["model"] == "claude-sonnet-4-20250514"
+        assert isinstance(params["system"], list)
+
+    def test_caching_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "claude_prompt_caching", False)
+        params = self._params(system="Be thorough. " * 1000)
+        assert isinstance(params["system"], str)
@@ -1,16 +1,33 @@
 """Unit tests for common modules (config and pricing) with parametrized tests."""
 
+import os
 from pathlib import Path
 from unittest.mock import patch
 
+import numpy as np
 import pytest
+import yaml
+from pydantic import ValidationError
 
-from mcp_handley_lab.common.config import Settings
+from mcp_handley_lab.common.config import Settings, settings
 from mcp_handley_lab.common.pricing import (
+    ModelPrice,
     PricingCalculator,
     calculate_cost,
+    calculate_costs,
     format_usage,
 )
+from mcp_handley_lab.llm import model_loader
+
+MODELS_YAML = """
+default_model: test-model
+display_categories: []
+usage_notes: []
+models:
+  test-model:
+    input_per_1m: {input_price}
+    output_per_1m: 2.0
+"""
 
 
 class TestConfig:
@@ -24,6 +41,7 @@ class TestConfig:
         assert settings.openai_api_key == "YOUR_API_KEY_HERE"
         assert settings.google_credentials_file == "~/.google_calendar_credentials.json"
         assert settings.google_token_file == "~/.google_calendar_token.json"
+        assert settings.llm_blob_cache_max_bytes == 0
 
     def test_google_credentials_path_property(self):
         """Test google_credentials_path property expansion."""
@@ -136,6 +154,48 @@ class TestPricingCalculator:
         ) * 2.50  # Video is $0.30 per 1M
         assert cost == expected
 
+    def test_claude_prompt_cache_pricing(self):
+        """Test Claude cache reads and writes are billed on top of input."""
+        calc = PricingCalculator()
+
+        cost = calc.calculate_cost(
+            "claude-sonnet-4",
+            1000,
+            500,
+            "claude",
+            cached_input_tokens=4000,
+            cache_write_input_tokens=2000,
+        )
+        expected_input = (1000 / 1_000_000) * 3.00  # Regular input
+        expected_read = (4000 / 1_000_000) * 0.30  # Cache read, a tenth of input
+        expected_write = (2000 / 1_000_000) * 3.75  # Cache write, 1.25x input
+        expected_output = (500 / 1_000_000) * 15.00  # Output
+        expected = expected_input + expected_read + expected_write + expected_output
+        assert abs(cost - expected) < 1e-10
+
+    def test_gemini_context_cache_pricing(self):
+        """Test Gemini cached input is priced by the tier of the whole prompt."""
+        calc = PricingCalculator()
+
+        cost = calc.calculate_cost(
+            "gemini-2.5-pro", 50_000, 1000, "gemini", cached_input_tokens=180_000
+        )
+        expected_input = (50_000 / 1_000_000) * 2.50  # Over 200k prompt tier
+        expected_cached = (180_000 / 1_000_000) * 0.625
+        expected_output = (1000 / 1_000_000) * 10.00
+        expected = expected_input + expected_cached + expected_output
+        assert abs(cost - expected) < 1e-10
+
+        cost = calc.calculate_cost(
+            "gemini-2.5-flash", 1000, 500, "gemini", cached_input_tokens=100_000
+        )
+        expected = (
+            (1000 / 1_000_000) * 0.30
+            + (100_000 / 1_000_000) * 0.075
+            + (500 / 1_000_000) * 2.50
+        )
+        assert abs(cost - expected) < 1e-10
+
     def test_openai_cached_input_pricing(self):
         """Test OpenAI cached input pricing."""
         calc = PricingCalculator()
@@ -324,3 +384,116 @@ class TestPricingCalculator:
         usage1 = format_usage(1000, 500, 0.01)
         usage2 = PricingCalculator.format_usage(1000, 500, 0.01)
         assert usage1 == usage2
+
+
+class TestCompiledPricing:
+    """Test cached pricing tables and batch cost calculation."""
+
+    @pytest.fixture
+    def models_file(self, tmp_path):
+        """A provider models.yaml that PricingCalculator reads instead of the real one."""
+        models_file = tmp_path / "models.yaml"
+        models_file.write_text(MODELS_YAML.format(input_price=1.0))
+        with (
+            patch.object(model_loader, "get_models_file", return_value=models_file),
+            patch.object(settings, "model_registry_cache_dir", ""),
+            patch.dict(model_loader._registry, clear=True),
+            patch.dict(PricingCalculator._tables, clear=True),
+        ):
+            yield models_file
+
+    def test_yaml_parsed_once(self, models_file):
+        """Test that repeated calculations reuse the compiled table."""
+        with patch(
+            "mcp_handley_lab.llm.model_loader.yaml.safe_load",
+            wraps=yaml.safe_load,
+        ) as safe_load:
+            for _ in range(5):
+                calculate_cost("test-model", 1_000_000, 0, "test")
+
+        assert safe_load.call_count == 1
+
+    def test_table_recompiled_when_file_changes(self, models_file):
+        """Test that editing models.yaml invalidates the cached table."""
+        assert calculate_cost("test-model", 1_000_000, 0, "test") == 1.0
+
+        models_file.write_text(MODELS_YAML.format(input_price=3.0))
+        stat = models_file.stat()
+        os.utime(models_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert calculate_cost("test-model", 1_000_000, 0, "test") == 3.0
+
+    def test_compiled_table_is_read_only(self):
+        """Test that compiled pricing cannot be modified by callers."""
+        table = PricingCalculator.get_pricing_table("gemini")
+        with pytest.raises(TypeError):
+            table["gemini-2.5-flash"] = None
+        with pytest.raises(ValidationError):
+            table["gemini-2.5-flash"].output_per_1m = 0.0
+
+    def test_inf_threshold_compiled(self):
+        """Test that tier thresholds are compiled to floats, including '.inf'."""
+        price = ModelPrice.from_config(
+            {
+                "input_tiers": [
+                    {"threshold": 10, "price": 1.0},
+                    {"threshold": ".inf", "price": 2.0},
+                ]
+            }
+        )
+        assert price.input_tiers == ((10.0, 1.0), (float("inf"), 2.0))
+        assert price.cost(input_tokens=20) == pytest.approx(20 * 2.0 / 1_000_000)
+
+    @pytest.mark.parametrize(
+        "provider, models",
+        [
+            (
+                "gemini",
+                ["gemini-2.5-pro", "gemini-2.5-flash", "imagen-3.0-generate-002"],
+            ),
+            ("openai", ["gpt-4.1", "gpt-4o-mini", "gpt-image-1", "dall-e-3"]),
+        ],
+    )
+    def test_batch_matches_single_costs(self, provider, models):
+        """Test that calculate_costs prices each record like calculate_cost."""
+        rng = np.random.default_rng(0)
+        count = 1000
+        record_models = rng.choice(models, count)
+        input_tokens = rng.integers(0, 400_000, count)
+        output_tokens = rng.integers(0, 400_000, count)
+        cached = rng.integers(0, 1000, count)
+        images = rng.integers(0, 3, count)
+        # Include exact tier boundaries
+        input_tokens[:2] = [200_000, 200_001]
+
+        costs = calculate_costs(
+            record_models,
+            input_tokens,
+            output_tokens,
+            provider,
+            cached_input_tokens=cached,
+            images_generated=images,
+        )
+
+        expected = [
+            calculate_cost(
+                str(m),
+                int(i),
+                int(o),
+                provider,
+                cached_input_tokens=int(c),
+                images_generated=int(n),
+            )
+            for m, i, o, c, n in zip(
+                record_models, input_tokens, output_tokens, cached, images, strict=True
+            )
+        ]
+        np.testing.assert_allclose(costs, expected, rtol=1e-12)
+
+    def test_batch_single_model_and_errors(self):
+        """Test a scalar model name and an unknown model in a batch."""
+        costs = calculate_costs("gpt-4o", [1000, 2000], [500, 0], "openai")
+        assert costs.tolist() == pytest.approx([0.0075, 0.005])
+
+        with pytest.raises(ValueError, match="Model 'unknown' not found"):
+            calculate_costs(["gpt-4o", "unknown"], [1, 2], [1, 2], "openai")
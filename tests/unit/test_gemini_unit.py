@@ -1,9 +1,20 @@
 """Unit tests for Gemini LLM tool functionality."""
 
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
 import pytest
+from google.genai.errors import ClientError
 
+from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm.gemini import tool
+from mcp_handley_lab.llm.gemini.registry import RemoteRegistry
 from mcp_handley_lab.llm.gemini.tool import (
     MODEL_CONFIGS,
+    _gemini_request,
     _get_model_config,
 )
 
@@ -76,3 +87,294 @@ class TestGeminiHelpers:
         # Should raise FileNotFoundError instead of adding error text
         with pytest.raises(FileNotFoundError):
             _resolve_files(files)
+
+    def test_binary_files_inlined_as_raw_bytes(self, tmp_path, monkeypatch):
+        """Test that inline binary parts hold the file's bytes, not base64 text."""
+        from mcp_handley_lab.llm.blob_cache import BlobCache
+        from mcp_handley_lab.llm.gemini.tool import _resolve_files
+
+        data = os.urandom(6 * 1024 * 1024)
+        attachment = tmp_path / "scan.pdf"
+        attachment.write_bytes(data)
+        monkeypatch.setattr("mcp_handley_lab.llm.common.blob_cache", BlobCache(0))
+        tracemalloc.start()
+        try:
+            parts, used_files_api = _resolve_files([str(attachment)])
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert not used_files_api
+        assert parts[0].inline_data.data == data
+        assert peak < len(data) + 1024 * 1024
+
+
+class TestRemoteRegistry:
+    """Test the registry of remote resources by content key."""
+
+    def test_put_and_get(self, tmp_path):
+        registry = RemoteRegistry(str(tmp_path), "resources.json")
+        registry.put("key", "cachedContents/abc", time.time() + 3600)
+        assert registry.get("key")["name"] == "cachedContents/abc"
+        assert registry.get("other") is None
+
+    def test_persisted_across_instances(self, tmp_path):
+        RemoteRegistry(str(tmp_path), "resources.json").put(
+            "key", "files/abc", time.time() + 3600
+        )
+        assert RemoteRegistry(str(tmp_path), "resources.json").get("key")["name"] == (
+            "files/abc"
+        )
+
+    def test_processes_merge_their_entries(self, tmp_path):
+        first = RemoteRegistry(str(tmp_path), "resources.json")
+        second = RemoteRegistry(str(tmp_path), "resources.json")
+        first.get("key")
+        second.get("key")
+
+        first.put("first", "files/first", time.time() + 3600)
+        second.put("second", "files/second", time.time() + 3600)
+        assert first.get("second")["name"] == "files/second"
+        assert set(RemoteRegistry(str(tmp_path), "resources.json").entries()) == {
+            "first",
+            "second",
+        }
+
+        first.discard("second")
+        assert set(second.entries()) == {"first"}
+
+    def test_expiring_entries_not_returned(self, tmp_path):
+        registry = RemoteRegistry(str(tmp_path), "resources.json", margin=60)
+        registry.put("key", "files/abc", time.time() + 30)
+        assert registry.get("key") is None
+
+    def test_prune_forgets_expired_entries(self, tmp_path):
+        registry = RemoteRegistry(str(tmp_path), "resources.json")
+        registry.put("old", "files/old", time.time() - 1)
+        registry.put("new", "files/new", time.time() + 3600, uri="https://x/new")
+        assert registry.prune() == 1
+        assert list(registry.entries()) == ["new"]
+        assert registry.get("new")["uri"] == "https://x/new"
+
+
+class TestContextCaching:
+    """Test reuse of Gemini context caches for large or repeated files."""
+
+    @pytest.fixture(autouse=True)
+    def fake_caches(self, monkeypatch, tmp_path):
+        created = []
+
+        def create(model, config):
+            created.append(config)
+            return SimpleNamespace(
+                name=f"cachedContents/{len(created)}",
+                expire_time=datetime.now(timezone.utc) + timedelta(hours=1),
+            )
+
+        client = SimpleNamespace(caches=SimpleNamespace(create=create))
+        monkeypatch.setattr(tool, "_get_client", lambda: client)
+        monkeypatch.setattr(
+            tool,
+            "context_cache_registry",
+            RemoteRegistry(str(tmp_path), "gemini_context_caches.json"),
+        )
+        monkeypatch.setattr(tool, "_seen_contexts", set())
+        monkeypatch.setattr(tool, "_uncacheable_contexts", set())
+        monkeypatch.setattr(settings, "gemini_context_caching", True)
+        monkeypatch.setattr(settings, "gemini_context_cache_tokens", 32768)
+        self.created = created
+        return client
+
+    def _request(
+        self, files, system_instruction=None, model="gemini-2.5-flash", **kwargs
+    ):
+        return _gemini_request(
+            "Question?",
+            model,
+            [],
+            system_instruction,
+            {
+                "temperature": 1.0,
+                "grounding": False,
+                "files": files,
+                "max_output_tokens": 0,
+            },
+            **kwargs,
+        )
+
+    def _document(self, tmp_path, tokens):
+        document = tmp_path / "paper.txt"
+        document.write_text("word" * tokens)
+        return [str(document)]
+
+    def test_large_files_cached_on_first_use(self, tmp_path):
+        files = self._document(tmp_path, 40000)
+        contents, config, _ = self._request(files, "Be precise.")
+        assert config.cached_content == "cachedContents/1"
+        assert config.system_instruction is None
+        assert contents == "Question?"
+        assert self.created[0].system_instruction == "Be precise."
+
+        # A new question about the same files reuses the cache
+        _, config, _ = self._request(files, "Be precise.")
+        assert config.cached_content == "cachedContents/1"
+        assert len(self.created) == 1
+
+    def test_smaller_files_cached_when_repeated(self, tmp_path):
+        files = self._document(tmp_path, 2000)
+        contents, config, _ = self._request(files)
+        assert config.cached_content is None
+        assert len(contents) == 2
+
+        _, config, _ = self._request(files)
+        assert config.cached_content == "cachedContents/1"
+
+    def test_files_below_model_minimum_not_cached(self, tmp_path):
+        files = self._document(tmp_path, 500)
+        for _ in range(2):
+            _, config, _ = self._request(files)
+        assert config.cached_content is None
+        assert self.created == []
+
+    def test_model_minimum_read_from_yaml(self, tmp_path):
+        files = self._document(tmp_path, 3000)
+        for _ in range(2):
+            _, config, _ = self._request(files, model="gemini-2.5-pro")
+        assert config.cached_content is None
+        assert self.created == []
+
+    def test_unlisted_model_uses_default_minimum(self, tmp_path):
+        files = self._document(tmp_path, 2000)
+        for _ in range(2):
+            _, config, _ = self._request(files, model="gemini-3.0-flash-preview")
+        assert config.cached_content == "cachedContents/1"
+
+    def test_refused_context_not_retried(self, tmp_path, fake_caches):
+        def refuse(model, config):
+            self.created.append(config)
+            raise ClientError(
+                400,
+                {
+                    "error": {
+                        "code": 400,
+                        "message": "Cached content is too small. "
+                        "total_token_count=3000, min_total_token_count=4096",
+                        "status": "INVALID_ARGUMENT",
+                    }
+                },
+            )
+
+        fake_caches.caches.create = refuse
+        files = self._document(tmp_path, 40000)
+        for _ in range(2):
+            _, config, _ = self._request(files)
+        assert config.cached_content is None
+        assert len(self.created) == 1
+
+    def test_other_errors_raised_and_retried(self, tmp_path, fake_caches):
+        def deny(model, config):
+            self.created.append(config)
+            raise ClientError(
+                429,
+                {
+                    "error": {
+                        "code": 429,
+                        "message": "Resource has been exhausted",
+                        "status": "RESOURCE_EXHAUSTED",
+                    }
+                },
+            )
+
+        fake_caches.caches.create = deny
+        files = self._document(tmp_path, 40000)
+        for _ in range(2):
+            with pytest.raises(ClientError):
+                self._request(files)
+        assert len(self.created) == 2
+
+    def test_batch_requests_not_cached(self, tmp_path):
+        files = self._document(tmp_path, 40000)
+        _, config, _ = self._request(files, context_cache=False)
+        assert config.cached_content is None
+        assert self.created == []
+
+
+class TestFileUploads:
+    """Test reuse of Files API uploads by content."""
+
+    @pytest.fixture(autouse=True)
+    def fake_files(self, monkeypatch, tmp_path):
+        remote = {}
+
+        def upload(file, mime_type):
+            name = f"files/{len(remote)}"
+            remote[name] = SimpleNamespace(
+                name=name,
+                uri=f"https://generativelanguage.googleapis.com/v1beta/{name}",
+                create_time=datetime.now(timezone.utc) - timedelta(hours=30),
+                expiration_time=datetime.now(timezone.utc) + timedelta(hours=18),
+            )
+            return remote[name]
+
+        client = SimpleNamespace(
+            files=SimpleNamespace(
+                upload=upload,
+                list=lambda: list(remote.values()),
+                delete=lambda name: remote.pop(name),
+            )
+        )
+        monkeypatch.setattr(tool, "_get_client", lambda: client)
+        monkeypatch.setattr(tool, "GEMINI_INLINE_FILE_LIMIT_BYTES", 10)
+        monkeypatch.setattr(
+            tool,
+            "uploaded_file_registry",
+            RemoteRegistry(str(tmp_path), "gemini_uploads.json"),
+        )
+        self.remote = remote
+
+    def test_same_content_uploaded_once(self, tmp_path):
+        first = tmp_path / "data.csv"
+        second = tmp_path / "copy.csv"
+        first.write_text("a,b\n1,2\n" * 10)
+        second.write_text("a,b\n1,2\n" * 10)
+
+        parts, used_files_api = tool._resolve_files([str(first)])
+        assert used_files_api
+        again, _ = tool._resolve_files([str(second)])
+        assert again[0].file_data.file_uri == parts[0].file_data.file_uri
+        assert len(self.remote) == 1
+
+    def test_changed_content_uploaded_again(self, tmp_path):
+        data = tmp_path / "data.csv"
+        data.write_text("a,b\n1,2\n" * 10)
+        tool._resolve_files([str(data)])
+        data.write_text("a,b\n3,4\n" * 10)
+        tool._resolve_files([str(data)])
+        assert len(self.remote) == 2
+
+    def test_cleanup_deletes_old_registered_uploads(self, tmp_path):
+        data = tmp_path / "data.csv"
+        data.write_text("a,b\n1,2\n" * 10)
+        tool._resolve_files([str(data)])
+        self.remote["files/batch"] = SimpleNamespace(
+            name="files/batch",
+            create_time=datetime.now(timezone.utc) - timedelta(hours=30),
+        )
+
+        result = tool.cleanup_files(older_than_hours=24.0, include_unregistered=False)
+        assert result.data["deleted"] == ["files/0"]
+        assert list(self.remote) == ["files/batch"]
+        assert tool.uploaded_file_registry.entries() == {}
+
+        # The next request uploads the file again
+        tool._resolve_files([str(data)])
+        assert len(self.remote) == 2
+
+    def test_cleanup_keeps_recent_uploads(self, tmp_path):
+        data = tmp_path / "data.csv"
+        data.write_text("a,b\n1,2\n" * 10)
+        tool._resolve_files([str(data)])
+
+        result = tool.cleanup_files(older_than_hours=48.0, include_unregistered=True)
+        assert result.data["deleted"] == []
+        assert len(tool.uploaded_file_registry.entries()) == 1
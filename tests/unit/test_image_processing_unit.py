@@ -0,0 +1,92 @@
+"""Unit tests for downsizing images before they are sent to vision models."""
+
+import base64
+import io
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from mcp_handley_lab.llm import image_processing
+from mcp_handley_lab.llm.common import resolve_images_for_multimodal_prompt
+from mcp_handley_lab.llm.image_processing import (
+    ImageTarget,
+    image_target,
+    prepare_image,
+)
+
+WEBP = ImageTarget(max_dimension=1000, format="WEBP", quality=85)
+JPEG = ImageTarget(max_dimension=1000, format="JPEG", quality=85)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Start every test without prepared images from earlier tests."""
+    image_processing._prepared.clear()
+    yield
+    image_processing._prepared.clear()
+
+
+def _png(size, mode="RGB", color=(200, 30, 30)):
+    output = io.BytesIO()
+    Image.new(mode, size, color).save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_large_image_downsized():
+    data, mime_type = prepare_image(_png((4000, 2000)), "image/png", WEBP)
+
+    assert mime_type == "image/webp"
+    image = Image.open(io.BytesIO(data))
+    assert image.format == "WEBP"
+    assert image.size == (1000, 500)
+
+
+def test_small_image_kept_when_not_smaller():
+    original = _png((40, 40))
+    png = ImageTarget(max_dimension=1000, format="PNG", quality=85)
+    assert prepare_image(original, "image/png", png) == (original, "image/png")
+
+
+def test_transparency_flattened_for_jpeg():
+    data, mime_type = prepare_image(
+        _png((2000, 2000), "RGBA", (0, 0, 0, 0)), "image/png", JPEG
+    )
+
+    assert mime_type == "image/jpeg"
+    image = Image.open(io.BytesIO(data))
+    assert image.mode == "RGB"
+    assert image.getpixel((500, 500)) == (255, 255, 255)
+
+
+def test_prepared_images_cached_by_content():
+    original = _png((2000, 2000))
+    with patch.object(
+        image_processing, "_prepare", wraps=image_processing._prepare
+    ) as prepare:
+        first = prepare_image(original, "image/png", WEBP)
+        second = prepare_image(bytes(original), "image/png", WEBP)
+        prepare_image(original, "image/png", JPEG)
+
+    assert first == second
+    assert prepare.call_count == 2
+
+
+def test_image_target_from_models_yaml():
+    target = image_target("claude")
+    assert target.format == "WEBP"
+    assert target.max_dimension == 1568
+    assert image_target("grok").format == "JPEG"
+
+
+def test_multimodal_prompt_images_downsized(tmp_path):
+    photo = tmp_path / "photo.png"
+    photo.write_bytes(_png((3000, 3000)))
+
+    _, original = resolve_images_for_multimodal_prompt("", [str(photo)])
+    _, downsized = resolve_images_for_multimodal_prompt("", [str(photo)], WEBP)
+
+    assert original[0]["mime_type"] == "image/png"
+    assert downsized[0]["mime_type"] == "image/webp"
+    image = Image.open(io.BytesIO(base64.b64decode(downsized[0]["data"])))
+    assert image.size == (1000, 1000)
@@ -1,13 +1,20 @@
 """Unit tests for LLM common utilities."""
 
 import base64
+import os
+import tracemalloc
 from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
 
+from mcp_handley_lab.llm.blob_cache import BlobCache
 from mcp_handley_lab.llm.common import (
     determine_mime_type,
+    encode_file_base64,
+    encode_file_base64_bytes,
+    estimate_tokens,
+    fit_history_to_budget,
     get_gemini_safe_mime_type,
     get_session_id,
     handle_agent_memory,
@@ -18,9 +25,21 @@ from mcp_handley_lab.llm.common import (
     read_file_smart,
     resolve_file_content,
     resolve_image_data,
+    resolve_multimodal_content,
 )
 
 
+def _peak_allocation(func, *args, **kwargs) -> tuple[object, int]:
+    """Call func and return its result with the peak bytes it allocated."""
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
 class TestGetSessionId:
     """Test session ID generation."""
 
@@ -323,18 +342,17 @@ class TestReadFileSmart:
         with pytest.raises(UnicodeDecodeError):
             read_file_smart(Path("test.txt"))
 
-    @patch("pathlib.Path.stat")
-    @patch("pathlib.Path.read_bytes")
-    def test_read_file_smart_binary_file(self, mock_read_bytes, mock_stat):
+    def test_read_file_smart_binary_file(self, tmp_path):
         """Test reading a binary file."""
-        mock_stat.return_value.st_size = 100
-        mock_read_bytes.return_value = b"\x00\x01\x02"
+        binary_file = tmp_path / "test.bin"
+        binary_file.write_bytes(bytes(range(100)))
 
-        content, is_text = read_file_smart(Path("test.bin"))
+        content, is_text = read_file_smart(binary_file)
         assert "[Binary file:" in content
         assert "test.bin" in content
         assert "application/octet-stream" in content
         assert "100 bytes" in content
+        assert content.endswith(base64.b64encode(bytes(range(100))).decode())
         assert is_text is False
 
     @patch("pathlib.Path.stat")
@@ -361,6 +379,55 @@ class TestReadFileSmart:
             read_file_smart(Path("test.txt"), max_size=500)
 
 
+class TestEncodeFileBase64:
+    """Test chunked base64 encoding of files."""
+
+    @pytest.mark.parametrize("size", [0, 1, 2, 3, 4, 5, 20, 21, 22, 1000])
+    @pytest.mark.parametrize("chunk_size", [3, 6, 9, 3 * 1024 * 1024])
+    def test_matches_base64(self, tmp_path, size, chunk_size):
+        """Test that chunk boundaries and padding match one-shot encoding."""
+        data = bytes(i % 251 for i in range(size))
+        binary_file = tmp_path / "data.bin"
+        binary_file.write_bytes(data)
+
+        assert encode_file_base64(binary_file, chunk_size) == (
+            base64.b64encode(data).decode()
+        )
+        assert encode_file_base64_bytes(binary_file) == base64.b64encode(data)
+
+    def test_prefix_ahead_of_encoding(self, tmp_path):
+        binary_file = tmp_path / "data.bin"
+        binary_file.write_bytes(b"\x00\x01\x02\x03")
+        assert encode_file_base64(binary_file, prefix="[héader]\n") == (
+            "[héader]\nAAECAw=="
+        )
+
+
+class TestAttachmentPeakMemory:
+    """Test that large binary attachments are read without extra copies."""
+
+    @pytest.fixture
+    def attachment(self, tmp_path):
+        attachment = tmp_path / "scan.pdf"
+        attachment.write_bytes(os.urandom(6 * 1024 * 1024))
+        with patch("mcp_handley_lab.llm.common.blob_cache", BlobCache(max_bytes=0)):
+            yield attachment
+
+    def test_binary_file_content_built_once(self, attachment):
+        """Test that the headed base64 text peaks at the buffer and the str."""
+        (content, _), peak = _peak_allocation(read_file_smart, attachment)
+        assert content.startswith("[Binary file: scan.pdf, application/pdf")
+        assert peak < 2 * len(content) + 2 * 1024 * 1024
+
+    def test_multimodal_binary_encoded_once(self, attachment):
+        """Test that base64 bytes for content blocks are not decoded and re-encoded."""
+        blocks, peak = _peak_allocation(
+            resolve_multimodal_content, files=[str(attachment)]
+        )
+        # binascii over-allocates its output by half before trimming it
+        assert peak < 1.5 * len(blocks[0]["data"]) + 1024 * 1024
+
+
 class TestResolveImageData:
     """Test image data resolution."""
 
@@ -531,6 +598,55 @@ class TestHandleAgentMemory:
         assert result is None
 
 
+class TestFitHistoryToBudget:
+    """Test token-budgeted selection of conversation history."""
+
+    @staticmethod
+    def _history(turns: int) -> list[dict[str, str]]:
+        history = []
+        for i in range(turns):
+            history.append({"role": "user", "content": f"question {i} " * 10})
+            history.append({"role": "assistant", "content": f"answer {i} " * 10})
+        return history
+
+    def test_estimate_tokens(self):
+        """Test that token estimates round up to whole tokens."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+
+    def test_everything_fits(self):
+        """Test that a generous budget keeps the whole history."""
+        history = self._history(3)
+        window, dropped = fit_history_to_budget(history, 10_000)
+        assert window == history
+        assert dropped == 0
+
+    def test_keeps_most_recent_messages(self):
+        """Test that the oldest messages are dropped first."""
+        history = self._history(5)
+        per_message = estimate_tokens(history[0]["content"]) + 4
+        window, dropped = fit_history_to_budget(history, per_message * 4 + 2)
+        assert window == history[-4:]
+        assert dropped == 6
+
+    def test_window_starts_with_user_message(self):
+        """Test that a window never opens on an orphaned assistant reply."""
+        history = self._history(5)
+        per_message = estimate_tokens(history[0]["content"]) + 4
+        window, dropped = fit_history_to_budget(history, per_message * 3 + 2)
+        assert window[0]["role"] == "user"
+        assert window == history[-2:]
+        assert dropped == 8
+
+    def test_zero_budget_drops_everything(self):
+        """Test that a budget too small for any message yields an empty window."""
+        history = self._history(2)
+        window, dropped = fit_history_to_budget(history, 0)
+        assert window == []
+        assert dropped == 4
+
+
 class TestLoadPromptText:
     """Test prompt text loading with file support and template substitution."""
 
@@ -1,10 +1,28 @@
 """Unit tests for LLM shared processing functionality."""
 
-from unittest.mock import Mock, patch
+import importlib
+import inspect
+import time
+from unittest.mock import AsyncMock, Mock, call, patch
 
+import anyio
 import pytest
 
-from mcp_handley_lab.llm.shared import process_llm_request
+from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm.claude import tool as claude_tool
+from mcp_handley_lab.llm.gemini import tool as gemini_tool
+from mcp_handley_lab.llm.memory import MemoryManager, read_archive
+from mcp_handley_lab.llm.shared import (
+    COMPACTION_PROMPT,
+    SUMMARY_PREFIX,
+    _progress_reporter,
+    _StreamWriter,
+    async_ask_batch_tool,
+    async_ask_tool,
+    process_llm_batch_async,
+    process_llm_request,
+    process_llm_request_async,
+)
 
 
 class TestProcessLLMRequestPromptResolution:
@@ -229,6 +247,7 @@ class TestProcessLLMRequestPromptResolution:
         # Mock agent
         mock_agent = Mock()
         mock_agent.system_prompt = "You are a helpful assistant."
+        mock_agent.get_history.return_value = []
         mock_memory_manager.get_agent.return_value = None
         mock_memory_manager.create_agent.return_value = mock_agent
 
@@ -310,3 +329,649 @@ class TestProcessLLMRequestPromptResolution:
             # Should not write any files when output_file is "-"
             mock_write.assert_not_called()
             assert "Response" in result.content
+
+
+class TestHistoryBudget:
+    """Test that conversation history is trimmed to the input token budget."""
+
+    @staticmethod
+    def _run(mock_memory_manager, history, history_budget, model="gpt-4o-mini"):
+        mock_agent = Mock()
+        mock_agent.system_prompt = None
+        mock_agent.get_history.return_value = history
+        mock_memory_manager.get_agent.return_value = mock_agent
+
+        received = {}
+
+        def mock_generation_func(prompt, system_instruction, history, **kwargs):
+            received["history"] = history
+            return {"text": "Response", "input_tokens": 10, "output_tokens": 5}
+
+        mock_mcp = Mock()
+        with patch("mcp_handley_lab.llm.shared.handle_agent_memory"):
+            result = process_llm_request(
+                prompt="Test prompt",
+                output_file="-",
+                agent_name="test_agent",
+                model=model,
+                provider="openai",
+                generation_func=mock_generation_func,
+                mcp_instance=mock_mcp,
+                history_budget=history_budget,
+            )
+        return result, received["history"]
+
+    @staticmethod
+    def _history(turns: int) -> list[dict[str, str]]:
+        return [
+            {"role": role, "content": "word " * 100}
+            for _ in range(turns)
+            for role in ("user", "assistant")
+        ]
+
+    @patch("mcp_handley_lab.llm.shared.memory_manager")
+    @patch("mcp_handley_lab.llm.shared.calculate_cost", return_value=0.001)
+    def test_explicit_budget_trims_oldest(
+        self, mock_calculate_cost, mock_memory_manager
+    ):
+        """Test that a positive budget keeps only the newest turns."""
+        history = self._history(10)
+        result, sent = self._run(mock_memory_manager, history, 300)
+        assert sent == history[-2:]
+        assert result.history_messages_dropped == 18
+
+    @patch("mcp_handley_lab.llm.shared.memory_manager")
+    @patch("mcp_handley_lab.llm.shared.calculate_cost", return_value=0.001)
+    def test_default_budget_uses_model_limit(
+        self, mock_calculate_cost, mock_memory_manager
+    ):
+        """Test that the default budget keeps history within the model's limit."""
+        history = self._history(10)
+        result, sent = self._run(mock_memory_manager, history, 0)
+        assert sent == history
+        assert result.history_messages_dropped == 0
+
+    @patch("mcp_handley_lab.llm.shared.memory_manager")
+    @patch("mcp_handley_lab.llm.shared.calculate_cost", return_value=0.001)
+    def test_negative_budget_sends_full_history(
+        self, mock_calculate_cost, mock_memory_manager
+    ):
+        """Test that a negative budget disables trimming."""
+        history = self._history(10)
+        result, sent = self._run(mock_memory_manager, history, -1)
+        assert sent == history
+        assert result.history_messages_dropped == 0
+
+    @patch("mcp_handley_lab.llm.shared.memory_manager")
+    @patch("mcp_handley_lab.llm.shared.calculate_cost", return_value=0.001)
+    def test_unknown_model_sends_full_history(
+        self, mock_calculate_cost, mock_memory_manager
+    ):
+        """Test that models without a configured limit are not trimmed."""
+        history = self._history(10)
+        result, sent = self._run(
+            mock_memory_manager, history, 0, model="unlisted-model"
+        )
+        assert sent == history
+        assert result.history_messages_dropped == 0
+
+
+class TestHistoryCompaction:
+    """Test rolling summarise-and-replace compaction of agent history."""
+
+    @staticmethod
+    def _converse(
+        manager,
+        turns,
+        request_kwargs=None,
+        provider="openai",
+        model="gpt-4o",
+        build_request=None,
+        **settings_overrides,
+    ):
+        calls = []
+
+        def fake_generation_func(prompt, model, history, system_instruction, **kwargs):
+            calls.append(
+                {"prompt": prompt, "model": model, "history": history, **kwargs}
+            )
+            if build_request is not None:
+                build_request(prompt, model, history, system_instruction, kwargs)
+            if prompt.startswith(COMPACTION_PROMPT):
+                return {"text": "condensed", "input_tokens": 100, "output_tokens": 10}
+            return {"text": "reply " * 50, "input_tokens": 10, "output_tokens": 5}
+
+        overrides = {
+            "memory_compaction_tokens": 1000,
+            "memory_compaction_keep_messages": 4,
+            **settings_overrides,
+        }
+        results = []
+        with (
+            patch("mcp_handley_lab.llm.shared.memory_manager", manager),
+            patch("mcp_handley_lab.llm.common.memory_manager", manager),
+            patch("mcp_handley_lab.llm.shared.calculate_cost", return_value=0.001),
+            patch.multiple(settings, **overrides),
+        ):
+            for i in range(turns):
+                results.append(
+                    process_llm_request(
+                        prompt=f"question {i} " * 50,
+                        output_file="-",
+                        agent_name="researcher",
+                        model=model,
+                        provider=provider,
+                        generation_func=fake_generation_func,
+                        mcp_instance=Mock(),
+                        **(request_kwargs or {}),
+                    )
+                )
+        return results, calls
+
+    def test_disabled_by_default(self, tmp_path):
+        """Test that history is left alone when no threshold is configured."""
+        manager = MemoryManager(str(tmp_path))
+        results, calls = self._converse(manager, 8, memory_compaction_tokens=0)
+
+        assert len(calls) == 8
+        assert len(manager.get_agent("researcher").messages) == 16
+        assert all(result.history_messages_compacted == 0 for result in results)
+
+    def test_old_turns_replaced_by_summary(self, tmp_path):
+        """Test that passing the threshold summarises all but the newest turns."""
+        manager = MemoryManager(str(tmp_path))
+        results, calls = self._converse(manager, 8)
+
+        compactions = [c for c in calls if c["prompt"].startswith(COMPACTION_PROMPT)]
+        assert compactions
+        assert compactions[0]["model"] == "gpt-4o-mini"
+        assert compactions[0]["history"] == []
+        assert sum(r.history_messages_compacted > 0 for r in results) == len(
+            compactions
+        )
+
+        messages = manager.get_agent("researcher").messages
+        assert messages[0].content == SUMMARY_PREFIX + "condensed"
+        assert messages[0].role == "user"
+        assert messages[1].role == "user"
+        assert messages[-1].content == "reply " * 50
+
+        # Originals are archived, not resent
+        archive = read_archive(manager.get_archive_file("researcher"))
+        assert archive[0].content == "question 0 " * 50
+        last_turn = [c for c in calls if c not in compactions][-1]
+        assert all(
+            "question 0 " not in message["content"] for message in last_turn["history"]
+        )
+
+    def test_summary_usage_added_to_totals(self, tmp_path):
+        """Test that the summarisation call is charged to the agent."""
+        manager = MemoryManager(str(tmp_path))
+        results, calls = self._converse(manager, 8)
+
+        conversation_tokens = 8 * (10 + 5)
+        compactions = sum(c["prompt"].startswith(COMPACTION_PROMPT) for c in calls)
+        stats = manager.get_stats("researcher")
+        assert stats["total_tokens"] == conversation_tokens + compactions * 110
+
+    def test_summary_uses_generation_settings_only(self, tmp_path):
+        """Test that request options other than generation settings are dropped."""
+        manager = MemoryManager(str(tmp_path))
+        request_kwargs = {
+            "temperature": 0.3,
+            "max_output_tokens": 500,
+            "enable_logprobs": True,
+            "top_logprobs": 5,
+            "grounding": True,
+        }
+        _, calls = self._converse(manager, 8, request_kwargs)
+
+        compaction = next(c for c in calls if c["prompt"].startswith(COMPACTION_PROMPT))
+        assert set(compaction) - {"prompt", "model", "history"} == {
+            "temperature",
+            "max_output_tokens",
+            "files",
+        }
+        assert compaction["temperature"] == 0.3
+        assert compaction["files"] == []
+
+    @pytest.mark.parametrize(
+        "provider, model, build_request",
+        [
+            ("gemini", "gemini-2.5-flash", gemini_tool._gemini_request),
+            ("claude", "claude-sonnet-4", claude_tool._claude_request_params),
+        ],
+    )
+    def test_summary_request_built_by_provider(
+        self, tmp_path, provider, model, build_request
+    ):
+        """Test that the summary request is accepted by the real request builders."""
+        manager = MemoryManager(str(tmp_path))
+        request_kwargs = {"temperature": 1.0, "max_output_tokens": 0, "files": []}
+        results, calls = self._converse(
+            manager, 8, request_kwargs, provider, model, build_request
+        )
+
+        assert any(c["prompt"].startswith(COMPACTION_PROMPT) for c in calls)
+        assert any(result.history_messages_compacted for result in results)
+
+
+class TestStreaming:
+    """Test streaming responses to output_file and progress notifications."""
+
+    @staticmethod
+    def _streaming_generation_func(chunks, output_file, seen):
+        def generation_func(prompt, model, history, system_instruction, **kwargs):
+            on_text = kwargs["on_text"]
+            for chunk in chunks:
+                on_text(chunk)
+                seen.append(output_file.read_text())
+            return {"text": "".join(chunks), "input_tokens": 10, "output_tokens": 5}
+
+        return generation_func
+
+    def test_chunks_appended_to_output_file(self, tmp_path):
+        """Test that the output file grows with each chunk as it arrives."""
+        output_file = tmp_path / "response.txt"
+        output_file.write_text("stale")
+        seen = []
+
+        result = process_llm_request(
+            prompt="Hello",
+            output_file=str(output_file),
+            agent_name=False,
+            model="gpt-4o",
+            provider="openai",
+            generation_func=self._streaming_generation_func(
+                ["Once ", "upon ", "a time"], output_file, seen
+            ),
+            mcp_instance=Mock(),
+            stream=True,
+        )
+
+        assert seen == ["Once ", "Once upon ", "Once upon a time"]
+        assert output_file.read_text() == result.content == "Once upon a time"
+
+    def test_output_rewritten_when_final_text_differs(self, tmp_path):
+        """Test that output_file ends up with the final response text."""
+        writer = _StreamWriter(str(tmp_path / "response.txt"))
+        writer("partial")
+        writer.finish("final answer")
+
+        assert (tmp_path / "response.txt").read_text() == "final answer"
+
+    def test_progress_reports_received_length(self):
+        """Test that each chunk is reported with the characters received so far."""
+        report = Mock()
+        writer = _StreamWriter("-", report)
+        for chunk in ["ab", "", "cde"]:
+            writer(chunk)
+
+        assert report.call_args_list == [call(2, "ab"), call(5, "cde")]
+
+    def test_no_streaming_by_default(self):
+        """Test that adapters only receive on_text when streaming is requested."""
+        generation_func = Mock(
+            return_value={"text": "Response", "input_tokens": 10, "output_tokens": 5}
+        )
+        process_llm_request(
+            prompt="Hello",
+            output_file="-",
+            agent_name=False,
+            model="gpt-4o",
+            provider="openai",
+            generation_func=generation_func,
+            mcp_instance=Mock(),
+        )
+
+        assert "on_text" not in generation_func.call_args.kwargs
+        assert "stream" not in generation_func.call_args.kwargs
+
+    def test_progress_relayed_from_worker_thread(self):
+        """Test that progress is sent through the event loop from a worker thread."""
+        mcp_instance = Mock()
+        context = mcp_instance.get_context.return_value
+        context.request_context.meta.progressToken = "token"
+        context.report_progress = AsyncMock()
+
+        async def main():
+            assert _progress_reporter(mcp_instance) is None
+            report = await anyio.to_thread.run_sync(_progress_reporter, mcp_instance)
+            await anyio.to_thread.run_sync(report, 5, "hello")
+
+        anyio.run(main)
+
+        context.report_progress.assert_awaited_once_with(5, None, "hello")
+
+    def test_no_progress_without_token(self):
+        """Test that clients not asking for progress get no notifications."""
+        mcp_instance = Mock()
+        mcp_instance.get_context.return_value.request_context.meta = None
+
+        assert _progress_reporter(mcp_instance) is None
+
+
+class TestAsyncRequests:
+    """Test process_llm_request_async and the async ask tools."""
+
+    @staticmethod
+    def _slow_generation_func(delay, calls=None):
+        async def generation_func(prompt, model, history, system_instruction, **kwargs):
+            if calls is not None:
+                calls.append({"prompt": prompt, "model": model, **kwargs})
+            await anyio.sleep(delay)
+            return {"text": f"Re: {prompt}", "input_tokens": 10, "output_tokens": 5}
+
+        return generation_func
+
+    @staticmethod
+    async def _ask(generation_func, prompt="Hello", **kwargs):
+        return await process_llm_request_async(
+            prompt=prompt,
+            output_file="-",
+            agent_name=False,
+            model="gpt-4o",
+            provider="openai",
+            generation_func=generation_func,
+            mcp_instance=Mock(),
+            **kwargs,
+        )
+
+    def test_async_generation_result(self):
+        """Test that an async generation function produces a normal result."""
+        calls = []
+        result = anyio.run(
+            lambda: self._ask(self._slow_generation_func(0, calls), temperature=0.5)
+        )
+
+        assert result.content == "Re: Hello"
+        assert result.usage.input_tokens == 10
+        assert result.usage.cost > 0
+        assert calls[0]["temperature"] == 0.5
+
+    def test_concurrent_requests_overlap(self):
+        """Test that requests awaiting the provider don't wait for each other."""
+        generation_func = self._slow_generation_func(0.3)
+
+        async def main():
+            results = [None] * 5
+
+            async def ask(i):
+                results[i] = await self._ask(generation_func, prompt=f"Q{i}")
+
+            async with anyio.create_task_group() as tg:
+                for i in range(5):
+                    tg.start_soon(ask, i)
+            return results
+
+        started = time.perf_counter()
+        results = anyio.run(main)
+        elapsed = time.perf_counter() - started
+
+        assert [r.content for r in results] == [f"Re: Q{i}" for i in range(5)]
+        assert elapsed < 1.0
+
+    def test_streamed_chunks_awaited(self, tmp_path):
+        """Test that async adapters stream through an awaitable on_text."""
+        output_file = tmp_path / "response.txt"
+        seen = []
+
+        async def generation_func(prompt, model, history, system_instruction, **kwargs):
+            for chunk in ["Once ", "upon ", "a time"]:
+                await kwargs["on_text"](chunk)
+                seen.append(output_file.read_text())
+            return {"text": "Once upon a time", "input_tokens": 10, "output_tokens": 5}
+
+        result = anyio.run(
+            lambda: process_llm_request_async(
+                prompt="Hello",
+                output_file=str(output_file),
+                agent_name=False,
+                model="gpt-4o",
+                provider="openai",
+                generation_func=generation_func,
+                mcp_instance=Mock(),
+                stream=True,
+            )
+        )
+
+        assert seen == ["Once ", "Once upon ", "Once upon a time"]
+        assert output_file.read_text() == result.content
+
+    def test_tool_applies_defaults_and_model_alias(self):
+        """Test that the async tool fills in ask's defaults and resolves the model."""
+
+        def ask(
+            prompt=None, output_file="-", agent_name=False, model="m", temperature=0.7
+        ):
+            raise AssertionError("the async tool must not call ask")
+
+        calls = []
+        ask_async = async_ask_tool(
+            ask,
+            "openai",
+            self._slow_generation_func(0, calls),
+            Mock(),
+            resolve_model={"alias": "gpt-4o"}.get,
+        )
+
+        result = anyio.run(lambda: ask_async("Hello", model="alias"))
+
+        assert result.content == "Re: Hello"
+        assert calls[0]["model"] == "gpt-4o"
+        assert calls[0]["temperature"] == 0.7
+        assert inspect.signature(ask_async) == inspect.signature(ask)
+
+    @pytest.mark.parametrize("provider", ["openai", "claude", "gemini", "grok"])
+    def test_ask_tools_registered_async(self, provider):
+        """Test that each server registers ask as an async tool with ask's parameters."""
+        module = importlib.import_module(f"mcp_handley_lab.llm.{provider}.tool")
+        tool = module.mcp._tool_manager.get_tool("ask")
+
+        assert tool.is_async
+        assert tool.description == module.ASK_DESCRIPTION
+        assert list(tool.parameters["properties"]) == list(
+            inspect.signature(module.ask).parameters
+        )
+
+
+class TestBatchRequests:
+    """Test process_llm_batch_async and the ask_batch tools."""
+
+    @staticmethod
+    def _generation_func(delay=0, fail_on=None, calls=None):
+        async def generation_func(prompt, model, history, system_instruction, **kwargs):
+            if calls is not None:
+                calls.append({"prompt": prompt, "model": model, **kwargs})
+            await anyio.sleep(delay)
+            if prompt == fail_on:
+                raise ValueError("OpenAI API error: overloaded")
+            return {"text": f"Re: {prompt}", "input_tokens": 10, "output_tokens": 5}
+
+        return generation_func
+
+    @staticmethod
+    async def _batch(generation_func, output_dir, concurrency=8, **kwargs):
+        kwargs.setdefault("prompts", [])
+        kwargs.setdefault("prompt_files", [])
+        return await process_llm_batch_async(
+            output_dir=str(output_dir),
+            concurrency=concurrency,
+            model="gpt-4o",
+            provider="openai",
+            generation_func=generation_func,
+            mcp_instance=Mock(),
+            **kwargs,
+        )
+
+    def test_each_item_written_to_own_file(self, tmp_path):
+        """Test that prompts then prompt files are numbered and written in order."""
+        prompt_file = tmp_path / "paper.txt"
+        prompt_file.write_text("Screen ${title}")
+        calls = []
+
+        result = anyio.run(
+            lambda: self._batch(
+                self._generation_func(calls=calls),
+                tmp_path / "out",
+                prompts=["Q0", "Q1"],
+                prompt_files=[str(prompt_file)],
+                prompt_vars={"title": "Paper A"},
+                temperature=0.5,
+            )
+        )
+
+        assert [item.index for item in result.items] == [0, 1, 2]
+        assert result.items[2].prompt_file == str(prompt_file)
+        assert (tmp_path / "out" / "0000.txt").read_text() == "Re: Q0"
+        assert (tmp_path / "out" / "0002.txt").read_text() == "Re: Screen Paper A"
+        assert result.items[1].output_file == str(tmp_path / "out" / "0001.txt")
+        assert all(call["temperature"] == 0.5 for call in calls)
+
+    def test_aggregate_usage(self, tmp_path):
+        """Test that totals sum the usage of every item."""
+        result = anyio.run(
+            lambda: self._batch(
+                self._generation_func(), tmp_path, prompts=["A", "B", "C"]
+            )
+        )
+
+        assert result.succeeded == 3
+        assert result.failed == 0
+        assert result.total_input_tokens == 30
+        assert result.total_output_tokens == 15
+        assert result.total_cost == pytest.approx(
+            sum(item.usage.cost for item in result.items)
+        )
+        assert result.total_cost > 0
+
+    def test_failed_item_does_not_cancel_batch(self, tmp_path):
+        """Test that an item's error is recorded while the others complete."""
+        result = anyio.run(
+            lambda: self._batch(
+                self._generation_func(fail_on="B"), tmp_path, prompts=["A", "B", "C"]
+            )
+        )
+
+        assert result.succeeded == 2
+        assert result.failed == 1
+        assert "overloaded" in result.items[1].error
+        assert result.items[1].usage is None
+        assert result.items[1].output_file == ""
+        assert result.items[2].usage.input_tokens == 10
+
+    def test_concurrency_bounded(self, tmp_path):
+        """Test that at most concurrency requests are in flight at once."""
+        in_flight = 0
+        peak = 0
+
+        async def generation_func(prompt, model, history, system_instruction, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await anyio.sleep(0.05)
+            in_flight -= 1
+            return {"text": "ok", "input_tokens": 1, "output_tokens": 1}
+
+        result = anyio.run(
+            lambda: self._batch(
+                generation_func,
+                tmp_path,
+                concurrency=3,
+                prompts=[f"Q{i}" for i in range(10)],
+            )
+        )
+
+        assert result.succeeded == 10
+        assert peak == 3
+
+    def test_requests_overlap(self, tmp_path):
+        """Test that the batch takes about one provider latency, not the sum."""
+        result = anyio.run(
+            lambda: self._batch(
+                self._generation_func(delay=0.3),
+                tmp_path,
+                prompts=[f"Q{i}" for i in range(5)],
+            )
+        )
+
+        assert result.wall_time_ms < 1000
+
+    def test_items_use_no_memory(self, tmp_path):
+        """Test that batch items neither read nor write agent memory."""
+        with patch("mcp_handley_lab.llm.shared.handle_agent_memory") as mock_memory:
+            result = anyio.run(
+                lambda: self._batch(self._generation_func(), tmp_path, prompts=["A"])
+            )
+
+        assert result.succeeded == 1
+        mock_memory.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "kwargs, message",
+        [
+            ({}, "at least one prompt"),
+            ({"prompts": ["A"], "concurrency": 0}, "concurrency must be at least 1"),
+        ],
+    )
+    def test_invalid_batch_raises(self, tmp_path, kwargs, message):
+        """Test that an empty batch or non-positive concurrency is rejected."""
+        with pytest.raises(ValueError, match=message):
+            anyio.run(lambda: self._batch(self._generation_func(), tmp_path, **kwargs))
+
+    def test_tool_replaces_per_item_parameters(self, tmp_path):
+        """Test that the batch tool shares ask's other parameters across items."""
+
+        def ask(
+            prompt=None,
+            prompt_file=None,
+            output_file="-",
+            agent_name="session",
+            model="m",
+            temperature=0.7,
+            stream=False,
+        ):
+            raise AssertionError("the batch tool must not call ask")
+
+        calls = []
+        ask_batch = async_ask_batch_tool(
+            ask,
+            "openai",
+            self._generation_func(calls=calls),
+            Mock(),
+            resolve_model={"alias": "gpt-4o"}.get,
+        )
+
+        result = anyio.run(
+            lambda: ask_batch(
+                prompts=["Hello"],
+                prompt_files=[],
+                output_dir=str(tmp_path),
+                concurrency=2,
+                model="alias",
+            )
+        )
+
+        assert result.items[0].usage.model_used == "gpt-4o"
+        assert calls[0]["model"] == "gpt-4o"
+        assert calls[0]["temperature"] == 0.7
+        assert list(inspect.signature(ask_batch).parameters) == [
+            "prompts",
+            "prompt_files",
+            "output_dir",
+            "concurrency",
+            "model",
+            "temperature",
+        ]
+
+    @pytest.mark.parametrize("provider", ["openai", "claude", "gemini", "grok"])
+    def test_ask_batch_tools_registered(self, provider):
+        """Test that each server registers an async ask_batch tool."""
+        module = importlib.import_module(f"mcp_handley_lab.llm.{provider}.tool")
+        tool = module.mcp._tool_manager.get_tool("ask_batch")
+
+        assert tool.is_async
+        assert tool.description == module.ASK_BATCH_DESCRIPTION
+        assert tool.parameters["required"] == ["output_dir"]
+        assert "prompt" not in tool.parameters["properties"]
+        assert "system_prompt" in tool.parameters["properties"]
@@ -1,13 +1,30 @@
 """Unit tests for memory management module."""
 
 import json
+import multiprocessing
+import shutil
 import tempfile
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
-
-from mcp_handley_lab.llm.memory import AgentMemory, MemoryManager, Message
+from click.testing import CliRunner
+
+from mcp_handley_lab.llm.memory import (
+    AgentMemory,
+    AgentSummary,
+    MemoryManager,
+    Message,
+    MessageSearchIndex,
+    MessageStore,
+    SQLiteMemoryManager,
+    create_memory_manager,
+    read_archive,
+    select_evictions,
+)
 
 
 class TestMessage:
@@ -173,6 +190,10 @@ class TestMemoryManager:
             manager = MemoryManager(temp_dir)
             assert manager.storage_dir == Path(temp_dir)
             assert manager.agents_dir == Path(temp_dir) / "agents"
+            # Nothing is written until the manager is first used
+            assert not manager.agents_dir.exists()
+            assert not (manager.storage_dir / "search.db").exists()
+            manager.list_agents()
             assert manager.agents_dir.exists()
 
     def test_create_agent(self):
@@ -228,13 +249,12 @@ class TestMemoryManager:
 
             assert len(manager.list_agents()) == 0
 
-            agent1 = manager.create_agent("agent1")
-            agent2 = manager.create_agent("agent2")
+            manager.create_agent("agent1")
+            manager.create_agent("agent2")
 
             agents = manager.list_agents()
             assert len(agents) == 2
-            assert agent1 in agents
-            assert agent2 in agents
+            assert {agent.name for agent in agents} == {"agent1", "agent2"}
 
     def test_delete_agent_exists(self):
         """Test deleting existing agent."""
@@ -355,16 +375,957 @@ class TestMemoryManager:
             with pytest.raises(
                 (ValueError, json.JSONDecodeError)
             ):  # ValidationError from Pydantic
-                MemoryManager(temp_dir)
+                MemoryManager(temp_dir).list_agents()
 
     def test_load_agents_no_agents_dir(self):
         """Test loading agents when agents directory doesn't exist."""
         with tempfile.TemporaryDirectory() as temp_dir:
             # Don't create agents directory
             manager = MemoryManager(temp_dir)
-            # Should create the directory during init, but then delete it to test the early return
-            manager.agents_dir.rmdir()
 
             # This should trigger the early return in _load_agents
             manager._load_agents()
             assert len(manager.list_agents()) == 0
+
+
+class TestMemoryJournal:
+    """Test append-only journal storage in MemoryManager."""
+
+    def test_add_message_appends_to_journal(self, tmp_path):
+        """Test that adding a message appends to the journal, not the snapshot."""
+        manager = MemoryManager(str(tmp_path))
+        manager.create_agent("journaled")
+        snapshot = (manager.agents_dir / "journaled.json").read_text()
+
+        manager.add_message("journaled", "user", "Hello", tokens=5, cost=0.001)
+        manager.add_message("journaled", "assistant", "Hi", tokens=3, cost=0.002)
+
+        assert (manager.agents_dir / "journaled.json").read_text() == snapshot
+        lines = (manager.agents_dir / "journaled.jsonl").read_text().splitlines()
+        assert [json.loads(line)["seq"] for line in lines] == [0, 1]
+
+    def test_journal_replayed_on_load(self, tmp_path):
+        """Test that journaled messages and totals survive a restart."""
+        manager1 = MemoryManager(str(tmp_path))
+        manager1.create_agent("journaled")
+        manager1.add_message("journaled", "user", "Hello", tokens=5, cost=0.001)
+        manager1.add_message("journaled", "assistant", "Hi", tokens=3, cost=0.002)
+
+        agent = MemoryManager(str(tmp_path)).get_agent("journaled")
+
+        assert [m.content for m in agent.messages] == ["Hello", "Hi"]
+        assert agent.total_tokens == 8
+        assert agent.total_cost == pytest.approx(0.003)
+
+    def test_journal_compacted_into_snapshot(self, tmp_path):
+        """Test that the journal is folded into the snapshot periodically."""
+        manager = MemoryManager(str(tmp_path), compact_every=3)
+        manager.create_agent("compacted")
+        for i in range(4):
+            manager.add_message("compacted", "user", f"msg {i}")
+
+        snapshot = json.loads((manager.agents_dir / "compacted.json").read_text())
+        assert len(snapshot["messages"]) == 3
+        journal = (manager.agents_dir / "compacted.jsonl").read_text().splitlines()
+        assert len(journal) == 1
+
+        reloaded = MemoryManager(str(tmp_path)).get_agent("compacted")
+        assert [m.content for m in reloaded.messages] == [f"msg {i}" for i in range(4)]
+
+    def test_stale_journal_entries_skipped(self, tmp_path):
+        """Test that entries already in the snapshot are not replayed twice."""
+        manager = MemoryManager(str(tmp_path))
+        manager.create_agent("stale")
+        manager.add_message("stale", "user", "Hello")
+        journal = (manager.agents_dir / "stale.jsonl").read_text()
+
+        # Simulate a crash between writing the snapshot and removing the journal
+        manager._save_agent(manager.get_agent("stale"))
+        (manager.agents_dir / "stale.jsonl").write_text(journal)
+
+        reloaded = MemoryManager(str(tmp_path)).get_agent("stale")
+        assert [m.content for m in reloaded.messages] == ["Hello"]
+
+    def test_torn_journal_line_ignored(self, tmp_path):
+        """Test that an incomplete trailing journal line is ignored."""
+        manager = MemoryManager(str(tmp_path))
+        manager.create_agent("torn")
+        manager.add_message("torn", "user", "Hello")
+        with open(manager.agents_dir / "torn.jsonl", "a") as f:
+            f.write('{"seq": 1, "mess')
+
+        reloaded = MemoryManager(str(tmp_path)).get_agent("torn")
+        assert [m.content for m in reloaded.messages] == ["Hello"]
+
+    def test_clear_and_delete_remove_journal(self, tmp_path):
+        """Test that clearing and deleting an agent discard its journal."""
+        manager = MemoryManager(str(tmp_path))
+        manager.create_agent("cleared")
+        manager.add_message("cleared", "user", "Hello")
+        journal_file = manager.agents_dir / "cleared.jsonl"
+        assert journal_file.exists()
+
+        manager.clear_agent_history("cleared")
+        assert not journal_file.exists()
+        assert MemoryManager(str(tmp_path)).get_agent("cleared").messages == []
+
+        manager.add_message("cleared", "user", "Again")
+        manager.delete_agent("cleared")
+        assert not journal_file.exists()
+
+
+class TestMemoryManifest:
+    """Test lazy, manifest-backed agent loading."""
+
+    def test_startup_does_not_load_histories(self, tmp_path):
+        """Test that a new manager loads no agent histories up front."""
+        manager1 = MemoryManager(str(tmp_path))
+        manager1.create_agent("lazy", "prompt")
+        manager1.add_message("lazy", "user", "Hello", tokens=5, cost=0.001)
+
+        manager2 = MemoryManager(str(tmp_path))
+
+        assert manager2._agents == {}
+        assert manager2.get_agent("lazy").messages[0].content == "Hello"
+        assert "lazy" in manager2._agents
+
+    def test_list_agents_returns_summaries(self, tmp_path):
+        """Test that list_agents reports stats from the manifest."""
+        manager1 = MemoryManager(str(tmp_path))
+        manager1.create_agent("summarised", "prompt")
+        manager1.add_message("summarised", "user", "Hello", tokens=5, cost=0.001)
+        manager1.add_message("summarised", "assistant", "Hi", tokens=3, cost=0.002)
+
+        manager2 = MemoryManager(str(tmp_path))
+        [summary] = manager2.list_agents()
+
+        assert isinstance(summary, AgentSummary)
+        assert summary.get_stats() == manager1.get_agent("summarised").get_stats()
+        assert manager2.get_stats("summarised")["message_count"] == 2
+        assert manager2._agents == {}
+
+    def test_get_stats_unknown_agent(self, tmp_path):
+        """Test that get_stats raises for an unknown agent."""
+        manager = MemoryManager(str(tmp_path))
+
+        with pytest.raises(ValueError, match="Agent 'missing' not found"):
+            manager.get_stats("missing")
+
+    def test_manifest_tracks_clear_and_delete(self, tmp_path):
+        """Test that the manifest follows clear and delete operations."""
+        manager = MemoryManager(str(tmp_path))
+        manager.create_agent("tracked")
+        manager.add_message("tracked", "user", "Hello", tokens=5)
+
+        manager.clear_agent_history("tracked")
+        assert manager.get_stats("tracked")["message_count"] == 0
+
+        manager.delete_agent("tracked")
+        assert manager.list_agents() == []
+
+    def test_manifest_built_from_legacy_snapshots(self, tmp_path):
+        """Test that a missing manifest is rebuilt from existing agent files."""
+        agent = AgentMemory(name="legacy", created_at=datetime.now())
+        agent.add_message("user", "Hello", tokens=5)
+        agents_dir = tmp_path / "agents"
+        agents_dir.mkdir()
+        (agents_dir / "legacy.json").write_text(agent.model_dump_json())
+
+        manager = MemoryManager(str(tmp_path))
+
+        assert manager.get_stats("legacy")["total_tokens"] == 5
+        assert manager.index_file.exists()
+
+    def test_index_rebuild_skips_missing_agent_files(self, tmp_path):
+        """Test that a manifest entry without a snapshot doesn't stop opening."""
+        manager = MemoryManager(str(tmp_path))
+        for name in ("kept", "lost"):
+            manager.create_agent(name)
+            manager.add_message(name, "user", "hello there")
+        for path in tmp_path.glob("search.db*"):
+            path.unlink()
+        for path in (tmp_path / "agents").glob("lost.*"):
+            path.unlink()
+
+        reopened = MemoryManager(str(tmp_path))
+
+        assert [hit.agent_name for hit in reopened.search("hello")] == ["kept"]
+
+    def test_agents_created_by_other_manager_visible(self, tmp_path):
+        """Test that managers sharing a directory see each other's agents."""
+        manager1 = MemoryManager(str(tmp_path))
+        manager2 = MemoryManager(str(tmp_path))
+
+        manager1.create_agent("first")
+        manager2.create_agent("second")
+
+        assert {a.name for a in manager1.list_agents()} == {"first", "second"}
+        assert manager1.get_agent("second") is not None
+        with pytest.raises(ValueError, match="already exists"):
+            manager1.create_agent("second")
+
+
+class TestSQLiteMemoryManager:
+    """Test the SQLite memory backend."""
+
+    def test_wal_mode_enabled(self, tmp_path):
+        """Test that the database runs in WAL mode."""
+        manager = SQLiteMemoryManager(str(tmp_path))
+
+        assert manager.db_path == tmp_path / "memory.db"
+        assert manager._query("PRAGMA journal_mode")[0][0] == "wal"
+
+    def test_database_opened_on_first_use(self, tmp_path):
+        """Test that constructing the manager leaves nothing on disk."""
+        manager = SQLiteMemoryManager(str(tmp_path / "store"))
+        assert not (tmp_path / "store").exists()
+
+        assert manager.list_agents() == []
+        assert (tmp_path / "store" / "memory.db").exists()
+
+    def test_agent_lifecycle(self, tmp_path):
+        """Test creating, messaging, clearing and deleting an agent."""
+        manager = SQLiteMemoryManager(str(tmp_path))
+        manager.create_agent("sql_agent", "helpful")
+        manager.add_message("sql_agent", "user", "Hello", tokens=5, cost=0.001)
+        manager.add_message("sql_agent", "assistant", "Hi", tokens=3, cost=0.002)
+
+        agent = manager.get_agent("sql_agent")
+        assert agent.system_prompt == "helpful"
+        assert agent.get_history() == [
+            {"role": "user", "content": "Hello"},
+            {"role": "assistant", "content": "Hi"},
+        ]
+        stats = manager.get_stats("sql_agent")
+        assert stats["message_count"] == 2
+        assert stats["total_tokens"] == 8
+        assert stats["total_cost"] == pytest.approx(0.003)
+
+        manager.clear_agent_history("sql_agent")
+        assert manager.get_agent("sql_agent").messages == []
+        assert manager.get_stats("sql_agent")["total_tokens"] == 0
+
+        manager.delete_agent("sql_agent")
+        assert manager.get_agent("sql_agent") is None
+        assert manager.list_agents() == []
+
+    def test_get_response_by_index(self, tmp_path):
+        """Test indexed response lookup, including negative indices."""
+        manager = SQLiteMemoryManager(str(tmp_path))
+        manager.create_agent("indexed")
+        for content in ["first", "second", "third"]:
+            manager.add_message("indexed", "user", content)
+
+        assert manager.get_response("indexed") == "third"
+        assert manager.get_response("indexed", 0) == "first"
+        assert manager.get_response("indexed", -2) == "second"
+        with pytest.raises(IndexError):
+            manager.get_response("indexed", 3)
+        with pytest.raises(IndexError):
+            manager.get_response("indexed", -4)
+
+    def test_errors_match_json_backend(self, tmp_path):
+        """Test that missing and duplicate agents raise like MemoryManager."""
+        manager = SQLiteMemoryManager(str(tmp_path))
+        manager.create_agent("dup")
+
+        with pytest.raises(ValueError, match="Agent 'dup' already exists"):
+            manager.create_agent("dup")
+        with pytest.raises(
+            IndexError, match="Cannot get response: agent has no message history"
+        ):
+            manager.get_response("dup")
+        for method in (
+            manager.delete_agent,
+            manager.clear_agent_history,
+            manager.get_response,
+            manager.get_stats,
+        ):
+            with pytest.raises(ValueError, match="Agent 'missing' not found"):
+                method("missing")
+
+        # Adding to a missing agent is a no-op, as with MemoryManager
+        manager.add_message("missing", "user", "Hello")
+        assert manager.get_agent("missing") is None
+
+    def test_set_system_prompt(self, tmp_path):
+        """Test updating the system prompt in place."""
+        manager = SQLiteMemoryManager(str(tmp_path))
+        manager.create_agent("prompted", "old")
+
+        manager.set_system_prompt("prompted", "new")
+
+        assert manager.get_agent("prompted").system_prompt == "new"
+
+    def test_shared_between_managers(self, tmp_path):
+        """Test that two managers on one database see each other's writes."""
+        manager1 = SQLiteMemoryManager(str(tmp_path))
+        manager2 = SQLiteMemoryManager(str(tmp_path))
+
+        manager1.create_agent("shared")
+        manager2.add_message("shared", "user", "from two")
+        manager1.add_message("shared", "assistant", "from one")
+
+        assert [m.content for m in manager2.get_agent("shared").messages] == [
+            "from two",
+            "from one",
+        ]
+
+    def test_migrates_json_agents_on_first_open(self, tmp_path):
+        """Test the one-shot import of existing JSON agents."""
+        json_manager = MemoryManager(str(tmp_path))
+        json_manager.create_agent("legacy", "prompt")
+        json_manager.add_message("legacy", "user", "Hello", tokens=5, cost=0.001)
+
+        manager = SQLiteMemoryManager(str(tmp_path))
+
+        agent = manager.get_agent("legacy")
+        assert agent.system_prompt == "prompt"
+        assert [m.content for m in agent.messages] == ["Hello"]
+        assert manager.get_stats("legacy")["total_tokens"] == 5
+        assert manager.migrate_from_json() == 0
+
+    def test_migration_reads_json_store_directly(self, tmp_path):
+        """Test that importing forks leaves the JSON store's files alone."""
+        source = tmp_path / "source"
+        json_manager = MemoryManager(str(source))
+        json_manager.create_agent("parent")
+        json_manager.add_message("parent", "user", "shared")
+        json_manager.fork_agent("parent", "child")
+        json_manager.add_message("child", "user", "own")
+        (source / "search.db").unlink()
+        shutil.rmtree(source / "locks")
+
+        manager = SQLiteMemoryManager(str(source))
+
+        assert [m.content for m in manager.get_agent("child").messages] == [
+            "shared",
+            "own",
+        ]
+        assert not (source / "locks").exists()
+        assert not (source / "search.db").exists()
+
+    def test_create_memory_manager(self, tmp_path):
+        """Test backend selection."""
+        assert isinstance(create_memory_manager(str(tmp_path)), MemoryManager)
+        assert isinstance(
+            create_memory_manager(str(tmp_path), "sqlite"), SQLiteMemoryManager
+        )
+        with pytest.raises(ValueError, match="Unknown memory backend: 'redis'"):
+            create_memory_manager(str(tmp_path), "redis")
+
+
+@pytest.fixture(params=[MemoryManager, SQLiteMemoryManager], ids=["json", "sqlite"])
+def any_manager(request, tmp_path):
+    """A memory manager for each storage backend."""
+    return request.param(str(tmp_path))
+
+
+class TestMemoryCompaction:
+    """Test replacing old history with a summary on both backends."""
+
+    def test_compact_history_replaces_oldest(self, any_manager):
+        """Test that the oldest messages become one summary message."""
+        any_manager.create_agent("long")
+        for i in range(6):
+            role = "user" if i % 2 == 0 else "assistant"
+            any_manager.add_message("long", role, f"message {i}", tokens=10, cost=0.01)
+
+        archived = any_manager.compact_history(
+            "long", 4, "summary of 0-3", tokens=7, cost=0.001
+        )
+
+        assert archived == 4
+        agent = any_manager.get_agent("long")
+        assert [m.content for m in agent.messages] == [
+            "summary of 0-3",
+            "message 4",
+            "message 5",
+        ]
+        assert agent.messages[0].role == "user"
+        stats = any_manager.get_stats("long")
+        assert stats["message_count"] == 3
+        assert stats["total_tokens"] == 67
+        assert stats["total_cost"] == pytest.approx(0.061)
+        assert any_manager.get_response("long", 1) == "message 4"
+
+    def test_originals_archived(self, any_manager):
+        """Test that replaced messages are appended to the archive file."""
+        any_manager.create_agent("archived")
+        for i in range(4):
+            any_manager.add_message("archived", "user", f"message {i}")
+
+        any_manager.compact_history("archived", 2, "first summary")
+        any_manager.compact_history("archived", 2, "second summary")
+
+        archive = read_archive(any_manager.get_archive_file("archived"))
+        assert [m.content for m in archive] == [
+            "message 0",
+            "message 1",
+            "first summary",
+            "message 2",
+        ]
+
+        any_manager.delete_agent("archived")
+        assert not any_manager.get_archive_file("archived").exists()
+
+    def test_compact_history_errors(self, any_manager):
+        """Test compacting a missing agent and an empty history."""
+        with pytest.raises(ValueError, match="Agent 'missing' not found"):
+            any_manager.compact_history("missing", 2, "summary")
+
+        any_manager.create_agent("empty")
+        assert any_manager.compact_history("empty", 2, "summary") == 0
+        assert any_manager.get_agent("empty").messages == []
+
+
+class TestMessageSearch:
+    """Test full-text search across agent conversations on both backends."""
+
+    def test_search_returns_agent_index_and_snippet(self, any_manager):
+        """Test that hits identify the message and highlight the match."""
+        any_manager.create_agent("physics")
+        any_manager.create_agent("cooking")
+        any_manager.add_message("physics", "user", "What is dark energy?")
+        any_manager.add_message(
+            "physics", "assistant", "Dark energy drives cosmic acceleration."
+        )
+        any_manager.add_message("cooking", "user", "How long to boil an egg?")
+
+        hits = any_manager.search("acceleration")
+
+        assert len(hits) == 1
+        assert hits[0].agent_name == "physics"
+        assert hits[0].index == 1
+        assert hits[0].role == "assistant"
+        assert "[acceleration]" in hits[0].snippet
+        assert hits[0].score > 0
+
+    def test_search_ranks_and_filters(self, any_manager):
+        """Test relevance ordering, agent filtering and stemming."""
+        any_manager.create_agent("a")
+        any_manager.create_agent("b")
+        any_manager.add_message("a", "user", "galaxy " * 5)
+        any_manager.add_message("a", "user", "a galaxy among many other words here")
+        any_manager.add_message("b", "user", "galaxies everywhere")
+
+        hits = any_manager.search("galaxy")
+        assert (hits[0].agent_name, hits[0].index) == ("a", 0)
+        assert {(h.agent_name, h.index) for h in hits} == {("a", 0), ("a", 1), ("b", 0)}
+        assert hits[0].score > hits[-1].score
+        assert [h.agent_name for h in any_manager.search("galaxy", "b")] == ["b"]
+        assert len(any_manager.search("galaxy", limit=1)) == 1
+
+    def test_search_treats_operators_literally(self, any_manager):
+        """Test that FTS syntax in the query cannot raise or change meaning."""
+        any_manager.create_agent("syntax")
+        any_manager.add_message("syntax", "user", 'quote " and NOT or (parens)')
+
+        assert len(any_manager.search('"NOT (parens')) == 1
+        with pytest.raises(ValueError, match="Search query cannot be empty"):
+            any_manager.search("   ")
+
+    def test_index_follows_clear_delete_and_compaction(self, any_manager):
+        """Test that the index is updated in place by every history change."""
+        any_manager.create_agent("tracked")
+        for i in range(4):
+            any_manager.add_message("tracked", "user", f"entry{i} nebula")
+
+        any_manager.compact_history("tracked", 2, "summary of nebula entries")
+        hits = {h.index: h.snippet for h in any_manager.search("nebula")}
+        assert sorted(hits) == [0, 1, 2]
+        assert "summary" in hits[0]
+        assert "entry2" in hits[1]
+        assert any_manager.search("entry0") == []
+
+        any_manager.clear_agent_history("tracked")
+        assert any_manager.search("nebula") == []
+
+        any_manager.add_message("tracked", "user", "nebula again")
+        any_manager.delete_agent("tracked")
+        assert any_manager.search("nebula") == []
+
+    def test_index_built_for_existing_agents(self, tmp_path):
+        """Test the one-time build when the index does not exist yet."""
+        manager = MemoryManager(str(tmp_path))
+        manager.create_agent("old")
+        manager.add_message("old", "user", "pulsar timing")
+        (tmp_path / "search.db").unlink()
+
+        assert [
+            h.agent_name for h in MemoryManager(str(tmp_path)).search("pulsar")
+        ] == ["old"]
+
+    def test_search_scales_to_large_index(self, tmp_path):
+        """Test that a search over many messages does not scan them."""
+        index = MessageSearchIndex(tmp_path / "search.db")
+        for agent in range(20):
+            index.add(
+                f"agent{agent}",
+                [(i, "user", f"routine message number {i}") for i in range(5000)],
+            )
+        index.add("needle", [(0, "user", "the quasar observation")])
+
+        start = time.perf_counter()
+        hits = index.search("quasar")
+        elapsed = time.perf_counter() - start
+
+        assert [h.agent_name for h in hits] == ["needle"]
+        assert elapsed < 0.05
+
+
+class TestMessageStore:
+    """Test the column-wise message store behind AgentMemory.messages."""
+
+    @staticmethod
+    def _messages() -> list[Message]:
+        return [
+            Message(
+                role="user",
+                content="Hello",
+                timestamp=datetime(2025, 1, 1, 12, 0, 0, 123456),
+                tokens=5,
+                cost=0.001,
+            ),
+            Message(
+                role="tool",
+                content="Result",
+                timestamp=datetime(2025, 1, 1, 12, 0, 1),
+            ),
+        ]
+
+    def test_behaves_like_a_message_list(self):
+        """Test indexing, slicing, iteration and equality."""
+        messages = self._messages()
+        store = MessageStore(messages)
+
+        assert len(store) == 2
+        assert store[0] == messages[0]
+        assert store[-1] == messages[1]
+        assert store[1:] == messages[1:]
+        assert list(store) == messages
+        assert store == messages
+        assert MessageStore() == []
+        with pytest.raises(IndexError):
+            store[2]
+
+    def test_optional_fields_round_trip(self):
+        """Test that missing tokens and cost stay None."""
+        store = MessageStore(self._messages())
+
+        assert store[1].tokens is None
+        assert store[1].cost is None
+        assert store[0].timestamp == datetime(2025, 1, 1, 12, 0, 0, 123456)
+
+    def test_serialises_like_a_list_of_messages(self):
+        """Test that snapshots keep the same JSON layout."""
+        messages = self._messages()
+        agent = AgentMemory(
+            name="columns", created_at=datetime(2025, 1, 1), messages=messages
+        )
+
+        dumped = json.loads(agent.model_dump_json())["messages"]
+        assert dumped == [m.model_dump(mode="json") for m in messages]
+        assert AgentMemory.model_validate_json(agent.model_dump_json()) == agent
+
+    def test_history_and_content_read_columns(self):
+        """Test the model-free accessors."""
+        store = MessageStore(self._messages())
+
+        assert store.history() == [
+            {"role": "user", "content": "Hello"},
+            {"role": "tool", "content": "Result"},
+        ]
+        assert store.content(-1) == "Result"
+
+    def test_replace_oldest(self):
+        """Test replacing a prefix with a single message."""
+        messages = self._messages()
+        store = MessageStore(messages * 2)
+        summary = Message(role="user", content="Summary", timestamp=datetime.now())
+
+        replaced = store.replace_oldest(3, summary)
+
+        assert replaced == (messages * 2)[:3]
+        assert store == [summary, messages[1]]
+
+
+def _store_idle_agent(manager: MemoryManager, name: str, days_idle: int, size: int = 1):
+    """Save an agent whose only message is days_idle days old."""
+    last_used = datetime.now() - timedelta(days=days_idle)
+    manager._save_agent(
+        AgentMemory(
+            name=name,
+            created_at=last_used,
+            messages=[Message(role="user", content="x" * size, timestamp=last_used)],
+        )
+    )
+
+
+class TestRetentionPolicy:
+    """Test eviction, compression and the maintenance entry point."""
+
+    def test_select_evictions(self):
+        """Test age, count and size limits, least recently used first."""
+        now = datetime(2025, 6, 1)
+        agents = [
+            ("fresh", now - timedelta(days=1), 100),
+            ("idle", now - timedelta(days=10), 300),
+            ("stale", now - timedelta(days=40), 50),
+            ("recent", now - timedelta(hours=1), 200),
+        ]
+
+        assert select_evictions(agents, now) == []
+        assert select_evictions(agents, now, max_age_days=30) == ["stale"]
+        assert select_evictions(agents, now, max_agents=2) == ["stale", "idle"]
+        assert select_evictions(agents, now, max_bytes=350) == ["stale", "idle"]
+        assert select_evictions(agents, now, max_bytes=600) == ["stale"]
+        assert select_evictions(agents, now, max_age_days=30, max_agents=3) == ["stale"]
+
+    def test_apply_retention_evicts_lru(self, tmp_path):
+        """Test that the least recently used agents are deleted."""
+        manager = MemoryManager(str(tmp_path))
+        for name, days in [("old", 90), ("middle", 20), ("new", 1)]:
+            _store_idle_agent(manager, name, days)
+
+        report = manager.apply_retention(max_age_days=60, max_agents=1)
+
+        assert report.evicted == ["old", "middle"]
+        assert [a.name for a in manager.list_agents()] == ["new"]
+        assert not (tmp_path / "agents" / "old.json").exists()
+        assert report.bytes_reclaimed > 0
+
+    def test_idle_agents_compressed_and_restored(self, tmp_path):
+        """Test transparent decompression of compressed agents on access."""
+        manager = MemoryManager(str(tmp_path))
+        _store_idle_agent(manager, "sleepy", 30, size=5000)
+        _store_idle_agent(manager, "busy", 0)
+        before = (tmp_path / "agents" / "sleepy.json").stat().st_size
+
+        report = manager.apply_retention(compress_after_days=7)
+
+        assert report.compressed == ["sleepy"]
+        compressed_file = tmp_path / "agents" / "sleepy.json.gz"
+        assert compressed_file.exists()
+        assert not (tmp_path / "agents" / "sleepy.json").exists()
+        assert report.bytes_reclaimed == before - compressed_file.stat().st_size
+        assert manager.get_stats("sleepy")["message_count"] == 1
+
+        # A fresh manager reads it back and decompresses it for further writes
+        reopened = MemoryManager(str(tmp_path))
+        reopened.add_message("sleepy", "assistant", "awake")
+        assert [m.content for m in reopened.get_agent("sleepy").messages] == [
+            "x" * 5000,
+            "awake",
+        ]
+        assert not compressed_file.exists()
+        assert MemoryManager(str(tmp_path)).get_response("sleepy") == "awake"
+
+    def test_compressed_agents_can_be_deleted_not_recreated(self, tmp_path):
+        """Test that compressed agents still count as existing."""
+        manager = MemoryManager(str(tmp_path))
+        _store_idle_agent(manager, "packed", 30)
+        manager.apply_retention(compress_after_days=7)
+
+        with pytest.raises(ValueError, match="already exists"):
+            manager.create_agent("packed")
+        manager.delete_agent("packed")
+        assert not (tmp_path / "agents" / "packed.json.gz").exists()
+
+    def test_sqlite_retention_vacuums(self, tmp_path):
+        """Test eviction on the SQLite backend."""
+        json_manager = MemoryManager(str(tmp_path))
+        _store_idle_agent(json_manager, "ancient", 400, size=200_000)
+        _store_idle_agent(json_manager, "current", 0)
+        manager = SQLiteMemoryManager(str(tmp_path))
+
+        report = manager.apply_retention(max_age_days=365)
+
+        assert report.evicted == ["ancient"]
+        assert manager.get_agent("ancient") is None
+        assert manager.get_agent("current") is not None
+        assert report.bytes_reclaimed > 100_000
+
+    def test_maintenance_command(self, tmp_path):
+        """Test the command-line entry point report."""
+        from mcp_handley_lab.llm import memory_maintenance
+
+        manager = MemoryManager(str(tmp_path))
+        _store_idle_agent(manager, "_session_1234", 30)
+
+        with patch.object(memory_maintenance, "memory_manager", manager):
+            result = CliRunner().invoke(
+                memory_maintenance.main, ["--max-age-days", "7"]
+            )
+
+        assert result.exit_code == 0
+        assert "Evicted 1 agent(s)" in result.output
+        assert "_session_1234" in result.output
+        assert "Reclaimed" in result.output
+
+
+def _append_from_process(storage_dir: str, worker: int, turns: int):
+    """Append user/assistant turns to a shared agent from a separate process."""
+    manager = MemoryManager(storage_dir, compact_every=16)
+    for turn in range(turns):
+        with manager.batch("shared"):
+            manager.add_message("shared", "user", f"p{worker}-{turn}")
+            manager.add_message("shared", "assistant", f"p{worker}-{turn}")
+
+
+class TestMemoryConcurrency:
+    """Test locking across threads, processes and manager instances."""
+
+    def test_threads_appending_to_one_agent(self, tmp_path):
+        """Test that concurrent threads lose no messages."""
+        manager = MemoryManager(str(tmp_path), compact_every=32)
+        manager.create_agent("busy")
+
+        def append(worker: int):
+            for i in range(50):
+                manager.add_message("busy", "user", f"t{worker}-{i}", tokens=1)
+
+        threads = [threading.Thread(target=append, args=(w,)) for w in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        expected = {f"t{w}-{i}" for w in range(8) for i in range(50)}
+        for reader in (manager, MemoryManager(str(tmp_path))):
+            contents = [m.content for m in reader.get_agent("busy").messages]
+            assert len(contents) == 400
+            assert set(contents) == expected
+        assert manager.get_stats("busy")["total_tokens"] == 400
+
+    def test_processes_appending_to_one_agent(self, tmp_path):
+        """Test that processes sharing the directory serialise their writes."""
+        MemoryManager(str(tmp_path)).create_agent("shared")
+
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=_append_from_process, args=(str(tmp_path), w, 20))
+            for w in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=120)
+            assert process.exitcode == 0
+
+        manager = MemoryManager(str(tmp_path))
+        messages = manager.get_agent("shared").messages
+        assert len(messages) == 160
+        # Batched turns stay contiguous: each user message is followed by its reply
+        for user, assistant in zip(messages[::2], messages[1::2], strict=True):
+            assert (user.role, assistant.role) == ("user", "assistant")
+            assert user.content == assistant.content
+        assert manager.get_stats("shared")["message_count"] == 160
+        assert len(manager.search("p3")) == 10
+
+    def test_cached_agent_sees_other_writers(self, tmp_path):
+        """Test that a cached agent picks up appends and snapshots from elsewhere."""
+        first = MemoryManager(str(tmp_path), compact_every=3)
+        second = MemoryManager(str(tmp_path), compact_every=3)
+        first.create_agent("synced")
+        first.add_message("synced", "user", "one")
+
+        second.add_message("synced", "assistant", "two")
+        assert first.get_response("synced") == "two"
+
+        # Enough messages for the second manager to fold the journal into a snapshot
+        second.add_message("synced", "user", "three")
+        second.add_message("synced", "assistant", "four")
+        first.add_message("synced", "user", "five")
+
+        expected = ["one", "two", "three", "four", "five"]
+        for manager in (first, second):
+            assert [m.content for m in manager.get_agent("synced").messages] == expected
+
+    def test_batch_flushes_once(self, tmp_path):
+        """Test that messages added in a batch are written together on exit."""
+        manager = MemoryManager(str(tmp_path))
+        manager.create_agent("grouped")
+        journal = tmp_path / "agents" / "grouped.jsonl"
+
+        with manager.batch("grouped"):
+            manager.add_message("grouped", "user", "question")
+            manager.add_message("grouped", "assistant", "answer")
+            assert not journal.exists()
+            assert manager.get_agent("grouped").get_response() == "answer"
+
+        assert len(journal.read_text().splitlines()) == 2
+        assert manager.get_stats("grouped")["message_count"] == 2
+        assert [h.index for h in manager.search("answer")] == [1]
+
+    def test_torn_journal_line_overwritten(self, tmp_path):
+        """Test that the next append discards a torn line instead of corrupting."""
+        manager = MemoryManager(str(tmp_path))
+        manager.create_agent("torn")
+        manager.add_message("torn", "user", "kept")
+        with open(tmp_path / "agents" / "torn.jsonl", "a") as f:
+            f.write('{"seq": 1, "message": {"ro')
+
+        manager.add_message("torn", "assistant", "appended")
+
+        reopened = MemoryManager(str(tmp_path))
+        assert [m.content for m in reopened.get_agent("torn").messages] == [
+            "kept",
+            "appended",
+        ]
+
+
+def _conversation(manager, name: str, turns: int):
+    """Create an agent holding turns user/assistant exchanges."""
+    manager.create_agent(name, "Be brief.")
+    for i in range(turns):
+        manager.add_message(name, "user", f"question {i}")
+        manager.add_message(name, "assistant", f"answer {i}")
+
+
+class TestAgentFork:
+    """Test branching one conversation into several agents."""
+
+    def test_fork_continues_from_prefix(self, any_manager):
+        """Test that a fork sees the prefix and its own messages, not later ones."""
+        _conversation(any_manager, "trunk", 3)
+        any_manager.fork_agent("trunk", "branch", 4)
+        any_manager.add_message("branch", "user", "branch question")
+        any_manager.add_message("trunk", "user", "trunk question")
+
+        branch = any_manager.get_agent("branch")
+        assert branch.system_prompt == "Be brief."
+        assert [m["content"] for m in branch.get_history()] == [
+            "question 0",
+            "answer 0",
+            "question 1",
+            "answer 1",
+            "branch question",
+        ]
+        assert any_manager.get_response("branch", 1) == "answer 0"
+        assert any_manager.get_response("branch") == "branch question"
+        assert any_manager.get_stats("branch")["message_count"] == 5
+        assert any_manager.get_agent("trunk").get_history()[-1]["content"] == (
+            "trunk question"
+        )
+
+    def test_fork_defaults_to_whole_history(self, any_manager):
+        """Test forking without a length and rejecting bad arguments."""
+        _conversation(any_manager, "trunk", 2)
+        assert any_manager.fork_agent("trunk", "branch").get_history() == (
+            any_manager.get_agent("trunk").get_history()
+        )
+
+        with pytest.raises(ValueError, match="Agent 'missing' not found"):
+            any_manager.fork_agent("missing", "other")
+        with pytest.raises(ValueError, match="already exists"):
+            any_manager.fork_agent("trunk", "branch")
+        with pytest.raises(ValueError, match="it has 4 messages"):
+            any_manager.fork_agent("trunk", "too_far", 5)
+
+    def test_fork_messages_are_searchable(self, any_manager):
+        """Test that a fork's own messages are indexed at their full position."""
+        _conversation(any_manager, "trunk", 2)
+        any_manager.fork_agent("trunk", "branch")
+        any_manager.add_message("branch", "user", "zeppelin")
+
+        [hit] = any_manager.search("zeppelin")
+        assert (hit.agent_name, hit.index) == ("branch", 4)
+
+    def test_fork_stores_only_new_messages(self, tmp_path):
+        """Test that a fork's snapshot references the parent instead of copying it."""
+        manager = MemoryManager(str(tmp_path))
+        _conversation(manager, "trunk", 50)
+        for i in range(3):
+            manager.fork_agent("trunk", f"branch{i}")
+            manager.add_message(f"branch{i}", "user", f"branch {i}")
+
+        stored = json.loads(
+            (tmp_path / "agents" / "branch0.json").read_text(encoding="utf-8")
+        )
+        assert stored["parent"] == "trunk"
+        assert stored["parent_length"] == 100
+        assert stored["messages"] == []
+
+        reloaded = MemoryManager(str(tmp_path))
+        branch = reloaded.get_agent("branch2")
+        assert len(branch.messages) == 1
+        assert branch.history_length == 101
+        assert branch.get_history()[99]["content"] == "answer 49"
+        assert branch._parent is reloaded.get_agent("trunk")
+        assert reloaded.list_agents()[1].parent == "trunk"
+
+    def test_fork_of_fork(self, tmp_path):
+        """Test that prefixes resolve through several generations."""
+        manager = MemoryManager(str(tmp_path))
+        _conversation(manager, "trunk", 2)
+        manager.fork_agent("trunk", "branch", 2)
+        manager.add_message("branch", "user", "branch question")
+        manager.fork_agent("branch", "twig")
+        manager.add_message("twig", "assistant", "twig answer")
+
+        twig = MemoryManager(str(tmp_path)).get_agent("twig")
+        assert [m["content"] for m in twig.get_history()] == [
+            "question 0",
+            "answer 0",
+            "branch question",
+            "twig answer",
+        ]
+        assert twig.get_response(0) == "question 0"
+
+    @pytest.mark.parametrize(
+        "rewrite",
+        [
+            lambda m: m.delete_agent("trunk"),
+            lambda m: m.clear_agent_history("trunk"),
+            lambda m: m.compact_history("trunk", 3, "summary"),
+        ],
+        ids=["delete", "clear", "compact"],
+    )
+    def test_rewriting_parent_detaches_forks(self, tmp_path, rewrite):
+        """Test that forks keep their history when the parent's changes."""
+        manager = MemoryManager(str(tmp_path))
+        _conversation(manager, "trunk", 2)
+        manager.fork_agent("trunk", "branch", 3)
+        manager.add_message("branch", "assistant", "branch answer")
+        expected = manager.get_agent("branch").get_history()
+
+        rewrite(manager)
+
+        for reader in (manager, MemoryManager(str(tmp_path))):
+            branch = reader.get_agent("branch")
+            assert branch.parent is None
+            assert branch.get_history() == expected
+        assert [hit.index for hit in manager.search("question", "branch")] == [0, 2]
+
+    def test_compacting_fork_detaches_it(self, tmp_path):
+        """Test that compacting a fork leaves its parent untouched."""
+        manager = MemoryManager(str(tmp_path))
+        _conversation(manager, "trunk", 2)
+        manager.fork_agent("trunk", "branch")
+        manager.add_message("branch", "user", "branch question")
+
+        assert manager.compact_history("branch", 3, "summary") == 3
+
+        branch = manager.get_agent("branch")
+        assert branch.parent is None
+        assert [m.content for m in branch.messages] == [
+            "summary",
+            "answer 1",
+            "branch question",
+        ]
+        assert len(manager.get_agent("trunk").messages) == 4
+
+    def test_sqlite_migration_copies_inherited_messages(self, tmp_path):
+        """Test that forks become standalone agents when moved to SQLite."""
+        json_manager = MemoryManager(str(tmp_path))
+        _conversation(json_manager, "trunk", 2)
+        json_manager.fork_agent("trunk", "branch", 2)
+        json_manager.add_message("branch", "user", "branch question")
+
+        branch = SQLiteMemoryManager(str(tmp_path)).get_agent("branch")
+        assert [m.content for m in branch.messages] == [
+            "question 0",
+            "answer 0",
+            "branch question",
+        ]
@@ -1,14 +1,18 @@
 """Unit tests for model_loader module."""
 
+import json
 from unittest.mock import mock_open, patch
 
 import pytest
 import yaml
 
+from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm import model_loader
 from mcp_handley_lab.llm.model_loader import (
     build_model_configs_dict,
     format_model_listing,
     get_models_by_tags,
+    get_provider_models,
     load_model_config,
 )
 
@@ -337,3 +341,129 @@ class TestModelConfigErrorHandling:
 
             with pytest.raises(ValueError, match="Missing 'output_tokens'"):
                 build_model_configs_dict("gemini")
+
+
+class TestModelRegistry:
+    """Test the compiled, cached model registry."""
+
+    @pytest.fixture
+    def cache_dir(self, tmp_path):
+        """An empty registry, in memory and on disk."""
+        with (
+            patch.object(settings, "model_registry_cache_dir", str(tmp_path)),
+            patch.dict(model_loader._registry, clear=True),
+        ):
+            yield tmp_path
+
+    @pytest.fixture
+    def models_file(self, tmp_path, cache_dir):
+        """A provider models.yaml that the registry reads instead of the real one."""
+        models_file = tmp_path / "models.yaml"
+        models_file.write_text(
+            yaml.safe_dump(
+                {
+                    "default_model": "test-model",
+                    "display_categories": [],
+                    "usage_notes": [],
+                    "models": {"test-model": {"tags": ["a"], "input_per_1m": 1.0}},
+                }
+            )
+        )
+        with patch.object(model_loader, "get_models_file", return_value=models_file):
+            yield models_file
+
+    @pytest.mark.parametrize("provider", ["gemini", "openai", "claude", "grok"])
+    def test_registry_matches_yaml(self, cache_dir, provider):
+        """Test that the registry holds what the uncached loaders produce."""
+        config = load_model_config(provider)
+        registry = get_provider_models(provider)
+
+        assert registry.config == config
+        assert registry.model_configs == build_model_configs_dict(provider)
+        assert get_provider_models(provider) is registry
+
+    @pytest.mark.parametrize(
+        "required, exclude",
+        [([], []), (["reasoning"], []), (["latest"], ["legacy"]), (["missing"], [])],
+    )
+    def test_tag_index_matches_scan(self, cache_dir, required, exclude):
+        """Test that indexed tag filtering matches scanning every model."""
+        registry = get_provider_models("openai")
+
+        expected = get_models_by_tags(registry.config, required, exclude)
+        result = registry.models_by_tags(required, exclude)
+
+        assert list(result) == list(expected)
+
+    def test_disk_cache_skips_yaml_parsing(self, cache_dir):
+        """Test that a fresh process loads the compiled registry from disk."""
+        registry = get_provider_models("gemini")
+        model_loader._registry.clear()
+
+        with patch.object(model_loader.yaml, "safe_load") as safe_load:
+            cached = get_provider_models("gemini")
+
+        safe_load.assert_not_called()
+        assert cached == registry
+        assert (cache_dir / "model_registry" / "gemini.json").exists()
+
+    def test_cache_invalidated_by_file_contents(self, models_file):
+        """Test that a changed models.yaml is recompiled, in memory and on disk."""
+        assert get_provider_models("test").config["default_model"] == "test-model"
+
+        models_file.write_text(
+            models_file.read_text().replace("input_per_1m: 1.0", "input_per_1m: 3.0")
+        )
+        model_loader._registry.clear()
+
+        registry = get_provider_models("test")
+        assert registry.config["models"]["test-model"]["input_per_1m"] == 3.0
+
+    def test_cache_invalidated_by_loader_change(self, cache_dir):
+        """Test that a registry compiled by other loader code is recompiled."""
+        get_provider_models("gemini")
+        model_loader._registry.clear()
+
+        with (
+            patch.object(model_loader, "_LOADER_HASH", "changed"),
+            patch.object(model_loader.yaml, "safe_load", wraps=yaml.safe_load) as load,
+        ):
+            registry = get_provider_models("gemini")
+
+        load.assert_called_once()
+        assert registry.loader_hash == "changed"
+
+    @pytest.mark.parametrize(
+        "contents", [b"not json", b'{"provider": "gemini"}', b"\xff\xfe"]
+    )
+    def test_unreadable_cache_rebuilt(self, cache_dir, contents):
+        """Test that a corrupt or outdated cache file is treated as a miss."""
+        cache_file = cache_dir / "model_registry" / "gemini.json"
+        cache_file.parent.mkdir(parents=True)
+        cache_file.write_bytes(contents)
+
+        registry = get_provider_models("gemini")
+
+        assert registry.config == load_model_config("gemini")
+        assert json.loads(cache_file.read_bytes())["file_hash"] == registry.file_hash
+
+    def test_invalid_yaml_not_cached(self, models_file, cache_dir):
+        """Test that a models.yaml missing required sections raises every time."""
+        models_file.write_text("models: {}\n")
+
+        for _ in range(2):
+            with pytest.raises(ValueError, match="Missing required sections"):
+                get_provider_models("test")
+        assert not (cache_dir / "model_registry" / "test.json").exists()
+
+    def test_disk_cache_disabled(self, cache_dir):
+        """Test that an empty cache directory setting keeps the registry in memory."""
+        with patch.object(settings, "model_registry_cache_dir", ""):
+            get_provider_models("claude")
+
+        assert not (cache_dir / "model_registry").exists()
+
+    def test_unknown_provider(self, cache_dir):
+        """Test that a provider without a models.yaml raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            get_provider_models("nonexistent")
@@ -2,13 +2,18 @@
 
 import tempfile
 from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
 
+import anyio
 import pytest
 
 from mcp_handley_lab.llm.common import determine_mime_type, is_text_file
 from mcp_handley_lab.llm.openai.tool import (
     MODEL_CONFIGS,
     _get_model_config,
+    _openai_generation_adapter,
+    _openai_generation_adapter_async,
 )
 
 
@@ -141,6 +146,117 @@ class TestOpenAIHelperFunctions:
         assert is_text_file(Path("test.exe")) is False
 
 
+class TestOpenAIStreaming:
+    """Test the streaming path of the OpenAI generation adapter."""
+
+    @staticmethod
+    def _chunk(content=None, finish_reason=None, usage=None):
+        choices = []
+        if usage is None:
+            choices = [
+                SimpleNamespace(
+                    delta=SimpleNamespace(content=content),
+                    logprobs=None,
+                    finish_reason=finish_reason,
+                )
+            ]
+        return SimpleNamespace(
+            choices=choices,
+            usage=usage,
+            model="gpt-4o-2024-08-06",
+            id="chatcmpl-1",
+            system_fingerprint="fp_1",
+            service_tier="default",
+        )
+
+    def test_stream_relays_text_and_collects_usage(self):
+        """Test that deltas reach on_text and the final chunk supplies usage."""
+        usage = SimpleNamespace(
+            prompt_tokens=12,
+            completion_tokens=3,
+            completion_tokens_details=None,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=4, audio_tokens=0),
+        )
+        chunks = [
+            self._chunk("Hel"),
+            self._chunk("lo"),
+            self._chunk(finish_reason="stop"),
+            self._chunk(usage=usage),
+        ]
+        client = Mock()
+        client.chat.completions.create.return_value = iter(chunks)
+        on_text = Mock()
+
+        with patch("mcp_handley_lab.llm.openai.tool._get_client", return_value=client):
+            result = _openai_generation_adapter(
+                prompt="Hi",
+                model="gpt-4o",
+                history=[],
+                system_instruction=None,
+                temperature=1.0,
+                files=[],
+                max_output_tokens=0,
+                enable_logprobs=False,
+                top_logprobs=0,
+                on_text=on_text,
+            )
+
+        request = client.chat.completions.create.call_args.kwargs
+        assert request["stream"] is True
+        assert request["stream_options"] == {"include_usage": True}
+        assert [c.args[0] for c in on_text.call_args_list] == ["Hel", "lo"]
+        assert result["text"] == "Hello"
+        assert (result["input_tokens"], result["output_tokens"]) == (12, 3)
+        assert result["finish_reason"] == "stop"
+        assert result["prompt_tokens_details"]["cached_tokens"] == 4
+        assert result["response_id"] == "chatcmpl-1"
+
+    def test_async_stream_awaits_on_text(self):
+        """Test that the async adapter streams from AsyncOpenAI to an async on_text."""
+        usage = SimpleNamespace(
+            prompt_tokens=12,
+            completion_tokens=3,
+            completion_tokens_details=None,
+            prompt_tokens_details=None,
+        )
+        chunks = [
+            self._chunk("Hel"),
+            self._chunk("lo", "stop"),
+            self._chunk(usage=usage),
+        ]
+
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+
+        client = Mock()
+        client.chat.completions.create = AsyncMock(return_value=stream())
+        on_text = AsyncMock()
+
+        with patch(
+            "mcp_handley_lab.llm.openai.tool._get_async_client", return_value=client
+        ):
+            result = anyio.run(
+                lambda: _openai_generation_adapter_async(
+                    prompt="Hi",
+                    model="gpt-4o",
+                    history=[],
+                    system_instruction=None,
+                    temperature=1.0,
+                    files=[],
+                    max_output_tokens=0,
+                    enable_logprobs=False,
+                    top_logprobs=0,
+                    on_text=on_text,
+                )
+            )
+
+        assert [c.args[0] for c in on_text.await_args_list] == ["Hel", "lo"]
+        assert result["text"] == "Hello"
+        assert result["finish_reason"] == "stop"
+        assert (result["input_tokens"], result["output_tokens"]) == (12, 3)
+
+
 @pytest.fixture
 def temp_storage_dir():
     """Create temporary directory for testing."""
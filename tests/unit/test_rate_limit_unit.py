@@ -0,0 +1,191 @@
+"""Unit tests for client-side LLM rate limiting."""
+
+import threading
+import time
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import pytest
+
+from mcp_handley_lab.llm import rate_limit
+from mcp_handley_lab.llm.rate_limit import (
+    ProviderLimits,
+    RateLimiter,
+    TokenBucket,
+    get_rate_limiter,
+    load_rate_limits,
+)
+from mcp_handley_lab.llm.shared import process_llm_request
+from mcp_handley_lab.llm.usage import UsageLedger
+
+
+class TestTokenBucket:
+    """Test the refilling allowance behind each limit."""
+
+    def test_starts_full_and_refills_per_second(self):
+        """Test that a bucket allows a minute's burst, then refills steadily."""
+        bucket = TokenBucket(60, now=0.0)
+        assert bucket.delay(60, 0.0) == 0
+        bucket.take(60, 0.0)
+        assert bucket.delay(1, 0.0) == pytest.approx(1.0)
+        assert bucket.delay(1, 0.5) == pytest.approx(0.5)
+        assert bucket.delay(30, 10.0) == pytest.approx(20.0)
+
+    def test_refill_capped_at_capacity(self):
+        """Test that idle time does not bank more than one minute's allowance."""
+        bucket = TokenBucket(60, now=0.0)
+        bucket.take(60, 0.0)
+        bucket.delay(0, 1000.0)
+        assert bucket.level == 60
+
+    def test_oversized_request_waits_for_full_bucket(self):
+        """Test that a request larger than the capacity runs once the bucket is full."""
+        bucket = TokenBucket(100, now=0.0)
+        assert bucket.delay(500, 0.0) == 0
+        bucket.take(500, 0.0)
+        assert bucket.level == -400
+        assert bucket.delay(1, 0.0) == pytest.approx(401 * 0.6)
+
+
+class TestRateLimiter:
+    """Test queuing requests against per-provider limits."""
+
+    def test_unlimited_by_default(self, tmp_path):
+        """Test that a limiter without limits never waits."""
+        limiter = RateLimiter(
+            "openai", ProviderLimits(), ledger=UsageLedger(str(tmp_path))
+        )
+        for _ in range(1000):
+            limiter.acquire(10**6)
+
+    def test_request_waits_for_capacity(self, tmp_path):
+        """Test that a request over the limit is delayed rather than rejected."""
+        limiter = RateLimiter(
+            "openai",
+            ProviderLimits(tokens_per_minute=6000),
+            max_wait=5,
+            ledger=UsageLedger(str(tmp_path)),
+        )
+        limiter.acquire(6000)
+
+        started = time.monotonic()
+        limiter.acquire(30)
+        assert time.monotonic() - started >= 0.25
+
+    def test_wait_beyond_bound_fails_fast(self, tmp_path):
+        """Test that a request that cannot start in time raises without waiting."""
+        limiter = RateLimiter(
+            "openai",
+            ProviderLimits(requests_per_minute=1),
+            max_wait=1,
+            ledger=UsageLedger(str(tmp_path)),
+        )
+        limiter.acquire()
+
+        started = time.monotonic()
+        with pytest.raises(RuntimeError, match="needs a 60.0s wait"):
+            limiter.acquire()
+        assert time.monotonic() - started < 0.5
+
+    def test_settle_charges_actual_usage(self, tmp_path):
+        """Test that underestimated requests hold back later ones."""
+        limiter = RateLimiter(
+            "openai",
+            ProviderLimits(tokens_per_minute=600),
+            max_wait=0,
+            ledger=UsageLedger(str(tmp_path)),
+        )
+        limiter.acquire(100)
+        limiter.settle(100, 600)
+        with pytest.raises(RuntimeError, match="Rate limit for 'openai'"):
+            limiter.acquire(100)
+
+    def test_concurrent_requests_spread_out(self, tmp_path):
+        """Test that a burst from several threads is smoothed, not rejected."""
+        limiter = RateLimiter(
+            "openai",
+            ProviderLimits(requests_per_minute=600),
+            max_wait=5,
+            ledger=UsageLedger(str(tmp_path)),
+        )
+        limiter._requests.level = 0
+        starts = []
+
+        def request():
+            limiter.acquire()
+            starts.append(time.monotonic())
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        began = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 10 requests per second, so five queued requests need about half a second
+        assert max(starts) - began >= 0.4
+        assert not limiter._queue
+
+    def test_daily_cost_limit(self, tmp_path):
+        """Test that requests are refused once today's spend reaches the cap."""
+        ledger = UsageLedger(str(tmp_path))
+        limiter = RateLimiter(
+            "openai", ProviderLimits(daily_cost_limit=1.0), ledger=ledger
+        )
+        ledger.record("openai", "gpt-4o", cost=0.6)
+        ledger.record("claude", "claude-sonnet-4", cost=5.0)
+        ledger.record("openai", "gpt-4o", cost=0.6, timestamp=datetime(2000, 1, 1))
+        limiter.acquire()
+
+        ledger.record("openai", "gpt-4o", cost=0.6)
+        with pytest.raises(RuntimeError, match=r"Daily cost limit of \$1.00"):
+            limiter.acquire()
+
+
+class TestRateLimitConfig:
+    """Test loading limits from the configured file."""
+
+    def test_load_rate_limits(self, tmp_path):
+        """Test reading per-provider limits from YAML."""
+        limits_file = tmp_path / "limits.yaml"
+        limits_file.write_text(
+            "openai:\n  requests_per_minute: 500\n  tokens_per_minute: 200000\n"
+            "claude:\n  daily_cost_limit: 2.5\n"
+        )
+
+        limits = load_rate_limits(str(limits_file))
+        assert limits["openai"].requests_per_minute == 500
+        assert limits["openai"].daily_cost_limit == 0
+        assert limits["claude"].daily_cost_limit == 2.5
+        assert load_rate_limits("") == {}
+
+    def test_generation_goes_through_provider_limiter(self, tmp_path):
+        """Test that process_llm_request reserves and settles capacity."""
+        limits_file = tmp_path / "limits.yaml"
+        limits_file.write_text("grok:\n  tokens_per_minute: 1000\n")
+
+        with (
+            patch.object(rate_limit.settings, "llm_rate_limits_file", str(limits_file)),
+            patch.dict(rate_limit._limiters, clear=True),
+            patch(
+                "mcp_handley_lab.llm.shared.usage_ledger", UsageLedger(str(tmp_path))
+            ),
+        ):
+            process_llm_request(
+                prompt="x" * 400,
+                output_file="-",
+                agent_name=False,
+                model="grok-3-mini",
+                provider="grok",
+                generation_func=Mock(
+                    return_value={
+                        "text": "ok",
+                        "input_tokens": 300,
+                        "output_tokens": 200,
+                    }
+                ),
+                mcp_instance=Mock(),
+            )
+            limiter = get_rate_limiter("grok")
+
+        assert limiter._tokens.level == pytest.approx(500, abs=1)
@@ -0,0 +1,225 @@
+"""Unit tests for the LLM response cache."""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from mcp_handley_lab.common.config import settings
+from mcp_handley_lab.llm.response_cache import ResponseCache, request_key
+from mcp_handley_lab.llm.shared import process_llm_request
+from mcp_handley_lab.shared.models import LLMResult, UsageStats
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    """An empty response cache in a temporary directory."""
+    return ResponseCache(str(tmp_path), ttl=3600, clock=clock)
+
+
+def _result(content: str = "Response") -> LLMResult:
+    return LLMResult(
+        content=content,
+        usage=UsageStats(
+            input_tokens=100, output_tokens=50, cost=0.01, model_used="gpt-4o"
+        ),
+    )
+
+
+def _key(prompt: str = "Hello", **params) -> str:
+    return request_key("openai", "gpt-4o", None, [], prompt, params)
+
+
+class TestRequestKey:
+    """Test which parts of a request change its cache key."""
+
+    def test_same_request_same_key(self):
+        """Test that identical requests share a key regardless of param order."""
+        assert _key(temperature=0, max_output_tokens=10) == _key(
+            max_output_tokens=10, temperature=0
+        )
+
+    @pytest.mark.parametrize(
+        "other",
+        [
+            ("claude", "gpt-4o", None, [], "Hello", {}),
+            ("openai", "gpt-4.1", None, [], "Hello", {}),
+            ("openai", "gpt-4o", "Be brief", [], "Hello", {}),
+            (
+                "openai",
+                "gpt-4o",
+                None,
+                [{"role": "user", "content": "Hi"}],
+                "Hello",
+                {},
+            ),
+            ("openai", "gpt-4o", None, [], "Goodbye", {}),
+            ("openai", "gpt-4o", None, [], "Hello", {"temperature": 0.5}),
+        ],
+    )
+    def test_request_parts_change_key(self, other):
+        """Test that provider, model, system, history, prompt and params are keyed."""
+        assert request_key(*other) != _key()
+
+    def test_file_contents_change_key(self, tmp_path):
+        """Test that editing an attached file invalidates the cached response."""
+        attachment = tmp_path / "notes.txt"
+        attachment.write_text("first draft")
+        before = _key(files=[str(attachment)])
+
+        attachment.write_text("second draft")
+
+        assert _key(files=[str(attachment)]) != before
+        assert _key(files=[{"path": str(attachment)}]) == _key(
+            files=[{"path": str(attachment)}]
+        )
+
+
+class TestResponseCache:
+    """Test storing, expiring and evicting cached responses."""
+
+    def test_round_trip(self, cache):
+        """Test that a stored result is returned unchanged."""
+        cache.put("key", _result())
+
+        assert cache.get("key") == _result()
+        assert cache.get("other") is None
+
+    def test_persists_across_instances(self, cache, tmp_path, clock):
+        """Test that a new process reads responses stored by an earlier one."""
+        cache.put("key", _result())
+
+        reopened = ResponseCache(str(tmp_path), ttl=3600, clock=clock)
+
+        assert reopened.get("key") == _result()
+
+    def test_expired_entries_dropped(self, cache, tmp_path, clock):
+        """Test that entries older than the TTL miss, in memory and on disk."""
+        cache.put("key", _result())
+        clock.now += 3600
+
+        assert cache.get("key") is None
+        assert ResponseCache(str(tmp_path), ttl=3600, clock=clock).get("key") is None
+
+    def test_size_limit_evicts_least_recently_used(self, tmp_path, clock):
+        """Test that the entries read longest ago are evicted first."""
+        entry_size = len(_result("a").model_dump_json())
+        cache = ResponseCache(
+            str(tmp_path), max_bytes=2 * entry_size, memory_entries=0, clock=clock
+        )
+        cache.put("a", _result("a"))
+        clock.now += 1
+        cache.put("b", _result("b"))
+        clock.now += 1
+        cache.get("a")
+        clock.now += 1
+        cache.put("c", _result("c"))
+
+        assert [cache.get(key) is not None for key in "abc"] == [True, False, True]
+
+    def test_memory_lru_bounded(self, tmp_path, clock):
+        """Test that only the most recently used entries stay in memory."""
+        cache = ResponseCache(str(tmp_path), memory_entries=2, clock=clock)
+        for key in "abc":
+            cache.put(key, _result(key))
+
+        assert list(cache._memory) == ["b", "c"]
+        assert cache.get("a") == _result("a")
+        assert list(cache._memory) == ["c", "a"]
+
+
+class TestProcessLLMRequestCache:
+    """Test that process_llm_request reuses responses to repeatable requests."""
+
+    @pytest.fixture(autouse=True)
+    def cache(self, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        with patch("mcp_handley_lab.llm.shared.response_cache", cache):
+            yield cache
+
+    @pytest.fixture
+    def generation_func(self):
+        return Mock(
+            return_value={"text": "Response", "input_tokens": 100, "output_tokens": 50}
+        )
+
+    def _ask(self, generation_func, **kwargs):
+        return process_llm_request(
+            prompt="Hello",
+            output_file="-",
+            agent_name=False,
+            model="gpt-4o",
+            provider="openai",
+            generation_func=generation_func,
+            mcp_instance=Mock(),
+            **kwargs,
+        )
+
+    def test_temperature_zero_cached_when_enabled(self, generation_func):
+        """Test that a repeated deterministic request is served from the cache."""
+        with patch.object(settings, "llm_response_cache", True):
+            first = self._ask(generation_func, temperature=0)
+            second = self._ask(generation_func, temperature=0)
+
+        assert generation_func.call_count == 1
+        assert first.usage.cost > 0 and not first.from_cache
+        assert second.content == first.content
+        assert second.usage.cost == 0.0
+        assert second.usage.input_tokens == first.usage.input_tokens
+        assert second.from_cache
+
+    @pytest.mark.parametrize(
+        "enabled, temperature, cache_response, calls",
+        [
+            (False, 0, False, 2),
+            (True, 1.0, False, 2),
+            (False, 1.0, True, 1),
+        ],
+    )
+    def test_only_cacheable_requests_cached(
+        self, generation_func, enabled, temperature, cache_response, calls
+    ):
+        """Test that caching is opt-in, by setting for temperature 0 or per call."""
+        with patch.object(settings, "llm_response_cache", enabled):
+            for _ in range(2):
+                self._ask(
+                    generation_func,
+                    temperature=temperature,
+                    cache_response=cache_response,
+                )
+
+        assert generation_func.call_count == calls
+        assert "cache_response" not in generation_func.call_args.kwargs
+
+    def test_cached_response_written_to_output_file(self, generation_func, tmp_path):
+        """Test that a cache hit still writes the response to the output file."""
+        self._ask(generation_func, cache_response=True)
+        output_file = tmp_path / "out.txt"
+
+        result = process_llm_request(
+            prompt="Hello",
+            output_file=str(output_file),
+            agent_name=False,
+            model="gpt-4o",
+            provider="openai",
+            generation_func=generation_func,
+            mcp_instance=Mock(),
+            cache_response=True,
+        )
+
+        assert result.from_cache
+        assert output_file.read_text() == "Response"
@@ -0,0 +1,178 @@
+"""Unit tests for the LLM usage ledger."""
+
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import pytest
+
+from mcp_handley_lab.llm.shared import process_image_generation, process_llm_request
+from mcp_handley_lab.llm.usage import UsageLedger, build_usage_report
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    """An empty usage ledger in a temporary directory."""
+    return UsageLedger(str(tmp_path))
+
+
+def _record(ledger, timestamp, provider="openai", model="gpt-4o", cost=0.01):
+    ledger.record(
+        provider,
+        model,
+        agent="analyst",
+        input_tokens=100,
+        output_tokens=50,
+        cached_input_tokens=20,
+        cost=cost,
+        latency_ms=200.0,
+        timestamp=timestamp,
+    )
+
+
+class TestUsageLedger:
+    """Test recording usage and reading the rollups."""
+
+    def test_database_created_on_first_use(self, tmp_path):
+        """Test that constructing a ledger leaves nothing on disk."""
+        ledger = UsageLedger(str(tmp_path / "store"))
+        assert not (tmp_path / "store").exists()
+
+        _record(ledger, datetime(2025, 6, 1, 9, 5))
+        assert (tmp_path / "store" / "usage.db").exists()
+
+    def test_requests_rolled_up_by_hour_and_day(self, ledger):
+        """Test that each request lands in its hourly and daily bucket."""
+        _record(ledger, datetime(2025, 6, 1, 9, 5))
+        _record(ledger, datetime(2025, 6, 1, 9, 55), cost=0.03)
+        _record(ledger, datetime(2025, 6, 1, 14, 0))
+
+        hours = ledger.rollups("hour")
+        assert [(r.start, r.requests) for r in hours] == [
+            ("2025-06-01T09", 2),
+            ("2025-06-01T14", 1),
+        ]
+        assert hours[0].cost == pytest.approx(0.04)
+        assert hours[0].avg_latency_ms == 200.0
+
+        [day] = ledger.rollups("day")
+        assert (day.start, day.requests) == ("2025-06-01", 3)
+        assert (day.input_tokens, day.output_tokens) == (300, 150)
+        assert day.cached_input_tokens == 60
+
+    def test_rollups_split_by_provider_and_model(self, ledger):
+        """Test that buckets are kept per provider and model and can be filtered."""
+        day = datetime(2025, 6, 1, 12)
+        _record(ledger, day, "openai", "gpt-4o")
+        _record(ledger, day, "openai", "gpt-4o-mini")
+        _record(ledger, day, "claude", "claude-sonnet-4")
+
+        assert [(r.provider, r.model) for r in ledger.rollups()] == [
+            ("claude", "claude-sonnet-4"),
+            ("openai", "gpt-4o"),
+            ("openai", "gpt-4o-mini"),
+        ]
+        assert len(ledger.rollups(provider="openai")) == 2
+        assert len(ledger.rollups(model="gpt-4o-mini")) == 1
+
+    def test_range_bounds(self, ledger):
+        """Test that since is inclusive and until exclusive, by bucket start."""
+        for day in (1, 2, 3):
+            _record(ledger, datetime(2025, 6, day, 12))
+
+        rollups = ledger.rollups(
+            "day", since=datetime(2025, 6, 2), until=datetime(2025, 6, 3)
+        )
+        assert [r.start for r in rollups] == ["2025-06-02"]
+
+    def test_report_defaults_to_current_month(self, ledger):
+        """Test the monthly spend report and its totals."""
+        now = datetime.now()
+        _record(ledger, now, cost=0.25)
+        _record(ledger, now, model="gpt-4o-mini", cost=0.5)
+        _record(ledger, datetime(2000, 1, 1), cost=100.0)
+
+        report = ledger.report()
+        assert report.since == now.replace(day=1).date().isoformat() + "T00:00:00"
+        assert report.total_requests == 2
+        assert report.total_cost == pytest.approx(0.75)
+        assert report.total_input_tokens == 200
+
+    def test_reports_do_not_scan_requests(self, ledger):
+        """Test that reports are answered from the rollup table."""
+        _record(ledger, datetime(2025, 6, 1))
+        ledger._conn.execute("DELETE FROM usage")
+
+        assert ledger.report(since=datetime(2025, 6, 1)).total_requests == 1
+
+    def test_unknown_period(self, ledger):
+        """Test that only hourly and daily rollups are accepted."""
+        with pytest.raises(ValueError, match="Unknown usage period 'week'"):
+            ledger.rollups("week")
+
+    def test_build_usage_report_parses_dates(self, ledger):
+        """Test the string interface used by the MCP tools."""
+        _record(ledger, datetime(2025, 6, 1, 9))
+        with patch("mcp_handley_lab.llm.usage.usage_ledger", ledger):
+            report = build_usage_report("hour", "2025-06-01", "2025-06-02")
+        assert report.until == "2025-06-02T00:00:00"
+        assert [r.start for r in report.rollups] == ["2025-06-01T09"]
+
+
+class TestUsageRecording:
+    """Test that LLM requests are written to the ledger."""
+
+    def test_text_request_recorded(self, ledger):
+        """Test that a text request records tokens, cost, cache reads and latency."""
+
+        def generation_func(**kwargs):
+            return {
+                "text": "Response",
+                "input_tokens": 1000,
+                "output_tokens": 500,
+                "prompt_tokens_details": {"cached_tokens": 200},
+            }
+
+        with patch("mcp_handley_lab.llm.shared.usage_ledger", ledger):
+            result = process_llm_request(
+                prompt="Hello",
+                output_file="-",
+                agent_name=False,
+                model="gpt-4o",
+                provider="openai",
+                generation_func=generation_func,
+                mcp_instance=Mock(),
+            )
+
+        [rollup] = ledger.rollups()
+        assert (rollup.provider, rollup.model, rollup.requests) == (
+            "openai",
+            "gpt-4o",
+            1,
+        )
+        assert rollup.cached_input_tokens == 200
+        assert rollup.cost == pytest.approx(result.usage.cost)
+        assert rollup.avg_latency_ms >= 0
+
+    def test_image_generation_recorded(self, ledger, tmp_path):
+        """Test that image generation is charged to the ledger."""
+
+        def generation_func(**kwargs):
+            return {"image_bytes": b"png"}
+
+        with (
+            patch("mcp_handley_lab.llm.shared.usage_ledger", ledger),
+            patch("mcp_handley_lab.llm.shared.handle_agent_memory"),
+            patch("tempfile.gettempdir", return_value=str(tmp_path)),
+        ):
+            result = process_image_generation(
+                prompt="A cat",
+                agent_name="",
+                model="dall-e-3",
+                provider="openai",
+                generation_func=generation_func,
+                mcp_instance=Mock(),
+            )
+
+        [rollup] = ledger.rollups()
+        assert rollup.model == "dall-e-3"
+        assert rollup.cost == pytest.approx(result.usage.cost)